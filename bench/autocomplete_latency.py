@@ -0,0 +1,80 @@
+"""
+    :module_name: autocomplete_latency
+    :module_summary: microbenchmark of per-keystroke timezone autocomplete latency
+    :module_author: CountTails
+
+Replays players typing zone names one keystroke at a time and reports the
+latency of each lookup for the original linear scan, a cold index and a
+warm (cached) index. Usage::
+
+    python bench/autocomplete_latency.py [--rounds N]
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import match_scheduler_bot
+
+# the bot package reads its command specs at import time
+match_scheduler_bot.setup_config(
+    Path(__file__).resolve().parent.parent / 'bot.example.json'
+)
+
+from match_scheduler_bot.bot.autocomplete import timezones, TimezoneIndex
+
+
+TYPED = [
+    'America/New_York',
+    'york',
+    'europe/london',
+    'EST',
+    'pacific',
+    'sao_paulo',
+    'tokyo',
+]
+
+
+def linear_scan(current: str):
+    return [tz for tz in timezones if current.lower() in tz.lower()][:25]
+
+
+def keystrokes():
+    for word in TYPED:
+        for end in range(1, len(word) + 1):
+            yield word[:end]
+
+
+def measure(name: str, lookup, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        for query in keystrokes():
+            began = time.perf_counter()
+            lookup(query)
+            samples.append(time.perf_counter() - began)
+    samples.sort()
+    print(
+        f'{name:>12}: {len(samples)} keystrokes | '
+        f'p50 {statistics.median(samples) * 1e6:8.1f} us, '
+        f'p99 {samples[int((len(samples) - 1) * 0.99)] * 1e6:8.1f} us, '
+        f'max {samples[-1] * 1e6:8.1f} us'
+    )
+
+
+def main(rounds: int):
+    began = time.perf_counter()
+    index = TimezoneIndex(timezones)
+    print(
+        f'index built over {len(index)} zones in '
+        f'{(time.perf_counter() - began) * 1000:.1f} ms'
+    )
+    measure('linear scan', linear_scan, rounds)
+    measure('index cold', lambda q: index._search(q), rounds)
+    measure('index warm', index.search, rounds)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rounds', type=int, default=20)
+    main(parser.parse_args().rounds)
@@ -0,0 +1,94 @@
+"""
+    :module_name: event_loop_lag
+    :module_summary: benchmark of event loop lag while match commands run concurrently
+    :module_author: CountTails
+
+Runs a burst of simulated ``/schedule-match``, ``/match-calendar`` and
+``/cancel-match`` invocations against the synchronous and the asynchronous
+match repositories while a probe coroutine measures how late the event loop
+wakes it up. Usage::
+
+    python bench/event_loop_lag.py [--commands N] [--probe-ms MS]
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from match_scheduler_bot.model.matchlist import (
+    MatchListRepository,
+    AsyncMatchListRepository
+)
+from match_scheduler_bot.model.rows import MatchToSchedule, MatchToCancel
+
+
+async def probe_lag(interval: float, samples: list, done: asyncio.Event):
+    while not done.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+
+async def sync_command(repo: MatchListRepository, team: int):
+    with repo as db:
+        db.insert_match(MatchToSchedule(team + 10_000, 0, team))
+    with repo as db:
+        db.find_upcoming_matches(not_before=0)
+    with repo as db:
+        db.delete_match(MatchToCancel(0, team))
+
+
+async def async_command(repo: AsyncMatchListRepository, team: int):
+    async with repo as db:
+        await db.insert_match(MatchToSchedule(team + 10_000, 0, team))
+    async with repo as db:
+        await db.find_upcoming_matches(not_before=0)
+    async with repo as db:
+        await db.delete_match(MatchToCancel(0, team))
+
+
+async def measure(name: str, command, repo, commands: int, interval: float):
+    samples, done = [], asyncio.Event()
+    probe = asyncio.create_task(probe_lag(interval, samples, done))
+    await asyncio.sleep(interval)
+    began = time.perf_counter()
+    await asyncio.gather(*[command(repo, t) for t in range(1, commands + 1)])
+    elapsed = time.perf_counter() - began
+    done.set()
+    await probe
+    samples.sort()
+    print(
+        f'{name:>6}: {commands} commands in {elapsed * 1000:8.1f} ms | '
+        f'loop lag p50 {statistics.median(samples) * 1000:7.2f} ms, '
+        f'p99 {samples[int((len(samples) - 1) * 0.99)] * 1000:7.2f} ms, '
+        f'max {samples[-1] * 1000:7.2f} ms ({len(samples)} probes)'
+    )
+
+
+async def main(commands: int, interval: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        await measure(
+            'sync',
+            sync_command,
+            MatchListRepository(str(Path(tmp, 'sync.db'))),
+            commands,
+            interval
+        )
+        repo = await AsyncMatchListRepository(
+            str(Path(tmp, 'async.db'))
+        ).connect()
+        try:
+            await measure('async', async_command, repo, commands, interval)
+        finally:
+            await repo.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--commands', type=int, default=300)
+    parser.add_argument('--probe-ms', type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.commands, args.probe_ms / 1000))
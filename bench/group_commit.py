@@ -0,0 +1,116 @@
+"""
+    :module_name: group_commit
+    :module_summary: concurrent schedule writes with and without group commit
+    :module_author: CountTails
+
+Schedules a burst of matches concurrently through ``MatchStorage.write``,
+once with every request committed on its own, once grouping whatever is
+already queued when the writer comes round, and once waiting out the
+configured window for more. Reports throughput, the p50 and p99 time a
+request waits for its commit, and how many requests each commit held,
+counting the ``COMMIT`` statements the writer connection runs. Run with
+``--synchronous full`` to see what an fsync per commit costs. Usage::
+
+    python bench/group_commit.py [--requests N] [--concurrency N]
+                                 [--window-ms MS] [--max-requests N]
+                                 [--synchronous off|normal|full|extra]
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import match_scheduler_bot
+
+match_scheduler_bot.setup_config(
+    Path(__file__).resolve().parent.parent / 'bot.example.json'
+)
+
+from match_scheduler_bot.model import DataSources
+from match_scheduler_bot.model.rows import MatchToSchedule
+from match_scheduler_bot.model.storage import MatchStorage
+
+
+def percentile(samples: list, q: float) -> float:
+    return samples[int((len(samples) - 1) * q)]
+
+
+def schedule(n: int):
+    async def operation(db):
+        return await db.insert_match(MatchToSchedule(60 * n, 2 * n, 2 * n + 1))
+    return operation
+
+
+async def run(args, window_ms: float, max_requests: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = await MatchStorage(DataSources(
+            database=Path(tmp, 'match.db'),
+            synchronous=args.synchronous,
+            group_commit_ms=window_ms,
+            group_commit_max=max_requests
+        )).open()
+        # count the transactions SQLite actually commits, not the batches
+        statements = []
+        await storage._writer.conn.set_trace_callback(statements.append)
+        slots = asyncio.Semaphore(args.concurrency)
+        waits = []
+
+        async def one(n):
+            async with slots:
+                began = time.perf_counter()
+                await storage.write(schedule(n))
+                waits.append(time.perf_counter() - began)
+
+        try:
+            began = time.perf_counter()
+            await asyncio.gather(*(one(n) for n in range(1, args.requests + 1)))
+            elapsed = time.perf_counter() - began
+        finally:
+            await storage.close()
+    waits.sort()
+    commits = statements.count('COMMIT')
+    return {
+        'throughput': args.requests / elapsed,
+        'p50': statistics.median(waits),
+        'p99': percentile(waits, 0.99),
+        'commits': commits,
+        'per_commit': args.requests / commits,
+    }
+
+
+async def main(args):
+    print(
+        f'{args.requests} schedule requests, {args.concurrency} in flight, '
+        f'synchronous={args.synchronous}'
+    )
+    modes = [
+        ('one per commit', 0.0, 1),
+        ('queued so far', 0.0, args.max_requests),
+        (f'{args.window_ms:g} ms window', args.window_ms, args.max_requests),
+    ]
+    for name, window_ms, max_requests in modes:
+        result = await run(args, window_ms, max_requests)
+        print(
+            f'{name:>16}: {result["throughput"]:8.0f} writes/s | '
+            f'p50 {result["p50"] * 1000:7.2f} ms, '
+            f'p99 {result["p99"] * 1000:7.2f} ms | '
+            f'{result["commits"]:5d} commits, '
+            f'{result["per_commit"]:5.1f} requests each'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--window-ms', type=float, default=2.0)
+    parser.add_argument('--max-requests', type=int, default=64)
+    parser.add_argument(
+        '--synchronous',
+        choices=['off', 'normal', 'full', 'extra'],
+        default='normal'
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,98 @@
+"""
+    :module_name: guild_announcements
+    :module_summary: benchmark of match start announcements as the number of guilds grows
+    :module_author: CountTails
+
+Schedules one match starting soon in each of N guilds and measures how long
+it takes until every guild's channel has its announcement, once with the
+guild announcers run one after the other and once side by side as the bot
+runs them. Channels answer after a simulated Discord round trip. Usage::
+
+    python bench/guild_announcements.py [--guilds 1 16 256] [--send-ms MS]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import match_scheduler_bot
+
+match_scheduler_bot.setup_config(
+    Path(__file__).resolve().parent.parent / 'bot.example.json'
+)
+
+from match_scheduler_bot.bot.cogs.getmatch import GetMatchCommand, ANNOUNCE_LEAD
+from match_scheduler_bot.bot.delivery import Broadcaster
+from match_scheduler_bot.bot.outbox import OutboxDispatcher
+from match_scheduler_bot.model import DataSources, DeliveryOptions
+from match_scheduler_bot.model.storage import MatchStorage
+from match_scheduler_bot.model.rows import MatchToSchedule
+
+# the Discord stand-ins are shared with the unit tests
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'test'))
+from discord_standin import Latency, StandInBot, StandInGuild
+
+
+async def measure(tmp: str, guilds: int, delay: float, concurrent: bool) -> float:
+    storage = await MatchStorage(DataSources(
+        database=Path(tmp, f'{guilds}-{concurrent}.db'),
+        readers=2
+    )).open()
+    latency = Latency(mean_ms=delay * 1000)
+    bot = StandInBot([
+        StandInGuild(g, latency=latency) for g in range(1, guilds + 1)
+    ])
+    cog = GetMatchCommand(storage, bot)
+    outbox = OutboxDispatcher(
+        storage,
+        bot,
+        Broadcaster(bot, DeliveryOptions(concurrency=64)),
+        DeliveryOptions(batch_size=guilds)
+    )
+    try:
+        now = int(time.time())
+        starts = now + int(ANNOUNCE_LEAD.total_seconds()) // 2
+        async with storage.writer() as db:
+            for guild_id in bot.guilds:
+                await db.insert_match(MatchToSchedule(starts, 1, 2, guild_id))
+
+        began = time.perf_counter()
+        if concurrent:
+            await asyncio.gather(
+                *(cog.announce_match_start(g, now) for g in bot.guilds)
+            )
+            await outbox.dispatch(int(time.time()) + 1)
+        else:
+            for guild_id in bot.guilds:
+                await cog.announce_match_start(guild_id, now)
+                await outbox.dispatch(int(time.time()) + 1)
+        elapsed = time.perf_counter() - began
+        assert all(
+            len(g.get_channel(1).sent) == 1 for g in bot.guilds.values()
+        )
+        return elapsed
+    finally:
+        await storage.close()
+
+
+async def main(guild_counts, delay: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        for guilds in guild_counts:
+            serial = await measure(tmp, guilds, delay, concurrent=False)
+            parallel = await measure(tmp, guilds, delay, concurrent=True)
+            print(
+                f'{guilds:>5} guilds: one by one {serial * 1000:9.1f} ms | '
+                f'side by side {parallel * 1000:9.1f} ms '
+                f'({serial / parallel:5.1f}x)'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--guilds', type=int, nargs='+', default=[1, 4, 16, 64, 256])
+    parser.add_argument('--send-ms', type=float, default=50.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.guilds, args.send_ms / 1000))
@@ -0,0 +1,302 @@
+"""
+    :module_name: load_driver
+    :module_summary: offline load test of the match commands through their real cogs
+    :module_author: CountTails
+
+Fires a burst of concurrent ``/schedule-match``, ``/cancel-match`` and
+``/match-calendar`` invocations through the real ``do_it`` coroutines of the
+cogs, against a throwaway database and the Discord stand-ins of
+``test/discord_standin.py``, while the outbox delivers the announcements they
+queue. Every match the burst cancels is booked beforehand, so cancels do
+not race the schedules. Reports throughput, latency percentiles per command
+and answer, with rejected invocations apart from answered ones, what the
+users were answered and event loop lag. Usage::
+
+    python bench/load_driver.py [--invocations N] [--concurrency N]
+                                [--latency-ms MS] [--jitter-ms MS]
+                                [--guilds N] [--mix SCHEDULE CANCEL CALENDAR]
+                                [--drain-seconds S]
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import match_scheduler_bot
+
+# the bot package reads its command specs at import time
+match_scheduler_bot.setup_config(
+    Path(__file__).resolve().parent.parent / 'bot.example.json'
+)
+
+from match_scheduler_bot import get_config
+from match_scheduler_bot.bot.cogs import (
+    AddMatchCommand,
+    DeleteMatchCommand,
+    GetMatchCommand
+)
+from match_scheduler_bot.bot.delivery import Broadcaster
+from match_scheduler_bot.bot.outbox import OutboxDispatcher
+from match_scheduler_bot.model import DataSources
+from match_scheduler_bot.model.rows import MatchToSchedule
+from match_scheduler_bot.model.storage import MatchStorage
+
+# the Discord stand-ins are shared with the unit tests
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'test'))
+from discord_standin import (
+    Latency,
+    StandInBot,
+    StandInGuild,
+    StandInInteraction,
+    StandInMember,
+    StandInRole,
+    invoke
+)
+
+
+STAFF = 1
+
+
+async def probe_lag(interval: float, samples: list, done: asyncio.Event):
+    while not done.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+
+def teams(n: int) -> tuple:
+    '''The team roles of the `n`th invocation, which no other one uses'''
+    return 2 * n + 2, 2 * n + 3
+
+
+def percentile(samples: list, q: float) -> float:
+    return samples[int((len(samples) - 1) * q)]
+
+
+def outcome(interaction: StandInInteraction) -> str:
+    '''What the user was finally told'''
+    for answer in reversed(interaction.answers):
+        embeds = answer.get('embeds') or [answer.get('embed')]
+        if embeds[0] is not None:
+            return 'rejected' if 'Issue' in (embeds[0].title or '') else 'ok'
+    return 'unanswered'
+
+
+class Driver:
+    def __init__(self, storage, guilds, latency, rng):
+        self.storage = storage
+        self.guilds = guilds
+        self.latency = latency
+        self.rng = rng
+        self.bot = StandInBot(guilds)
+        self.cogs = {
+            'schedule': AddMatchCommand(storage),
+            'cancel': DeleteMatchCommand(storage),
+            'calendar': GetMatchCommand(storage, self.bot),
+        }
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+
+    def _interaction(self, guild, command):
+        user = StandInMember(
+            self.rng.randrange(10**6),
+            [guild.get_role(STAFF)]
+        )
+        return StandInInteraction(guild, user, command, self.latency)
+
+    async def schedule(self, guild, n):
+        team_1, team_2 = map(guild.get_role, teams(n))
+        start = datetime.datetime.now(datetime.UTC) + datetime.timedelta(
+            days=1,
+            minutes=n
+        )
+        interaction = self._interaction(guild, 'schedule-match')
+        await invoke(
+            self.cogs['schedule'],
+            self.cogs['schedule'].do_it,
+            interaction,
+            team_1=team_1,
+            team_2=team_2,
+            year=start.year,
+            month=start.month,
+            day=start.day,
+            hour=start.hour,
+            minute=start.minute,
+            timezone='UTC'
+        )
+        return interaction
+
+    async def seed(self, plan):
+        '''Book the match every cancel of the burst is going to cancel'''
+        tomorrow = round(time.time()) + 86400
+        async with self.storage.writer() as db:
+            await db.insert_matches([
+                MatchToSchedule(
+                    tomorrow + 60 * n,
+                    *teams(n),
+                    self.guilds[n % len(self.guilds)].id
+                )
+                for n, command in enumerate(plan) if command == 'cancel'
+            ])
+
+    async def cancel(self, guild, n):
+        team_1, team_2 = map(guild.get_role, teams(n))
+        interaction = self._interaction(guild, 'cancel-match')
+        await invoke(
+            self.cogs['cancel'],
+            self.cogs['cancel'].do_it,
+            interaction,
+            team_1=team_1,
+            team_2=team_2
+        )
+        return interaction
+
+    async def calendar(self, guild, n):
+        interaction = self._interaction(guild, 'match-calendar')
+        await invoke(self.cogs['calendar'], self.cogs['calendar'].do_it, interaction)
+        return interaction
+
+    async def run_one(self, command, n, slots):
+        guild = self.guilds[n % len(self.guilds)]
+        async with slots:
+            began = time.perf_counter()
+            try:
+                interaction = await getattr(self, command)(guild, n)
+                answer = outcome(interaction)
+            except Exception as err:
+                answer = type(err).__name__
+            self.outcomes[command][answer] += 1
+            # a refusal takes a different path, so it is timed on its own
+            self.latencies[command, answer].append(time.perf_counter() - began)
+
+
+async def drain(storage, timeout: float) -> int:
+    '''Wait up to `timeout` for the outbox to empty; return what is left'''
+    deadline = time.perf_counter() + timeout
+    while True:
+        async with storage.reader() as db:
+            # nothing is backing off at the end of time, so this is every job
+            queued = len(await db.find_due_jobs(now=2**62, limit=2**31))
+        if not queued or time.perf_counter() >= deadline:
+            return queued
+        await asyncio.sleep(0.05)
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    latency = Latency(args.latency_ms, args.jitter_ms, args.seed)
+    roles = [StandInRole(STAFF, 'staff')] + [
+        StandInRole(r) for r in range(2, 2 * args.invocations + 4)
+    ]
+    guilds = [
+        StandInGuild(get_config().auth.server + g, roles, latency)
+        for g in range(args.guilds)
+    ]
+    plan = rng.choices(
+        ['schedule', 'cancel', 'calendar'],
+        weights=args.mix,
+        k=args.invocations
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = await MatchStorage(
+            DataSources(database=Path(tmp, 'match.db'), readers=args.readers)
+        ).open()
+        driver = Driver(storage, guilds, latency, rng)
+        outbox = OutboxDispatcher(
+            storage,
+            driver.bot,
+            Broadcaster(driver.bot, get_config().delivery),
+            get_config().delivery
+        )
+        await driver.seed(plan)
+        await outbox.cog_load()
+        slots = asyncio.Semaphore(args.concurrency or args.invocations)
+        lag, done = [], asyncio.Event()
+        probe = asyncio.create_task(probe_lag(args.probe_ms / 1000, lag, done))
+        try:
+            began = time.perf_counter()
+            await asyncio.gather(*(
+                driver.run_one(command, n, slots)
+                for n, command in enumerate(plan)
+            ))
+            elapsed = time.perf_counter() - began
+            queued = await drain(storage, args.drain_seconds)
+            delivery_elapsed = time.perf_counter() - began
+        finally:
+            done.set()
+            await probe
+            await outbox.cog_unload()
+            await storage.close()
+
+    print(
+        f'{args.invocations} invocations over {args.guilds} guilds, '
+        f'{args.concurrency or "unbounded"} in flight, Discord round trip '
+        f'{args.latency_ms:.0f}±{args.jitter_ms:.0f} ms'
+    )
+    print(
+        f'commands done in {elapsed:.2f} s '
+        f'({args.invocations / elapsed:.0f} commands/s); outbox '
+        f'{"drained" if not queued else f"still holds {queued} jobs"} after '
+        f'{delivery_elapsed:.2f} s'
+    )
+    for (command, answer), samples in sorted(driver.latencies.items()):
+        samples.sort()
+        print(
+            f'{command:>9} {answer:>10}: {len(samples):6d} | '
+            f'p50 {statistics.median(samples) * 1000:8.1f} ms, '
+            f'p95 {percentile(samples, 0.95) * 1000:8.1f} ms, '
+            f'p99 {percentile(samples, 0.99) * 1000:8.1f} ms, '
+            f'max {samples[-1] * 1000:8.1f} ms'
+        )
+    lag.sort()
+    print(
+        f'loop lag: p50 {statistics.median(lag) * 1000:.2f} ms, '
+        f'p99 {percentile(lag, 0.99) * 1000:.2f} ms, '
+        f'max {lag[-1] * 1000:.2f} ms ({len(lag)} probes)'
+    )
+    print(
+        'announcements delivered: '
+        f'{sum(len(c.sent) for g in guilds for c in g.channels.values())}'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--invocations', type=int, default=3000)
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=256,
+        help='invocations in flight at once; 0 fires them all together'
+    )
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--jitter-ms', type=float, default=40.0)
+    parser.add_argument('--guilds', type=int, default=1)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument(
+        '--mix',
+        type=float,
+        nargs=3,
+        default=[5, 2, 3],
+        metavar=('SCHEDULE', 'CANCEL', 'CALENDAR')
+    )
+    parser.add_argument('--probe-ms', type=float, default=1.0)
+    parser.add_argument(
+        '--drain-seconds',
+        type=float,
+        default=60.0,
+        help='how long to wait for the outbox to deliver what was queued'
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    # keep the bot's log lines off the report
+    logging.getLogger('match_scheduler_bot').setLevel(logging.CRITICAL)
+    asyncio.run(main(parser.parse_args()))
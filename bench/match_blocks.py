@@ -0,0 +1,148 @@
+"""
+    :module_name: match_blocks
+    :module_summary: memory and speed of bulk match reads, row objects against columns
+    :module_author: CountTails
+
+Reads a whole synthetic schedule three ways: as the plain dataclass rows the
+repository used to build, as the ``__slots__`` ``ScheduledMatch`` rows it
+builds now, and as an array backed ``MatchBlock``. For each, reports the
+time to read it, the memory the result keeps alive, and the time to select
+the matches starting in the next 30 minutes, the expired ones and this
+week's. Row lists are filtered with a comprehension, as the announcement
+loop once did; blocks bisect their start times. Usage::
+
+    python bench/match_blocks.py [--size N] [--repeat N]
+"""
+
+import argparse
+import gc
+import statistics
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+
+import match_scheduler_bot
+
+match_scheduler_bot.setup_config(
+    Path(__file__).resolve().parent.parent / 'bot.example.json'
+)
+
+from match_scheduler_bot.model.blocks import MatchBlock
+from match_scheduler_bot.model.matchlist import (
+    FIND_ALL_MATCHES,
+    MatchListRepository
+)
+from match_scheduler_bot.model.rows import MatchToSchedule
+
+
+BASE = 1_900_000_000
+CHUNK = 10_000
+LEAD = 30 * 60
+WEEK = 7 * 24 * 60 * 60
+
+
+@dataclass
+class DictMatch:
+    '''`ScheduledMatch` as it was before it had slots'''
+    start_time: int
+    team_1_id: int
+    team_2_id: int
+    guild_id: int = 0
+
+    @classmethod
+    def from_sql_row(cls, cursor, row):
+        return cls(row[0], row[1], row[2], row[3])
+
+
+def fill(repo: MatchListRepository, size: int) -> None:
+    # one match a minute, every pairing distinct
+    for start in range(0, size, CHUNK):
+        with repo as db:
+            db.insert_matches([
+                MatchToSchedule(BASE + 60 * i, i, size + i)
+                for i in range(start, min(size, start + CHUNK))
+            ])
+
+
+def timed(operation, repeat: int) -> float:
+    '''The median seconds `operation` takes, with the collector held off'''
+    samples = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            began = time.perf_counter()
+            operation()
+            samples.append(time.perf_counter() - began)
+    finally:
+        gc.enable()
+    return statistics.median(samples)
+
+
+def retained(read) -> int:
+    '''The bytes of Python objects still held by what `read` returns'''
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = read()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = MatchListRepository(str(Path(tmp, 'match.db')))
+        repo._conn.execute('PRAGMA synchronous = OFF')
+        fill(repo, args.size)
+
+        def read_dicts():
+            cursor = repo._conn.cursor()
+            cursor.row_factory = DictMatch.from_sql_row
+            return cursor.execute(FIND_ALL_MATCHES, (0,)).fetchall()
+
+        readers = {
+            'dataclass': read_dicts,
+            'slots': repo.find_all_matches,
+            'block': repo.find_match_block,
+        }
+        now = BASE + 60 * (args.size // 2)
+        windows = {
+            'next 30 min': (now + 1, now + LEAD + 1),
+            'expired': (0, now),
+            'this week': (now, now + WEEK),
+        }
+
+        print(f'{args.size} matches, median of {args.repeat} runs')
+        for name, read in readers.items():
+            held = retained(read)
+            took = timed(read, args.repeat)
+            rows = read()
+            line = [
+                f'{name:>9}: read {took * 1000:8.1f} ms, '
+                f'{held / 2**20:6.1f} MiB ({held / len(rows):5.1f} B/match)'
+            ]
+            for window, (lo, hi) in windows.items():
+                if isinstance(rows, MatchBlock):
+                    def select(lo=lo, hi=hi):
+                        return rows.between(lo, hi)
+                else:
+                    def select(lo=lo, hi=hi):
+                        return [m for m in rows if lo <= m.start_time < hi]
+                found = len(select())
+                line.append(
+                    f'{window} {timed(select, args.repeat) * 1000:8.3f} ms '
+                    f'({found})'
+                )
+            print(' | '.join(line))
+            del rows
+        repo._conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,314 @@
+"""
+    :module_name: suite
+    :module_summary: benchmark suite of the match repository and response rendering
+    :module_author: CountTails
+
+Fills a ``MatchListRepository`` with synthetic schedules of each size and
+times ``insert_match`` with and without a double-booking buffer,
+``find_clash``, ``delete_match``, ``find_upcoming_matches`` at several page
+depths and ``purge_expired``, then times
+``autocomplete_timezone`` and the embed factories in ``responses/``. The
+results are written as JSON. Given ``--compare``, the run is checked
+against a stored baseline and the exit status is 1 if any case's
+``--statistic`` grew by more than ``--tolerance`` and ``--floor-us``.
+Usage::
+
+    python bench/suite.py [--sizes 1000 100000 1000000] [--output FILE]
+                          [--compare FILE] [--tolerance 0.5] [--floor-us 5]
+                          [--statistic min_us]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import match_scheduler_bot
+
+# the bot package reads its command specs at import time
+match_scheduler_bot.setup_config(
+    Path(__file__).resolve().parent.parent / 'bot.example.json'
+)
+
+from match_scheduler_bot.bot.autocomplete import autocomplete_timezone
+from match_scheduler_bot.bot.responses.announcements import PublicLog
+from match_scheduler_bot.bot.responses.feedback import CommandSucceeded
+from match_scheduler_bot.model.matchlist import MatchListRepository
+from match_scheduler_bot.model.rows import (
+    MatchCursor,
+    MatchToCancel,
+    MatchToSchedule,
+    ScheduledMatch
+)
+
+# the Discord stand-ins are shared with the unit tests
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'test'))
+from discord_standin import StandInGuild, StandInInteraction
+
+
+BASE = 1_900_000_000
+CHUNK = 50_000
+DEPTHS = (0.0, 0.01, 0.5, 0.99)
+BUFFER = 90 * 60
+TYPED = ['a', 'am', 'america/n', 'europe/london', 'tokyo', 'utc', 'zzz']
+
+Results = Dict[str, Dict[str, float]]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        'min_us': round(samples[0] * 1e6, 2),
+        'median_us': round(statistics.median(samples) * 1e6, 2),
+        'p95_us': round(samples[int((len(samples) - 1) * 0.95)] * 1e6, 2),
+        'samples': len(samples)
+    }
+
+
+def sample(
+    operation: Callable[[], object],
+    repeat: int,
+    warmup: int = 0
+) -> Dict[str, float]:
+    for _ in range(warmup):
+        operation()
+    samples = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            began = time.perf_counter()
+            operation()
+            samples.append(time.perf_counter() - began)
+    finally:
+        gc.enable()
+    return summarize(samples)
+
+
+def synthetic(size: int) -> List[MatchToSchedule]:
+    '''One match a minute, every pairing distinct'''
+    return [MatchToSchedule(BASE + 60 * i, i, size + i) for i in range(size)]
+
+
+def fill(repo: MatchListRepository, size: int) -> None:
+    matches = synthetic(size)
+    for start in range(0, size, CHUNK):
+        with repo as db:
+            db.insert_matches(matches[start:start + CHUNK])
+
+
+def bench_repository(path: Path, size: int, repeat: int) -> Results:
+    results: Results = {}
+    repo = MatchListRepository(str(path))
+    # time the statements, not the disk: fsync latency swamps them otherwise
+    repo._conn.execute('PRAGMA synchronous = OFF')
+    began = time.perf_counter()
+    fill(repo, size)
+    print(f'  filled {size} matches in {time.perf_counter() - began:.1f} s')
+
+    def write(operation):
+        with repo as db:
+            operation(db)
+
+    extra = iter(range(repeat))
+    results['insert_match'] = sample(lambda: write(lambda db: db.insert_match(
+        MatchToSchedule(
+            BASE + 60 * random.randrange(size) + 1,
+            3 * size + next(extra),
+            4 * size
+        )
+    )), repeat)
+    # fresh pairs, so only the buffer check stands between them and the table
+    extra = iter(range(repeat))
+    results['insert_match[buffered]'] = sample(lambda: write(lambda db: (
+        lambda team: db.insert_match(
+            MatchToSchedule(BASE + 60 * random.randrange(size) + 1, team, team + 1),
+            buffer_seconds=BUFFER
+        )
+    )(5 * size + 2 * next(extra))), repeat)
+    # a team of the synthetic schedule, against its own match
+    results['find_clash'] = sample(lambda: (
+        lambda at: repo.find_clash(
+            MatchToSchedule(BASE + 60 * at + 30, at, 7 * size),
+            BUFFER
+        )
+    )(random.randrange(size)), repeat)
+    extra = iter(range(repeat))
+    results['delete_match'] = sample(lambda: write(lambda db: db.delete_match(
+        MatchToCancel(3 * size + next(extra), 4 * size)
+    )), repeat)
+
+    for depth in DEPTHS:
+        at = int((size - 1) * depth)
+        after = None if at == 0 else MatchCursor(BASE + 60 * at, at, size + at)
+        results[f'find_upcoming_matches[depth={depth:.0%}]'] = sample(
+            lambda: repo.find_upcoming_matches(
+                not_before=BASE - 1,
+                page_size=10,
+                after=after
+            ),
+            repeat
+        )
+
+    # each run expires the next ten oldest matches
+    expiring = iter(range(1, repeat + 1))
+    results['purge_expired[10 rows]'] = sample(lambda: write(
+        lambda db: db.purge_expired(BASE + 60 * 10 * next(expiring))
+    ), repeat)
+    return results
+
+
+def bench_rendering(repeat: int) -> Results:
+    # these take microseconds, so they get more runs to settle the median
+    repeat *= 10
+    interaction = StandInInteraction(StandInGuild())
+    guild = interaction.guild
+    match = ScheduledMatch(BASE, 1, 2)
+    season = [ScheduledMatch(BASE + 60 * i, i, 1000 + i) for i in range(300)]
+
+    async def autocomplete() -> List[float]:
+        samples = []
+        for current in TYPED:
+            await autocomplete_timezone(interaction, current)
+        for _ in range(repeat):
+            for current in TYPED:
+                began = time.perf_counter()
+                await autocomplete_timezone(interaction, current)
+                samples.append(time.perf_counter() - began)
+        return samples
+
+    factories = {
+        'CommandSucceeded.created_match': lambda: CommandSucceeded.created_match(
+            interaction,
+            match
+        ),
+        'CommandSucceeded.got_match[10]': lambda: CommandSucceeded.got_match(
+            interaction,
+            season[:10]
+        ).messages(),
+        'PublicLog.match_scheduled': lambda: PublicLog.match_scheduled(
+            guild,
+            match
+        ),
+        'PublicLog.matches_imported[300]': lambda: PublicLog.matches_imported(
+            guild,
+            season
+        ).messages(),
+        'PublicLog.matches_starting_soon[5]': lambda: PublicLog.matches_starting_soon(
+            guild,
+            season[:5]
+        ).messages(),
+    }
+    results = {'autocomplete_timezone': summarize(asyncio.run(autocomplete()))}
+    for case, factory in factories.items():
+        results[case] = sample(factory, repeat, warmup=repeat // 10)
+    return results
+
+
+def run(sizes: List[int], repeat: int) -> Dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            print(f'repository with {size} matches')
+            for case, summary in bench_repository(
+                Path(tmp, f'{size}.db'),
+                size,
+                repeat
+            ).items():
+                results[f'repository/{case}@{size}'] = summary
+    print('rendering')
+    for case, summary in bench_rendering(repeat).items():
+        results[f'rendering/{case}'] = summary
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'sizes': sizes,
+            'repeat': repeat,
+        },
+        'results': results
+    }
+
+
+def compare(
+    run: Dict,
+    baseline: Dict,
+    tolerance: float,
+    floor_us: float,
+    statistic: str
+) -> List[str]:
+    '''
+        Print every case next to its baseline; return the regressed ones.
+        Growth under `floor_us` is timer noise and never counts.
+    '''
+    regressed = []
+    for case, current in run['results'].items():
+        stored = baseline['results'].get(case)
+        if stored is None:
+            print(f'{case:<58} {current[statistic]:>11.1f} us        (new)')
+            continue
+        ratio = current[statistic] / max(stored[statistic], 0.01)
+        flag = ''
+        if ratio > 1 + tolerance and \
+                current[statistic] - stored[statistic] > floor_us:
+            regressed.append(case)
+            flag = '  REGRESSED'
+        print(
+            f'{case:<58} {current[statistic]:>11.1f} us '
+            f'{stored[statistic]:>11.1f} us {ratio:6.2f}x{flag}'
+        )
+    return regressed
+
+
+def main(args: argparse.Namespace) -> int:
+    result = run(args.sizes, args.repeat)
+    if args.output is not None:
+        Path(args.output).write_text(json.dumps(result, indent=2) + '\n')
+        print(f'wrote {args.output}')
+    if args.compare is None:
+        for case, summary in result['results'].items():
+            print(
+                f'{case:<58} {summary["min_us"]:>11.1f} us min '
+                f'{summary["median_us"]:>11.1f} us median'
+            )
+        return 0
+    regressed = compare(
+        result,
+        json.loads(Path(args.compare).read_text()),
+        args.tolerance,
+        args.floor_us,
+        args.statistic
+    )
+    if regressed:
+        print(f'{len(regressed)} cases regressed beyond {args.tolerance:.0%}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        default=[1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='a JSON baseline to check against')
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument('--floor-us', type=float, default=5.0)
+    # the fastest run is the one least disturbed by the rest of the host
+    parser.add_argument(
+        '--statistic',
+        choices=['min_us', 'median_us', 'p95_us'],
+        default='min_us'
+    )
+    sys.exit(main(parser.parse_args()))
@@ -13,12 +13,13 @@ from typing import Optional
 from pathlib import Path
 
 from .exceptions import MissingConfigurationError, BadConfigurationError
-from .model import BotConfig
+from .model import BotConfig, CommandSpec
 
 import pydantic
 
 __LOGGER__ = logging.getLogger(__name__)
 __CONFIG__: Optional[BotConfig] = None
+__CONFIG_PATH__: Optional[Path] = None
 __VERSION__ = (0, 1, 1)
 
 
@@ -33,20 +34,20 @@ def setup_logging(config: str) -> None:
         atexit.register(qhandler.listener.stop)
 
 
-def setup_config(config: str | Path) -> None:
-    global __CONFIG__
+def load_config(config: str | Path) -> BotConfig:
+    '''Read and validate a config file without putting it to use'''
     try:
         __LOGGER__.debug('Opening config file: %s', config)
         with open(config) as f_in:
             __LOGGER__.debug(
                 'Validating JSON structure conforms to config'
             )
-            config = BotConfig.model_validate_json(
+            loaded = BotConfig.model_validate_json(
                 f_in.read(),
                 strict=True
             )
             __LOGGER__.debug('JSON structure is conforming')
-            __CONFIG__ = config
+            return loaded
     except FileNotFoundError as err:
         __LOGGER__.error('Config file `%s` does not exist', config)
         raise MissingConfigurationError(
@@ -61,6 +62,28 @@ def setup_config(config: str | Path) -> None:
         ) from err
 
 
+def setup_config(config: str | Path) -> None:
+    global __CONFIG__, __CONFIG_PATH__
+    __CONFIG__ = load_config(config)
+    __CONFIG_PATH__ = Path(config)
+
+
+def replace_config(config: BotConfig) -> BotConfig:
+    '''
+        Put an already validated config to use and return the one it
+        replaces. Readers see either the old or the new config, never a mix.
+    '''
+    global __CONFIG__
+    previous, __CONFIG__ = get_config(), config
+    return previous
+
+
+def get_config_path() -> Path:
+    if __CONFIG_PATH__ is None:
+        raise MissingConfigurationError('No configuration loaded')
+    return __CONFIG_PATH__
+
+
 def get_config() -> BotConfig:
     global __CONFIG__
     if __CONFIG__ is None:
@@ -69,3 +92,20 @@ def get_config() -> BotConfig:
         )
         raise MissingConfigurationError('No configuration loaded')
     return __CONFIG__
+
+
+class LiveSpec:
+    '''
+        The spec of one command as configured right now. Attributes are
+        read from the current config on every access, so they follow reloads.
+    '''
+
+    def __init__(self, command: str):
+        self.command = command
+
+    def __getattr__(self, name: str):
+        return getattr(get_config().cmds[self.command], name)
+
+    def for_guild(self, guild_id: Optional[int]) -> CommandSpec:
+        '''The current spec with the overrides of `guild_id` applied'''
+        return get_config().spec_for(self.command, guild_id)
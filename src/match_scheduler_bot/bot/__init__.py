@@ -4,51 +4,235 @@
     :module_author: CountTails
 '''
 
+import importlib
 import logging
+import sys
+from typing import Any, Dict, Tuple
 
 import discord
 from discord.ext import commands
 
-from .. import get_config
+from .. import get_config, get_config_path, replace_config
+from ..model import BotConfig
+from ..model.storage import MatchStorage
+from .delivery import Broadcaster
+from .hotreload import ConfigWatcher, changed_signatures
+from .feeds import CalendarFeed
+from .monitoring import MetricsEndpoint
+from .outbox import OutboxDispatcher
+from .startup import StartupPhases, sync_command_tree
 from .cogs import (
     AddMatchCommand,
     DeleteMatchCommand,
-    GetMatchCommand
+    GetMatchCommand,
+    ImportMatchCommand
 )
 
 
 __LOGGER__ = logging.getLogger(__name__)
 __BOT__ = None
+__STORAGE__ = None
+__BROADCASTER__ = None
 
 print(get_config())
 
 
-def use_bot() -> commands.Bot:
-    global __BOT__
-    if __BOT__ is None:
-        __LOGGER__.info('First request for bot instance, initializing...')
-        __BOT__ = commands.Bot(
+def use_storage() -> MatchStorage:
+    global __STORAGE__
+    if __STORAGE__ is None:
+        __LOGGER__.info('First request for match storage, initializing...')
+        __STORAGE__ = MatchStorage(
+            get_config().data,
+            legacy_guild_id=get_config().auth.server,
+            sharding=get_config().sharding
+        )
+    return __STORAGE__
+
+
+def use_broadcaster() -> Broadcaster:
+    global __BROADCASTER__
+    if __BROADCASTER__ is None:
+        __LOGGER__.info('First request for broadcaster, initializing...')
+        __BROADCASTER__ = Broadcaster(use_bot(), get_config().delivery)
+    return __BROADCASTER__
+
+
+class MatchSchedulerMixin:
+    '''
+        Everything that must happen once per process lives in `setup_hook`,
+        which discord.py runs a single time after login. `on_ready` fires
+        again after every reconnect, so it only reports readiness.
+    '''
+
+    def __init__(self, **kwargs):
+        super().__init__(
             command_prefix=commands.when_mentioned_or('!'),
             intents=discord.Intents(
                 **get_config().auth.intents
-            )
+            ),
+            **kwargs
         )
+        self.startup = StartupPhases()
+        self.metrics: MetricsEndpoint | None = None
+        self.feed: CalendarFeed | None = None
+        self.config_watcher: ConfigWatcher | None = None
+        # command key -> (module, cog class name, constructor arguments)
+        self._command_cogs: Dict[str, Tuple[str, str, Tuple[Any, ...]]] = {}
+
+    async def _add_command_cog(self, cog_type: type, *args: Any) -> None:
+        '''Add a slash command cog, remembering how to build it again'''
+        await self.add_cog(cog_type(*args))
+        key = sys.modules[cog_type.__module__].__KEY__
+        self._command_cogs[key] = (cog_type.__module__, cog_type.__name__, args)
+        __LOGGER__.info('Added extension: %s', cog_type.__name__)
+
+    @property
+    def syncs_commands(self) -> bool:
+        '''Commands are global, so one process of a shard group syncs them'''
+        sharding = get_config().sharding
+        return not sharding.partitioned or 0 in sharding.shard_ids
 
-        @__BOT__.event
-        async def on_ready():
-            __LOGGER__.info('Responding to event `on_ready`')
-            await __BOT__.add_cog(AddMatchCommand(get_config().data.database))
-            __LOGGER__.info('Added extension: %s', AddMatchCommand.__name__)
-            await __BOT__.add_cog(DeleteMatchCommand(get_config().data.database))
-            __LOGGER__.info('Added extension: %s', DeleteMatchCommand.__name__)
-            await __BOT__.add_cog(GetMatchCommand(
-                get_config().data.database,
-                __BOT__
+    async def apply_config(self, config: BotConfig) -> bool:
+        '''
+            Serve a reloaded config. Cogs read their specs live, so only the
+            commands whose signature changed are rebuilt from their modules,
+            and only then is the command tree synced. Returns whether any
+            command was rebuilt. If a rebuilt command is rejected, the
+            previous config is restored.
+        '''
+        previous = replace_config(config)
+        changed = sorted(changed_signatures(previous, config))
+        if not changed:
+            __LOGGER__.info('Config reloaded, no command signature changed')
+            return False
+        __LOGGER__.info('Config reloaded, rebuilding commands: %s', changed)
+        modules = [self._command_cogs[key][0] for key in changed]
+        try:
+            rebuilt = [importlib.reload(sys.modules[name]) for name in modules]
+        except Exception:
+            __LOGGER__.exception('Rejected the reloaded commands, restoring config')
+            replace_config(previous)
+            for name in modules:
+                importlib.reload(sys.modules[name])
+            return False
+        for key, module in zip(changed, rebuilt):
+            _, cog_name, args = self._command_cogs[key]
+            await self.remove_cog(cog_name)
+            await self._add_command_cog(getattr(module, cog_name), *args)
+        if self.syncs_commands:
+            await sync_command_tree(self.tree, use_storage(), self.application_id)
+        return True
+
+    async def setup_hook(self):
+        options = get_config().metrics
+        if options.enabled:
+            sharding = get_config().sharding
+            with self.startup.phase('start metrics endpoint'):
+                # shard processes on one host listen next to each other
+                self.metrics = MetricsEndpoint(
+                    options,
+                    port=options.port + (
+                        min(sharding.shard_ids) if sharding.partitioned else 0
+                    )
+                )
+                await self.metrics.start()
+        with self.startup.phase('open storage'):
+            storage = await use_storage().open()
+        feed = get_config().feed
+        if feed.enabled:
+            sharding = get_config().sharding
+            with self.startup.phase('start calendar feed'):
+                self.feed = CalendarFeed(
+                    feed,
+                    storage.schedule,
+                    self,
+                    port=feed.port + (
+                        min(sharding.shard_ids) if sharding.partitioned else 0
+                    )
+                )
+                await self.feed.start()
+        with self.startup.phase('load extensions'):
+            await self.add_cog(OutboxDispatcher(
+                storage,
+                self,
+                use_broadcaster(),
+                get_config().delivery
             ))
-            __LOGGER__.info('Added extension: %s', GetMatchCommand.__name__)
-            __LOGGER__.debug('Synchronizing command tree with discord')
-            await __BOT__.tree.sync()
-            __LOGGER__.debug('Command tree synchronized')
+            __LOGGER__.info('Added extension: %s', OutboxDispatcher.__name__)
+            await self._add_command_cog(AddMatchCommand, storage)
+            await self._add_command_cog(DeleteMatchCommand, storage)
+            await self._add_command_cog(GetMatchCommand, storage, self)
+            await self._add_command_cog(ImportMatchCommand, storage)
+        reload = get_config().reload
+        if reload.enabled:
+            self.config_watcher = ConfigWatcher(
+                get_config_path(),
+                reload.interval_seconds,
+                self.apply_config
+            )
+            self.config_watcher.start()
+        if not self.syncs_commands:
+            __LOGGER__.info('Leaving command sync to the process of shard 0')
+            return
+        with self.startup.phase('sync command tree'):
+            await sync_command_tree(self.tree, storage, self.application_id)
+
+    async def on_ready(self):
+        if 'connect' not in self.startup.durations:
+            # login and the gateway handshake, i.e. whatever setup_hook did not
+            self.startup.durations['connect'] = self.startup.elapsed() \
+                - sum(self.startup.durations.values())
+            __LOGGER__.info(
+                'Ready as %s after %.1f ms (connect %.1f ms)',
+                self.user,
+                self.startup.elapsed() * 1000,
+                self.startup.durations['connect'] * 1000
+            )
+        else:
+            __LOGGER__.info('Ready again as %s after reconnecting', self.user)
+
+    async def close(self):
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+        await super().close()
+        if self.metrics is not None:
+            await self.metrics.stop()
+        if self.feed is not None:
+            await self.feed.stop()
+        await use_storage().close()
+
+
+class MatchSchedulerBot(MatchSchedulerMixin, commands.Bot):
+    '''The bot on a single gateway connection'''
+
+
+class ShardedMatchSchedulerBot(MatchSchedulerMixin, commands.AutoShardedBot):
+    '''
+        The bot on several gateway shards. Given `shard_ids`, it runs only
+        those and leaves the rest of `shard_count` to other processes.
+    '''
+
+    async def on_shard_ready(self, shard_id: int):
+        __LOGGER__.info(
+            'Shard %d of %d ready after %.1f ms',
+            shard_id,
+            self.shard_count,
+            self.startup.elapsed() * 1000
+        )
+
+
+def use_bot() -> MatchSchedulerBot | ShardedMatchSchedulerBot:
+    global __BOT__
+    if __BOT__ is None:
+        __LOGGER__.info('First request for bot instance, initializing...')
+        sharding = get_config().sharding
+        if sharding.enabled:
+            __BOT__ = ShardedMatchSchedulerBot(
+                shard_count=sharding.shard_count,
+                shard_ids=sharding.shard_ids
+            )
+        else:
+            __BOT__ = MatchSchedulerBot()
 
     __LOGGER__.info('Returning the singleton bot instance')
     return __BOT__
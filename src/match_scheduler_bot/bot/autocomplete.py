@@ -4,9 +4,14 @@
     :module_author: CountTails
 '''
 
+from __future__ import annotations
+
+import functools
+import heapq
 import logging
+import re
 import zoneinfo
-from typing import Set, List
+from typing import Dict, Iterable, List, Set, Tuple
 
 import discord
 from discord import app_commands
@@ -15,6 +20,134 @@ from discord import app_commands
 __LOGGER__ = logging.getLogger(__name__)
 timezones: Set[str] = zoneinfo.available_timezones()
 
+# common abbreviations players type instead of an IANA key
+TIMEZONE_ALIASES: Dict[str, str] = {
+    'est': 'America/New_York',
+    'edt': 'America/New_York',
+    'et': 'America/New_York',
+    'cst': 'America/Chicago',
+    'cdt': 'America/Chicago',
+    'ct': 'America/Chicago',
+    'mst': 'America/Denver',
+    'mdt': 'America/Denver',
+    'mt': 'America/Denver',
+    'pst': 'America/Los_Angeles',
+    'pdt': 'America/Los_Angeles',
+    'pt': 'America/Los_Angeles',
+    'akst': 'America/Anchorage',
+    'hst': 'Pacific/Honolulu',
+    'gmt': 'UTC',
+    'utc': 'UTC',
+    'bst': 'Europe/London',
+    'cet': 'Europe/Paris',
+    'cest': 'Europe/Paris',
+    'eet': 'Europe/Athens',
+    'ist': 'Asia/Kolkata',
+    'jst': 'Asia/Tokyo',
+    'kst': 'Asia/Seoul',
+    'aest': 'Australia/Sydney',
+    'brt': 'America/Sao_Paulo',
+}
+
+# ranks, best first
+_EXACT, _PREFIX, _SEGMENT, _SUBSTRING = range(4)
+_SEGMENT_SPLIT = re.compile(r'[/_\-+]')
+
+
+class _Trie:
+    '''A prefix tree whose nodes remember every value stored beneath them'''
+
+    __slots__ = ('children', 'values')
+
+    def __init__(self):
+        self.children: Dict[str, _Trie] = {}
+        self.values: Set[str] = set()
+
+    def insert(self, word: str, value: str) -> None:
+        node = self
+        node.values.add(value)
+        for char in word:
+            node = node.children.setdefault(char, _Trie())
+            node.values.add(value)
+
+    def find(self, prefix: str) -> Set[str]:
+        node = self
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.values
+
+
+class TimezoneIndex:
+    '''
+        Built once from the available zone names. Lookups walk a trie of
+        full names and a trie of name segments (so "york" finds
+        "America/New_York"), then fall back to a substring scan of the
+        pre-lowercased names only when the tries cannot fill a page.
+        Results are ranked exact, prefix, segment, substring and recent
+        queries are answered from a small LRU cache.
+    '''
+
+    def __init__(
+        self,
+        zones: Iterable[str],
+        aliases: Dict[str, str] = TIMEZONE_ALIASES,
+        cache_size: int = 512
+    ):
+        self._zones: List[Tuple[str, str]] = sorted(
+            (zone.lower(), zone) for zone in zones
+        )
+        known = {zone for _, zone in self._zones}
+        self._exact: Dict[str, Set[str]] = {}
+        self._names = _Trie()
+        self._segments = _Trie()
+        for lowered, zone in self._zones:
+            self._exact.setdefault(lowered, set()).add(zone)
+            self._names.insert(lowered, zone)
+            for segment in {lowered} | set(_SEGMENT_SPLIT.split(lowered)):
+                if segment:
+                    self._segments.insert(segment, zone)
+        for alias, zone in aliases.items():
+            if zone in known:
+                self._exact.setdefault(alias, set()).add(zone)
+                self._names.insert(alias, zone)
+        self._popular = list(dict.fromkeys(
+            zone for zone in aliases.values() if zone in known
+        ))
+        self.search = functools.lru_cache(maxsize=cache_size)(self._search)
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    def _search(self, query: str, limit: int = 25) -> Tuple[str, ...]:
+        query = query.strip().lower()
+        if not query:
+            return tuple(self._popular[:limit])
+
+        ranked: Dict[str, int] = {}
+
+        def rank(zones: Iterable[str], tier: int) -> None:
+            for zone in zones:
+                ranked.setdefault(zone, tier)
+
+        rank(self._exact.get(query, ()), _EXACT)
+        rank(self._names.find(query), _PREFIX)
+        rank(self._segments.find(query), _SEGMENT)
+        if len(ranked) < limit:
+            rank(
+                (zone for lowered, zone in self._zones if query in lowered),
+                _SUBSTRING
+            )
+        return tuple(heapq.nsmallest(
+            limit,
+            ranked,
+            key=lambda zone: (ranked[zone], len(zone), zone)
+        ))
+
+
+TIMEZONE_INDEX = TimezoneIndex(timezones)
+
 
 async def autocomplete_timezone(
     interaction: discord.Interaction,
@@ -26,5 +159,5 @@ async def autocomplete_timezone(
     )
     return [
         discord.app_commands.Choice(name=tz, value=tz)
-        for tz in timezones if current.lower() in tz.lower()
-    ][:25]
+        for tz in TIMEZONE_INDEX.search(current)
+    ]
@@ -0,0 +1,40 @@
+'''
+    :module_name: checks
+    :module_summary: app command checks that read their settings per guild
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import logging
+
+from .. import get_config
+
+import discord
+from discord import app_commands
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+
+def has_any_configured_role(command: str):
+    '''
+        Like `app_commands.checks.has_any_role`, but the roles are the
+        allowlist of `command` for the guild the command is used in, so every
+        guild may allow its own roles. A missing allowlist allows everyone.
+    '''
+    def predicate(interaction: discord.Interaction) -> bool:
+        if not isinstance(interaction.user, discord.Member):
+            raise app_commands.NoPrivateMessage()
+        allowlist = get_config().spec_for(command, interaction.guild_id).allowlist
+        if allowlist is None:
+            return True
+        for item in allowlist:
+            if isinstance(item, int):
+                if interaction.user.get_role(item) is not None:
+                    return True
+            elif discord.utils.get(interaction.user.roles, name=item):
+                return True
+        raise app_commands.MissingAnyRole(list(allowlist))
+
+    return app_commands.check(predicate)
@@ -7,3 +7,4 @@
 from .addmatch import AddMatchCommand
 from .delmatch import DeleteMatchCommand
 from .getmatch import GetMatchCommand
+from .importmatch import ImportMatchCommand
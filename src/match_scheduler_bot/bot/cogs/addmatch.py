@@ -8,38 +8,40 @@ from __future__ import annotations
 import logging
 import datetime
 
-from ...model.matchlist import MatchListRepository
+from ...model.matchlist import AsyncMatchListRepository
+from ...model.storage import MatchStorage
 from ...model.rows import MatchToSchedule, ScheduledMatch
 from ...exceptions import (
     MatchSchedulingException
 )
-from ... import get_config
+from ... import LiveSpec, get_config
 from ..autocomplete import autocomplete_timezone
 from ..validators import (
     date_in_near_future,
     date_parts
 )
+from ...metrics import CommandTimer
+from ..checks import has_any_configured_role
+from ..outbox import publish
 from ..responses.feedback import (
     AcknowledgeCommandUsage,
     CommandSucceeded,
     CommandFailed
 )
-from ..responses.announcements import (
-    PublicLog,
-)
 
 import discord
 from discord.ext import commands
 
 
 __LOGGER__ = logging.getLogger(__name__)
-__SPEC__ = get_config().cmds["create_match"]
+__KEY__ = "create_match"
+__SPEC__ = LiveSpec(__KEY__)
 
 
 class AddMatchCommand(commands.Cog):
 
-    def __init__(self, matchdb: str):
-        self.matchlist = MatchListRepository(matchdb)
+    def __init__(self, storage: MatchStorage):
+        self.storage = storage
 
     @discord.app_commands.command(
         name=__SPEC__.invoke_with,
@@ -54,9 +56,7 @@ class AddMatchCommand(commands.Cog):
     @discord.app_commands.autocomplete(
         timezone=autocomplete_timezone
     )
-    @discord.app_commands.checks.has_any_role(
-        *__SPEC__.allowlist
-    )
+    @has_any_configured_role(__KEY__)
     async def do_it(
         self,
         interaction: discord.Interaction,
@@ -69,6 +69,7 @@ class AddMatchCommand(commands.Cog):
         minute: discord.app_commands.Range[int, 0, 59],
         timezone: str
     ):
+        timer = CommandTimer(__KEY__)
         try:
             await interaction.response.send_message(
                 content=AcknowledgeCommandUsage.create_match_used(
@@ -79,6 +80,7 @@ class AddMatchCommand(commands.Cog):
                 ephemeral=True,
                 delete_after=1
             )
+            timer.lap('acknowledge')
             __LOGGER__.info(
                 '/%s invoked by user %s',
                 interaction.command.name,
@@ -94,15 +96,32 @@ class AddMatchCommand(commands.Cog):
                 timezone
             ))
             __LOGGER__.debug('Provided date/time is valid')
-            with self.matchlist as db:
+            timer.lap('validate')
+            proposed = MatchToSchedule.with_determistic_team_ordering(
+                round(as_dt.timestamp()),
+                team_1.id,
+                team_2.id,
+                interaction.guild_id
+            )
+
+            async def schedule(db: AsyncMatchListRepository) -> ScheduledMatch:
                 __LOGGER__.debug('Inserting proposed match into matchlist')
-                scheduled = db.insert_match(
-                    MatchToSchedule.with_determistic_team_ordering(
-                        round(as_dt.timestamp()),
-                        team_1.id,
-                        team_2.id
-                    )
+                scheduled = await db.insert_match(
+                    proposed,
+                    buffer_seconds=60 * get_config().scheduling.buffer_minutes
+                )
+                await publish(
+                    db,
+                    interaction.guild_id,
+                    __KEY__,
+                    __SPEC__.for_guild(interaction.guild_id).respond.everywhere,
+                    'match_scheduled',
+                    [scheduled]
                 )
+                return scheduled
+
+            scheduled = await self.storage.write(schedule)
+            timer.lap('store')
             __LOGGER__.info('Match successfully added')
             await interaction.followup.send(
                 embed=CommandSucceeded.created_match(
@@ -111,31 +130,15 @@ class AddMatchCommand(commands.Cog):
                 ),
                 ephemeral=True
             )
-            announcement = PublicLog.match_scheduled(
-                interaction,
-                scheduled
-            )
-            __LOGGER__.info('Publishing schuduled match to public bulletin')
-            await interaction.guild.get_channel(
-                __SPEC__.respond.public.channel_id
-            ).send(
-                embed=announcement
-            )
-            __LOGGER__.info('Alerting staff of new scheduled match')
-            await interaction.guild.get_channel(
-                __SPEC__.respond.audit.channel_id
-            ).send(
-                content=interaction.guild.get_role(
-                    __SPEC__.respond.audit.mention[0]
-                ).mention,
-                embed=announcement
-            )
+            timer.lap('followup')
         except MatchSchedulingException as err:
             __LOGGER__.error('Match scheduling prevented: %s', err.what)
             await interaction.followup.send(
                 embed=CommandFailed.managed_failure(err),
                 ephemeral=True
             )
+        finally:
+            timer.done()
 
     @do_it.error
     async def cannot_do_it(
@@ -154,7 +157,7 @@ class AddMatchCommand(commands.Cog):
                     interaction,
                     [
                         interaction.guild.get_role(r)
-                        for r in __SPEC__.allowlist
+                        for r in __SPEC__.for_guild(interaction.guild_id).allowlist
                         if interaction.guild.get_role(r) is not None
                     ]
                 ),
@@ -7,34 +7,50 @@
 from __future__ import annotations
 import logging
 import datetime
+import time
+from typing import List, Optional
 
-from ...model.matchlist import MatchListRepository
+from ...model.matchlist import AsyncMatchListRepository
+from ...model.storage import MatchStorage
 from ...model.rows import ScheduledMatch, MatchToCancel
 from ...exceptions import MatchCancellationException
-from ... import get_config
+from ... import LiveSpec, get_config
+from ...metrics import CommandTimer
+from ..checks import has_any_configured_role
+from ..outbox import publish
 from ..responses.feedback import (
     AcknowledgeCommandUsage,
     CommandSucceeded,
     CommandFailed
 )
-from ..responses.announcements import (
-    PublicLog,
-)
+from ..timers import DeadlineTimer
 
 import discord
 from discord.ext import commands
-from discord.ext import tasks
 
 
 __LOGGER__ = logging.getLogger(__name__)
-__SPEC__ = get_config().cmds["delete_match"]
+__KEY__ = "delete_match"
+__SPEC__ = LiveSpec(__KEY__)
 
 
 class DeleteMatchCommand(commands.Cog):
 
-    def __init__(self, matchdb: str):
-        self.matchlist = MatchListRepository(matchdb)
-        self.remove_past_matches.start()
+    def __init__(self, storage: MatchStorage):
+        self.storage = storage
+        self.expirer = DeadlineTimer(
+            'remove past matches',
+            self._next_expiry,
+            self.remove_past_matches
+        )
+
+    async def cog_load(self):
+        self.storage.schedule.watch(self._schedule_changed)
+        self.expirer.start()
+
+    async def cog_unload(self):
+        self.expirer.stop()
+        self.storage.schedule.unwatch(self._schedule_changed)
 
     @discord.app_commands.command(
         name=__SPEC__.invoke_with,
@@ -46,15 +62,14 @@ class DeleteMatchCommand(commands.Cog):
     @discord.app_commands.rename(
         **__SPEC__.renames
     )
-    @discord.app_commands.checks.has_any_role(
-        *__SPEC__.allowlist
-    )
+    @has_any_configured_role(__KEY__)
     async def do_it(
         self,
         interaction: discord.Interaction,
         team_1: discord.Role,
         team_2: discord.Role
     ):
+        timer = CommandTimer(__KEY__)
         try:
             await interaction.response.send_message(
                 content=AcknowledgeCommandUsage.delete_match_used(
@@ -65,19 +80,33 @@ class DeleteMatchCommand(commands.Cog):
                 ephemeral=True,
                 delete_after=1
             )
+            timer.lap('acknowledge')
             __LOGGER__.info(
                 '/%s invoked by user %s',
                 interaction.command.name,
                 interaction.user.display_name
             )
-            with self.matchlist as db:
+            requested = MatchToCancel.with_determistic_team_ordering(
+                team_1.id,
+                team_2.id,
+                interaction.guild_id
+            )
+
+            async def cancel(db: AsyncMatchListRepository) -> ScheduledMatch:
                 __LOGGER__.debug('Removing requested match from match list')
-                cancelled = db.delete_match(
-                    MatchToCancel.with_determistic_team_ordering(
-                        team_1.id,
-                        team_2.id
-                    )
+                cancelled = await db.delete_match(requested)
+                await publish(
+                    db,
+                    interaction.guild_id,
+                    __KEY__,
+                    __SPEC__.for_guild(interaction.guild_id).respond.everywhere,
+                    'match_cancelled',
+                    [cancelled]
                 )
+                return cancelled
+
+            cancelled = await self.storage.write(cancel)
+            timer.lap('store')
             __LOGGER__.info('Match successfully cancelled')
             await interaction.followup.send(
                 embed=CommandSucceeded.deleted_match(
@@ -86,31 +115,15 @@ class DeleteMatchCommand(commands.Cog):
                 ),
                 ephemeral=True
             )
-            announcement = PublicLog.match_cancelled(
-                interaction,
-                cancelled
-            )
-            __LOGGER__.info('Publishing match cancellation to public bulletin')
-            await interaction.guild.get_channel(
-                __SPEC__.respond.public.channel_id
-            ).send(
-                embed=announcement
-            )
-            __LOGGER__.info('Alerting staff of cancelled match')
-            await interaction.guild.get_channel(
-                __SPEC__.respond.audit.channel_id
-            ).send(
-                content=interaction.guild.get_role(
-                    __SPEC__.respond.audit.mention[0]
-                ).mention,
-                embed=announcement
-            )
+            timer.lap('followup')
         except MatchCancellationException as err:
             __LOGGER__.error('Match cancellation prevented: %s', err.what)
             await interaction.followup.send(
                 embed=CommandFailed.managed_failure(err),
                 ephemeral=True
             )
+        finally:
+            timer.done()
 
     @do_it.error
     async def cannot_do_it(
@@ -129,7 +142,7 @@ class DeleteMatchCommand(commands.Cog):
                     interaction,
                     [
                         interaction.guild.get_role(r)
-                        for r in __SPEC__.allowlist
+                        for r in __SPEC__.for_guild(interaction.guild_id).allowlist
                         if interaction.guild.get_role(r) is not None
                     ]
                 ),
@@ -142,18 +155,43 @@ class DeleteMatchCommand(commands.Cog):
                 ephemeral=True
             )
 
-    @tasks.loop(seconds=60)
-    async def remove_past_matches(self):
+    @staticmethod
+    def _grace() -> int:
+        return round(datetime.timedelta(
+            minutes=get_config().data.expiry_grace_minutes
+        ).total_seconds())
+
+    def _schedule_changed(
+        self,
+        guild_id: int,
+        added: List[ScheduledMatch],
+        removed: List[ScheduledMatch]
+    ) -> None:
+        self.expirer.rearm()
+
+    def _next_expiry(self) -> Optional[float]:
+        earliest = self.storage.schedule.next_start()
+        return None if earliest is None else earliest[0] + self._grace()
+
+    async def remove_past_matches(self, now: int):
         __LOGGER__.info('Task start: remove past matches from match list')
 
-        with self.matchlist as db:
-            purged = db.purge_expired(
-                round(
-                    datetime.datetime.now(tz=datetime.timezone.utc).timestamp()
-                )
-            )
+        began = time.perf_counter()
+        not_after = now - self._grace() + 1
+        expiring = [
+            guild_id for guild_id in self.storage.schedule
+            if (start := self.storage.schedule[guild_id].next_start()) is not None
+            and start < not_after
+        ]
+        # one delete per guild with expired matches, all in one transaction
+        purged = 0
+        async with self.storage.writer() as db:
+            for guild_id in expiring:
+                purged += await db.purge_expired(not_after, guild_id)
+        elapsed = time.perf_counter() - began
 
         __LOGGER__.info(
-            'Task end: removed %d matches from match list',
-            len(purged)
+            'Task end: archived %d past matches from match list in %.1f ms',
+            purged,
+            elapsed * 1000
         )
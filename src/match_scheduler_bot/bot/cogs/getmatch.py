@@ -7,42 +7,107 @@
 from __future__ import annotations
 import logging
 import datetime
-from typing import List
+import functools
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
 
-from ...model.matchlist import MatchListRepository
+from ...model.storage import MatchStorage
 from ...model.rows import ScheduledMatch
-from ...exceptions import MatchScheduleNotObtained
-from ... import get_config
+from ...model.schedule import MatchKey, match_key
+from ...exceptions import (
+    MatchScheduleNotObtained
+)
+from ... import LiveSpec, get_config
+from ...metrics import CommandTimer
+from ..autocomplete import autocomplete_timezone
+from ..outbox import publish
 from ..responses.feedback import (
     AcknowledgeCommandUsage,
-    CommandSucceeded,
     CommandFailed
 )
-from ..responses.announcements import (
-    PublicLog,
-)
+from ..validators import calendar_window
+from ..views import CalendarView
+from ..timers import DeadlineTimer
 
 import discord
 from discord.ext import commands
-from discord.ext import tasks
 
 
 __LOGGER__ = logging.getLogger(__name__)
-__SPEC__ = get_config().cmds["get_match"]
+__KEY__ = "get_match"
+__SPEC__ = LiveSpec(__KEY__)
+ANNOUNCE_LEAD = datetime.timedelta(minutes=30)
 
 
 class GetMatchCommand(commands.Cog):
 
-    def __init__(self, matchdb: str, bot: commands.Bot):
-        self.matchlist = MatchListRepository(matchdb)
+    def __init__(self, storage: MatchStorage, bot: commands.Bot):
+        self.storage = storage
         self.bot = bot
-        self.announce_match_start.start()
+        self.announced: Dict[int, Set[MatchKey]] = defaultdict(set)
+        self.announcers: Dict[int, DeadlineTimer] = {}
+        self._loaded = False
+
+    def _announcer(self, guild_id: int) -> DeadlineTimer:
+        '''The announcement timer of one guild; every guild has its own'''
+        if guild_id not in self.announcers:
+            self.announcers[guild_id] = DeadlineTimer(
+                f'announce matches starting soon in {guild_id}',
+                functools.partial(self._next_announcement, guild_id),
+                functools.partial(self.announce_match_start, guild_id),
+                task='announce matches starting soon'
+            )
+            if self._loaded:
+                self.announcers[guild_id].start()
+        return self.announcers[guild_id]
+
+    async def cog_load(self):
+        guilds = [
+            guild_id for guild_id in dict.fromkeys(
+                [*get_config().guild_ids, *self.storage.schedule]
+            )
+            if self.storage.sharding.owns(guild_id)
+        ]
+        async with self.storage.reader() as db:
+            for guild_id in guilds:
+                self.announced[guild_id] = {
+                    match_key(m) for m in await db.find_announced(guild_id)
+                }
+        self.storage.schedule.watch(self._schedule_changed)
+        self._loaded = True
+        for guild_id in guilds:
+            self._announcer(guild_id).start()
+
+    async def cog_unload(self):
+        self._loaded = False
+        for announcer in self.announcers.values():
+            announcer.stop()
+        self.storage.schedule.unwatch(self._schedule_changed)
 
     @discord.app_commands.command(
         name=__SPEC__.invoke_with,
         description=__SPEC__.description
     )
-    async def do_it(self, interaction: discord.Interaction):
+    @discord.app_commands.describe(
+        **__SPEC__.parameters
+    )
+    @discord.app_commands.rename(
+        **__SPEC__.renames
+    )
+    @discord.app_commands.autocomplete(
+        timezone=autocomplete_timezone
+    )
+    async def do_it(
+        self,
+        interaction: discord.Interaction,
+        team: Optional[discord.Role] = None,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        this_week: bool = False,
+        timezone: str = 'UTC'
+    ):
+        timer = CommandTimer(__KEY__)
         try:
             await interaction.response.send_message(
                 content=AcknowledgeCommandUsage.get_match_used(
@@ -51,26 +116,39 @@ class GetMatchCommand(commands.Cog):
                 ephemeral=True,
                 delete_after=1
             )
+            timer.lap('acknowledge')
+            not_before, not_after = calendar_window(
+                from_date,
+                to_date,
+                this_week,
+                timezone
+            )
+            timer.lap('validate')
             __LOGGER__.info('Retrieving upcoming scheduled matches')
-            with self.matchlist as db:
-                upcoming = db.find_upcoming_matches(
-                    not_before=round(
-                        datetime.datetime.now(
-                            tz=datetime.timezone.utc
-                        ).timestamp()
-                    )
-                )
+            calendar = CalendarView(
+                self.storage,
+                interaction.guild_id,
+                team_id=None if team is None else team.id,
+                not_before=not_before,
+                not_after=not_after
+            )
+            await calendar.load()
+            timer.lap('load')
             __LOGGER__.info('Displaying match list as response')
             await interaction.followup.send(
-                embed=CommandSucceeded.got_match(interaction, upcoming),
+                embeds=calendar.render(interaction),
+                view=calendar,
                 ephemeral=True
             )
+            timer.lap('followup')
         except MatchScheduleNotObtained as err:
             __LOGGER__.error('Schedule acquisition prevented: %s', err.what)
             await interaction.followup.send(
                 embed=CommandFailed.managed_failure(err),
                 ephemeral=True
             )
+        finally:
+            timer.done()
 
     @do_it.error
     async def cannot_do_it(
@@ -84,51 +162,70 @@ class GetMatchCommand(commands.Cog):
             ephemeral=True
         )
 
-    def _starts_in(self, **kwargs):
-        announce_time_start = datetime.timedelta(**kwargs)
-        announce_time_end = announce_time_start + \
-            datetime.timedelta(seconds=60)
-        now = round(
-            datetime.datetime.now(tz=datetime.timezone.utc).timestamp()
-        )
-
-        def is_soon(m: ScheduledMatch) -> bool:
-            time_diff = m.start_time - now
-            before = announce_time_start.total_seconds()
-            after = announce_time_end.total_seconds()
-            return before <= time_diff <= after
-
-        return is_soon
-
-    @tasks.loop(seconds=60)
-    async def announce_match_start(self):
-        __LOGGER__.info('Task start: announcing matches starting soon')
-
-        with self.matchlist as db:
-            upcoming = db.find_upcoming_matches(
-                not_before=round(
-                    datetime.datetime.now(
-                        tz=datetime.timezone.utc
-                    ).timestamp()
-                )
+    def _schedule_changed(
+        self,
+        guild_id: int,
+        added: List[ScheduledMatch],
+        removed: List[ScheduledMatch]
+    ) -> None:
+        for m in removed:
+            self.announced[guild_id].discard(match_key(m))
+        self._announcer(guild_id).rearm()
+
+    def _next_announcement(
+        self,
+        guild_id: int,
+        now: Optional[int] = None
+    ) -> Optional[float]:
+        # rounded like the `now` the timer fires with, so a deadline is never
+        # set by a match `_starts_in` would then leave out
+        now = round(time.time()) if now is None else now
+        schedule = self.storage.schedule[guild_id]
+        for m in schedule.iter_from(now + 1):
+            if match_key(m) not in self.announced[guild_id]:
+                return m.start_time - ANNOUNCE_LEAD.total_seconds()
+        return None
+
+    def _starts_in(
+        self,
+        guild_id: int,
+        now: int,
+        lead: datetime.timedelta
+    ) -> List[ScheduledMatch]:
+        return [
+            m for m in self.storage.schedule[guild_id].between(
+                now + 1,
+                now + round(lead.total_seconds()) + 1
             )
+            if match_key(m) not in self.announced[guild_id]
+        ]
+
+    async def announce_match_start(self, guild_id: int, now: int):
+        await self.bot.wait_until_ready()
+        __LOGGER__.info(
+            'Task start: announcing matches starting soon in %d',
+            guild_id
+        )
 
-        if server := self.bot.get_guild(get_config().auth.server):
-            embeds = [
-                PublicLog.match_starting_soon(server, m)
-                for m in filter(self._starts_in(minutes=30), upcoming)
-            ]
-            if embeds:
-                await server.get_channel(
-                    __SPEC__.respond.public.channel_id
-                ).send(
-                    content=server.get_role(
-                        __SPEC__.respond.public.mention[0]
-                    ).mention,
-                    embeds=embeds
+        due = self._starts_in(guild_id, now, ANNOUNCE_LEAD)
+        if due:
+            # marked and queued together, so a restart neither repeats
+            # nor drops the announcement
+            async with self.storage.writer() as db:
+                await db.mark_announced(due)
+                await publish(
+                    db,
+                    guild_id,
+                    __KEY__,
+                    __SPEC__.for_guild(guild_id).respond.public,
+                    'matches_starting_soon',
+                    due
                 )
+            self.announced[guild_id].update(match_key(m) for m in due)
 
         __LOGGER__.info(
-            'Task end: announced %d matches starting soon',
-            len(embeds)
+            'Task end: announced %d matches starting soon in %d (%d wake-ups)',
+            len(due),
+            guild_id,
+            self._announcer(guild_id).wakeups
         )
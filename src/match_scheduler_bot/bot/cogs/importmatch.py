@@ -0,0 +1,157 @@
+'''
+    :module_name: importmatch
+    :module_summary: cog definition for the slash command to import a season of matches
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+import logging
+
+from ...model.storage import MatchStorage
+from ...exceptions import (
+    MatchSchedulingException
+)
+from ... import LiveSpec, get_config
+from ...metrics import CommandTimer
+from ..checks import has_any_configured_role
+from ..outbox import publish
+from ..importer import (
+    RoleResolver,
+    iter_fixture_rows,
+    parse_fixtures
+)
+from ..responses.feedback import (
+    AcknowledgeCommandUsage,
+    CommandSucceeded,
+    CommandFailed
+)
+
+import discord
+from discord.ext import commands
+
+
+__LOGGER__ = logging.getLogger(__name__)
+__KEY__ = "import_match"
+__SPEC__ = LiveSpec(__KEY__)
+
+
+class ImportMatchCommand(commands.Cog):
+
+    def __init__(self, storage: MatchStorage):
+        self.storage = storage
+
+    @discord.app_commands.command(
+        name=__SPEC__.invoke_with,
+        description=__SPEC__.description
+    )
+    @discord.app_commands.describe(
+        **__SPEC__.parameters
+    )
+    @discord.app_commands.rename(
+        **__SPEC__.renames
+    )
+    @has_any_configured_role(__KEY__)
+    async def do_it(
+        self,
+        interaction: discord.Interaction,
+        fixtures: discord.Attachment
+    ):
+        timer = CommandTimer(__KEY__)
+        try:
+            await interaction.response.send_message(
+                content=AcknowledgeCommandUsage.import_schedule_used(
+                    used_by=interaction.user
+                ),
+                ephemeral=True,
+                delete_after=1
+            )
+            timer.lap('acknowledge')
+            __LOGGER__.info(
+                '/%s invoked by user %s with %s',
+                interaction.command.name,
+                interaction.user.display_name,
+                fixtures.filename
+            )
+            payload = await fixtures.read()
+            timer.lap('download')
+            schedule = self.storage.schedule[interaction.guild_id]
+            async with self.storage.writer() as db:
+                # validated under the writer so no other schedule change can
+                # slip in between the duplicate and clash checks and the insert
+                parsed = parse_fixtures(
+                    iter_fixture_rows(fixtures.filename, payload),
+                    RoleResolver(interaction.guild.roles),
+                    schedule.has_teams,
+                    interaction.guild_id,
+                    schedule.find_clash,
+                    60 * get_config().scheduling.buffer_minutes
+                )
+                __LOGGER__.debug(
+                    'Inserting %d imported matches into matchlist',
+                    len(parsed.matches)
+                )
+                scheduled = await db.insert_matches(parsed.matches)
+                if scheduled:
+                    await publish(
+                        db,
+                        interaction.guild_id,
+                        __KEY__,
+                        __SPEC__.for_guild(interaction.guild_id).respond.everywhere,
+                        'matches_imported',
+                        scheduled
+                    )
+            timer.lap('store')
+            __LOGGER__.info('%d matches successfully imported', len(scheduled))
+            await interaction.followup.send(
+                embed=CommandSucceeded.imported_matches(
+                    interaction,
+                    scheduled,
+                    parsed.errors
+                ),
+                ephemeral=True
+            )
+            timer.lap('followup')
+        except MatchSchedulingException as err:
+            __LOGGER__.error('Match import prevented: %s', err.what)
+            await interaction.followup.send(
+                embed=CommandFailed.managed_failure(err),
+                ephemeral=True
+            )
+        finally:
+            timer.done()
+
+    @do_it.error
+    async def cannot_do_it(
+        self,
+        interaction: discord.Interaction,
+        error: discord.app_commands.AppCommandError
+    ):
+        if isinstance(error, discord.app_commands.MissingAnyRole):
+            __LOGGER__.info(
+                '%s does not have a required role to use /%s',
+                interaction.user.display_name,
+                interaction.command.name
+            )
+            await interaction.response.send_message(
+                embed=CommandFailed.forbidden(
+                    interaction,
+                    [
+                        interaction.guild.get_role(r)
+                        for r in __SPEC__.for_guild(interaction.guild_id).allowlist
+                        if interaction.guild.get_role(r) is not None
+                    ]
+                ),
+                ephemeral=True
+            )
+        else:
+            __LOGGER__.error('Unexpected error: %s', error, exc_info=error)
+            # do_it acknowledges the command first, so usually only a
+            # followup can still be sent
+            if interaction.response.is_done():
+                send = interaction.followup.send
+            else:
+                send = interaction.response.send_message
+            await send(
+                embed=CommandFailed.unexpected_failure(),
+                ephemeral=True
+            )
@@ -0,0 +1,151 @@
+'''
+    :module_name: delivery
+    :module_summary: concurrent delivery of announcements to channels and webhooks
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from ..model import CommandOutput, DeliveryOptions
+from ..exceptions import AnnouncementNotDelivered
+from ..metrics import DELIVERY_SECONDS
+
+import discord
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+
+@dataclass
+class Delivery:
+    destination: CommandOutput
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def describe(destination: CommandOutput) -> str:
+    if destination.channel_id is not None:
+        return f'channel {destination.channel_id}'
+    return 'webhook'
+
+
+def destination_key(destination: CommandOutput) -> str:
+    '''A stable name for a destination that does not reveal webhook tokens'''
+    if destination.channel_id is not None:
+        return f'channel:{destination.channel_id}'
+    digest = hashlib.sha256(
+        destination.webhook_url.get_secret_value().encode()
+    ).hexdigest()
+    return f'webhook:{digest[:16]}'
+
+
+def mentions(guild: discord.Guild, destination: CommandOutput) -> Optional[str]:
+    '''The mentions to lead a destination's first message with, if any'''
+    roles = (guild.get_role(r) for r in destination.mention)
+    return ' '.join(r.mention for r in roles if r is not None) or None
+
+
+class Broadcaster:
+    '''
+        Sends the same messages to many destinations at once. Each
+        destination gets its messages in order, but destinations are
+        served concurrently, at most `concurrency` at a time across every
+        broadcast in flight. A destination that fails is logged and
+        reported back; it never holds up or fails the others.
+    '''
+
+    def __init__(
+        self,
+        client: discord.Client,
+        options: DeliveryOptions = DeliveryOptions()
+    ):
+        self.client = client
+        self.options = options
+        self._slots = asyncio.Semaphore(options.concurrency)
+        self._webhooks: Dict[str, discord.Webhook] = {}
+
+    def _target(
+        self,
+        guild: discord.Guild,
+        destination: CommandOutput
+    ) -> discord.abc.Messageable | discord.Webhook:
+        if destination.webhook_url is not None:
+            url = destination.webhook_url.get_secret_value()
+            if url not in self._webhooks:
+                self._webhooks[url] = discord.Webhook.from_url(
+                    url,
+                    client=self.client
+                )
+            return self._webhooks[url]
+        channel = guild.get_channel(destination.channel_id)
+        if channel is None:
+            raise AnnouncementNotDelivered(
+                f'Channel {destination.channel_id} is not available'
+            )
+        return channel
+
+    async def _deliver(
+        self,
+        guild: discord.Guild,
+        destination: CommandOutput,
+        messages: List[List[discord.Embed]]
+    ) -> None:
+        async with self._slots:
+            began = time.perf_counter()
+            outcome = 'failed'
+            try:
+                target = self._target(guild, destination)
+                content = mentions(guild, destination)
+                for i, embeds in enumerate(messages):
+                    await asyncio.wait_for(
+                        target.send(
+                            content=content if i == 0 else None,
+                            embeds=embeds
+                        ),
+                        timeout=self.options.timeout_seconds
+                    )
+                outcome = 'delivered'
+            finally:
+                DELIVERY_SECONDS.observe(
+                    time.perf_counter() - began,
+                    outcome=outcome
+                )
+
+    async def broadcast(
+        self,
+        guild: discord.Guild,
+        destinations: Iterable[CommandOutput],
+        messages: List[List[discord.Embed]]
+    ) -> List[Delivery]:
+        destinations = list(destinations)
+        results = await asyncio.gather(
+            *(self._deliver(guild, d, messages) for d in destinations),
+            return_exceptions=True
+        )
+        deliveries = []
+        for destination, result in zip(destinations, results):
+            if isinstance(result, BaseException):
+                __LOGGER__.error(
+                    'Could not deliver announcement to %s: %r',
+                    describe(destination),
+                    result
+                )
+                deliveries.append(Delivery(destination, result))
+            else:
+                deliveries.append(Delivery(destination))
+        __LOGGER__.debug(
+            'Delivered announcement to %d of %d destinations',
+            sum(d.ok for d in deliveries),
+            len(deliveries)
+        )
+        return deliveries
@@ -0,0 +1,238 @@
+'''
+    :module_name: feeds
+    :module_summary: a local HTTP endpoint serving the schedule as cached iCalendar feeds
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from .. import get_config
+from ..metrics import FEED_RESPONSES
+from ..model import FeedOptions
+from ..model.rows import ScheduledMatch
+from ..model.schedule import GuildSchedules
+from .responses.ical import render_calendar
+
+from aiohttp import web
+from discord.ext import commands
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    '''
+        A rendered feed, ready to send plain or gzipped, with the team names
+        it was rendered with. Each encoding has its own strong ETag.
+    '''
+    body: bytes
+    gzipped: bytes
+    etag: str
+    names: Dict[int, str]
+
+    @classmethod
+    def of(cls, text: str, names: Dict[int, str]) -> Snapshot:
+        body = text.encode()
+        return cls(
+            body,
+            # no timestamp in the header, so equal bodies compress equally
+            gzip.compress(body, mtime=0),
+            f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            names
+        )
+
+    @property
+    def gzip_etag(self) -> str:
+        return f'{self.etag[:-1]}-gzip"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(',')}
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() == 'gzip':
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00')
+    return False
+
+
+class CalendarFeed:
+    '''
+        Serves `GET /guilds/{guild}/matches.ics` and
+        `GET /guilds/{guild}/teams/{team}.ics`, plus `/matches.ics` and
+        `/teams/{team}.ics` for the home server. Feeds are rendered from the
+        in-memory schedule the first time they are asked for, and kept until
+        a committed write changes that guild's schedule. Repeat polls get the
+        same bytes, or a 304 when they send back its ETag.
+    '''
+
+    def __init__(
+        self,
+        options: FeedOptions,
+        schedule: GuildSchedules,
+        bot: commands.Bot,
+        port: Optional[int] = None
+    ):
+        self.options = options
+        self.schedule = schedule
+        self.bot = bot
+        self.port = options.port if port is None else port
+        # guild ID -> team ID, or None for the whole league -> snapshot
+        self._snapshots: Dict[int, Dict[Optional[int], Snapshot]] = {}
+        # guild ID -> team ID -> that team's matches, built once per change
+        self._teams: Dict[int, Dict[int, List[ScheduledMatch]]] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    def _invalidate(
+        self,
+        guild_id: int,
+        added: List[ScheduledMatch],
+        removed: List[ScheduledMatch]
+    ) -> None:
+        self._snapshots.pop(guild_id, None)
+        self._teams.pop(guild_id, None)
+
+    def _team_name(self, guild_id: int) -> Callable[[int], str]:
+        guild = self.bot.get_guild(guild_id)
+
+        def name(team_id: int) -> str:
+            role = guild.get_role(team_id) if guild is not None else None
+            return role.name if role is not None else f'Team {team_id}'
+        return name
+
+    @staticmethod
+    def _renamed(snapshot: Snapshot, name: Callable[[int], str]) -> bool:
+        '''Whether a team role was renamed since `snapshot` was rendered'''
+        return any(name(team) != was for team, was in snapshot.names.items())
+
+    def _matches(
+        self,
+        guild_id: int,
+        team_id: Optional[int]
+    ) -> List[ScheduledMatch]:
+        if team_id is None:
+            return list(self.schedule[guild_id])
+        if guild_id not in self._teams:
+            teams: Dict[int, List[ScheduledMatch]] = {}
+            for m in self.schedule[guild_id]:
+                teams.setdefault(m.team_1_id, []).append(m)
+                teams.setdefault(m.team_2_id, []).append(m)
+            self._teams[guild_id] = teams
+        return self._teams[guild_id].get(team_id, [])
+
+    def snapshot(
+        self,
+        guild_id: int,
+        team_id: Optional[int] = None
+    ) -> Tuple[Snapshot, bool]:
+        '''The feed of a guild or team, and whether it was just rendered'''
+        cached = self._snapshots.setdefault(guild_id, {})
+        name = self._team_name(guild_id)
+        # role renames reach no schedule watcher, so they are checked here
+        if team_id in cached and not self._renamed(cached[team_id], name):
+            return cached[team_id], False
+        matches = self._matches(guild_id, team_id)
+        names: Dict[int, str] = {}
+        for m in matches:
+            for team in (m.team_1_id, m.team_2_id):
+                if team not in names:
+                    names[team] = name(team)
+        snapshot = Snapshot.of(render_calendar(
+            matches,
+            names.__getitem__,
+            self.options.name,
+            self.options.event_minutes,
+            int(time.time())
+        ), names)
+        # any team ID can be asked for; only those with matches are kept
+        if team_id is None or matches:
+            cached[team_id] = snapshot
+        return snapshot, True
+
+    def _serves(self, guild_id: int) -> bool:
+        config = get_config()
+        return guild_id in config.guild_ids and config.sharding.owns(guild_id)
+
+    def respond(
+        self,
+        guild_id: int,
+        team_id: Optional[int],
+        headers: Mapping[str, str]
+    ) -> web.Response:
+        if not self._serves(guild_id):
+            raise web.HTTPNotFound()
+        snapshot, rendered = self.snapshot(guild_id, team_id)
+        gzipped = _accepts_gzip(headers.get('Accept-Encoding', ''))
+        etag = snapshot.gzip_etag if gzipped else snapshot.etag
+        reply = {
+            'ETag': etag,
+            'Cache-Control': f'max-age={self.options.max_age_seconds}',
+            'Vary': 'Accept-Encoding',
+        }
+        if _etag_matches(headers.get('If-None-Match'), etag):
+            FEED_RESPONSES.inc(outcome='not_modified')
+            return web.Response(status=304, headers=reply)
+        FEED_RESPONSES.inc(outcome='rendered' if rendered else 'cached')
+        reply['Content-Type'] = CONTENT_TYPE
+        if gzipped:
+            reply['Content-Encoding'] = 'gzip'
+            return web.Response(body=snapshot.gzipped, headers=reply)
+        return web.Response(body=snapshot.body, headers=reply)
+
+    @staticmethod
+    def _guild_id(request: web.Request) -> int:
+        return int(request.match_info.get('guild_id', get_config().auth.server))
+
+    async def _league(self, request: web.Request) -> web.Response:
+        return self.respond(self._guild_id(request), None, request.headers)
+
+    async def _team(self, request: web.Request) -> web.Response:
+        return self.respond(
+            self._guild_id(request),
+            int(request.match_info['team_id']),
+            request.headers
+        )
+
+    async def start(self) -> int:
+        '''Start listening; returns the port, which is picked when 0'''
+        self.schedule.watch(self._invalidate)
+        app = web.Application()
+        app.router.add_get('/matches.ics', self._league)
+        app.router.add_get(r'/teams/{team_id:\d+}.ics', self._team)
+        app.router.add_get(r'/guilds/{guild_id:\d+}/matches.ics', self._league)
+        app.router.add_get(
+            r'/guilds/{guild_id:\d+}/teams/{team_id:\d+}.ics',
+            self._team
+        )
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.options.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        __LOGGER__.info(
+            'Serving calendar feeds on http://%s:%d/matches.ics',
+            self.options.host,
+            self.port
+        )
+        return self.port
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self.schedule.unwatch(self._invalidate)
+            await self._runner.cleanup()
+            self._runner = None
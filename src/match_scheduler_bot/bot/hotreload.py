@@ -0,0 +1,126 @@
+'''
+    :module_name: hotreload
+    :module_summary: watching the config file and applying edits to a running bot
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from .. import get_config, load_config
+from ..exceptions import BadConfigurationError, BotConfigurationError
+from ..model import BotConfig
+from .timers import DeadlineTimer
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+# sections read once while the bot starts; edits to them wait for a restart
+RESTART_ONLY = (
+    'auth', 'data', 'delivery', 'sharding', 'metrics', 'feed', 'reload'
+)
+# the parts of a command spec that are synced to Discord with the command
+SIGNATURE = ('invoke_with', 'description', 'parameters', 'renames')
+
+
+def changed_signatures(previous: BotConfig, current: BotConfig) -> Set[str]:
+    '''The commands whose slash command, as Discord sees it, was edited'''
+    return {
+        command for command, spec in current.cmds.items()
+        if command in previous.cmds and any(
+            getattr(spec, part) != getattr(previous.cmds[command], part)
+            for part in SIGNATURE
+        )
+    }
+
+
+def restart_only_changes(previous: BotConfig, current: BotConfig) -> List[str]:
+    return [
+        section for section in RESTART_ONLY
+        if getattr(previous, section) != getattr(current, section)
+    ]
+
+
+def merge_reloaded(running: BotConfig, loaded: BotConfig) -> BotConfig:
+    '''`loaded`, keeping the sections that need a restart as they are running'''
+    missing = sorted(set(running.cmds) - set(loaded.cmds))
+    if missing:
+        raise BadConfigurationError(
+            f'Bad configuration read: commands {", ".join(missing)} are missing'
+        )
+    return loaded.model_copy(update={
+        section: getattr(running, section) for section in RESTART_ONLY
+    })
+
+
+class ConfigWatcher:
+    '''
+        Checks the modification time and size of the config file every
+        `interval` seconds. An edited file is validated with the config
+        models and, if valid, handed to `apply`; an invalid one is logged
+        and ignored, so the running config keeps serving until the file is
+        fixed.
+    '''
+
+    def __init__(
+        self,
+        path: str | Path,
+        interval: float,
+        apply: Callable[[BotConfig], Awaitable[None]]
+    ):
+        self.path = Path(path)
+        self.interval = interval
+        self._apply = apply
+        self._seen = self._stamp()
+        # the file as last read, to tell which restart-only sections it edits
+        self._loaded = load_config(self.path)
+        self._checked = time.time()
+        self.timer = DeadlineTimer(
+            'watch config file',
+            lambda: self._checked + self.interval,
+            self.check
+        )
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self) -> None:
+        self.timer.start()
+
+    def stop(self) -> None:
+        self.timer.stop()
+
+    async def check(self, now: Optional[int] = None) -> bool:
+        '''Apply the config file if it changed; return whether it was applied'''
+        self._checked = time.time()
+        stamp = self._stamp()
+        if stamp == self._seen:
+            return False
+        self._seen = stamp
+        __LOGGER__.info('Config file %s changed, reloading', self.path)
+        try:
+            loaded = load_config(self.path)
+            config = merge_reloaded(get_config(), loaded)
+        except BotConfigurationError as err:
+            __LOGGER__.error(
+                'Rejected the edited config, still serving the running one: %s',
+                err.what
+            )
+            return False
+        for section in restart_only_changes(self._loaded, loaded):
+            __LOGGER__.warning(
+                'Config section `%s` changed; it takes effect after a restart',
+                section
+            )
+        self._loaded = loaded
+        await self._apply(config)
+        return True
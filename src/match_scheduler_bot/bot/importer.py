@@ -0,0 +1,199 @@
+'''
+    :module_name: importer
+    :module_summary: parsing and validation of uploaded season fixture files
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple
+)
+
+from ..model.matchlist import double_booked
+from ..model.rows import MatchToSchedule, ScheduledMatch
+from ..model.schedule import ScheduleIndex
+from ..exceptions import (
+    MatchSchedulingException,
+    InvalidFixtureFile
+)
+from .validators import (
+    date_in_near_future,
+    date_parts
+)
+
+import discord
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+FIXTURE_FIELDS = (
+    'team_1',
+    'team_2',
+    'year',
+    'month',
+    'day',
+    'hour',
+    'minute',
+    'timezone'
+)
+MAX_FIXTURE_BYTES = 1024 * 1024
+_ROLE_MENTION = re.compile(r'^<@&(\d+)>$')
+
+ClashFinder = Callable[[MatchToSchedule, int], Optional[ScheduledMatch]]
+
+
+@dataclass
+class FixtureError:
+    row: int
+    reason: str
+
+
+@dataclass
+class FixtureImport:
+    matches: List[MatchToSchedule] = field(default_factory=list)
+    errors: List[FixtureError] = field(default_factory=list)
+
+
+class RoleResolver:
+    '''Look up team roles by ID, mention or (case-insensitive) name'''
+
+    def __init__(self, roles: Iterable[discord.Role]):
+        self._by_id: Dict[int, int] = {}
+        self._by_name: Dict[str, int] = {}
+        for role in roles:
+            self._by_id[role.id] = role.id
+            self._by_name[role.name.strip().lower()] = role.id
+
+    def __call__(self, value: Any) -> Optional[int]:
+        text = str(value).strip()
+        if mention := _ROLE_MENTION.match(text):
+            text = mention.group(1)
+        if text.isdigit():
+            return self._by_id.get(int(text))
+        return self._by_name.get(text.lower())
+
+
+def iter_fixture_rows(
+    filename: str,
+    payload: bytes
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    '''Yield (row number, fields) from a CSV or JSON fixture file'''
+    if len(payload) > MAX_FIXTURE_BYTES:
+        raise InvalidFixtureFile(
+            f'Fixture files may be at most {MAX_FIXTURE_BYTES // 1024} KiB'
+        )
+    try:
+        text = payload.decode('utf-8-sig')
+    except UnicodeDecodeError as err:
+        raise InvalidFixtureFile('Fixture file is not UTF-8 text') from err
+
+    if filename.lower().endswith('.json'):
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as err:
+            raise InvalidFixtureFile(f'Invalid JSON: {err.msg}') from err
+        if not isinstance(rows, list):
+            raise InvalidFixtureFile('JSON fixtures must be a list of objects')
+        for number, row in enumerate(rows, start=1):
+            yield number, row if isinstance(row, dict) else {}
+    elif filename.lower().endswith('.csv'):
+        reader = csv.DictReader(io.StringIO(text, newline=''))
+        missing = set(FIXTURE_FIELDS) - set(reader.fieldnames or ())
+        if missing:
+            raise InvalidFixtureFile(
+                f'CSV header is missing: {", ".join(sorted(missing))}'
+            )
+        for row in reader:
+            # header is line 1, so data rows start on line 2
+            yield reader.line_num, row
+    else:
+        raise InvalidFixtureFile('Fixture files must be .csv or .json')
+
+
+def parse_fixtures(
+    rows: Iterable[Tuple[int, Dict[str, Any]]],
+    resolve_team: RoleResolver,
+    is_scheduled: Callable[[int, int], bool],
+    guild_id: int = 0,
+    find_clash: Optional[ClashFinder] = None,
+    buffer_seconds: int = 0
+) -> FixtureImport:
+    '''
+        Validate every row the same way /schedule-match validates its
+        parameters. Valid rows become matches; every other row is reported
+        with its number instead of aborting the whole import. With a
+        `buffer_seconds`, a row whose teams already play within that long,
+        per `find_clash` or in an earlier row of the file, is refused too.
+    '''
+    result = FixtureImport()
+    seen = set()
+    accepted = ScheduleIndex(guild_id=guild_id)
+    for number, row in rows:
+        try:
+            missing = [f for f in FIXTURE_FIELDS if row.get(f) in (None, '')]
+            if missing:
+                raise InvalidFixtureFile(f'Missing {", ".join(missing)}')
+            teams = []
+            for column in ('team_1', 'team_2'):
+                team = resolve_team(row[column])
+                if team is None:
+                    raise InvalidFixtureFile(f'Unknown team `{row[column]}`')
+                teams.append(team)
+            if teams[0] == teams[1]:
+                raise InvalidFixtureFile('A team cannot play itself')
+            try:
+                parts = [
+                    int(row[f])
+                    for f in ('year', 'month', 'day', 'hour', 'minute')
+                ]
+            except (TypeError, ValueError, OverflowError) as err:
+                raise InvalidFixtureFile('Date fields must be numbers') from err
+            try:
+                as_dt = date_in_near_future(date_parts(
+                    *parts,
+                    str(row['timezone']).strip()
+                ))
+                start_time = round(as_dt.timestamp())
+            except OverflowError as err:
+                raise InvalidFixtureFile('Date is out of range') from err
+            match = MatchToSchedule.with_determistic_team_ordering(
+                start_time,
+                *teams,
+                guild_id
+            )
+            pair = (match.team_1_id, match.team_2_id)
+            if pair in seen or is_scheduled(*pair):
+                raise InvalidFixtureFile(
+                    'Match between provided teams is already scheduled'
+                )
+            if buffer_seconds:
+                clash = accepted.find_clash(match, buffer_seconds)
+                if clash is None and find_clash is not None:
+                    clash = find_clash(match, buffer_seconds)
+                if clash is not None:
+                    raise double_booked(match, clash, buffer_seconds)
+                accepted.add(ScheduledMatch.from_match_to_schedule(match))
+            seen.add(pair)
+            result.matches.append(match)
+        except MatchSchedulingException as err:
+            result.errors.append(FixtureError(number, err.what))
+    __LOGGER__.info(
+        'Parsed fixtures: %d valid, %d rejected',
+        len(result.matches),
+        len(result.errors)
+    )
+    return result
@@ -0,0 +1,62 @@
+'''
+    :module_name: monitoring
+    :module_summary: a local HTTP endpoint exposing the bot's metrics for scraping
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+from ..model import MetricsOptions
+from ..metrics import REGISTRY, Registry
+
+from aiohttp import web
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsEndpoint:
+    '''Serves `GET /metrics` from the registry on the event loop of the bot'''
+
+    def __init__(
+        self,
+        options: MetricsOptions,
+        registry: Registry = REGISTRY,
+        port: Optional[int] = None
+    ):
+        self.options = options
+        self.registry = registry
+        self.port = options.port if port is None else port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _scrape(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.registry.render().encode(),
+            headers={'Content-Type': CONTENT_TYPE}
+        )
+
+    async def start(self) -> int:
+        '''Start listening; returns the port, which is picked when 0'''
+        app = web.Application()
+        app.router.add_get('/metrics', self._scrape)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.options.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        __LOGGER__.info(
+            'Serving metrics on http://%s:%d/metrics',
+            self.options.host,
+            self.port
+        )
+        return self.port
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,265 @@
+'''
+    :module_name: outbox
+    :module_summary: queued announcements and the background dispatcher that delivers them
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..model import CommandOutput, DeliveryOptions
+from ..model.rows import OutboxJob, ScheduledMatch
+from ..model.matchlist import AsyncMatchListRepository
+from ..model.storage import MatchStorage
+from ..exceptions import (
+    AnnouncementNotDelivered,
+    AnnouncementNotRendered,
+    DestinationNotConfigured
+)
+from .. import get_config
+from .delivery import Broadcaster, destination_key
+from .responses.announcements import PublicLog
+from .timers import DeadlineTimer
+
+import discord
+from discord.ext import commands
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+Renderer = Callable[
+    [discord.Guild, List[ScheduledMatch]],
+    List[List[discord.Embed]]
+]
+
+RENDERERS: Dict[str, Renderer] = {
+    'match_scheduled': lambda guild, matches: [
+        [PublicLog.match_scheduled(guild, matches[0])]
+    ],
+    'match_cancelled': lambda guild, matches: [
+        [PublicLog.match_cancelled(guild, matches[0])]
+    ],
+    'matches_imported': lambda guild, matches: PublicLog.matches_imported(
+        guild,
+        matches
+    ).messages(),
+    'matches_starting_soon': lambda guild, matches: PublicLog.matches_starting_soon(
+        guild,
+        matches
+    ).messages(),
+}
+
+# errors that retrying cannot fix
+PERMANENT_ERRORS = (
+    discord.Forbidden,
+    discord.NotFound,
+    AnnouncementNotRendered,
+    DestinationNotConfigured
+)
+
+
+async def publish(
+    db: AsyncMatchListRepository,
+    guild_id: int,
+    command: str,
+    destinations: Iterable[CommandOutput],
+    kind: str,
+    matches: List[ScheduledMatch]
+) -> None:
+    '''
+        Queue an announcement inside the caller's write transaction, so it
+        is committed, or rolled back, together with the change it announces.
+    '''
+    if kind not in RENDERERS:
+        raise ValueError(f'Unknown announcement kind: {kind}')
+    await db.enqueue(
+        command,
+        kind,
+        matches,
+        [destination_key(d) for d in destinations],
+        round(time.time()),
+        guild_id
+    )
+
+
+def backoff(options: DeliveryOptions, attempts: int, error: BaseException) -> float:
+    '''Seconds to wait before the next attempt, honouring rate limits'''
+    delay = min(
+        options.max_backoff_seconds,
+        options.backoff_seconds * 2 ** attempts
+    ) * random.uniform(0.5, 1.0)
+    if isinstance(error, discord.RateLimited):
+        delay = max(delay, error.retry_after)
+    elif isinstance(error, discord.HTTPException) and error.status == 429:
+        retry_after = error.response.headers.get('Retry-After')
+        if retry_after is not None:
+            delay = max(delay, float(retry_after))
+    return delay
+
+
+class OutboxDispatcher(commands.Cog):
+    '''
+        Drains the outbox table. Jobs are sent per destination in the order
+        they were queued, destinations concurrently through the broadcaster.
+        A delivered job is deleted; a failed one is retried with exponential
+        backoff until `max_attempts`, so every committed announcement is
+        delivered at least once, even across restarts. Only jobs of guilds
+        on this process's shards are taken.
+    '''
+
+    def __init__(
+        self,
+        storage: MatchStorage,
+        bot: commands.Bot,
+        broadcaster: Broadcaster,
+        options: DeliveryOptions = DeliveryOptions()
+    ):
+        self.storage = storage
+        self.bot = bot
+        self.broadcaster = broadcaster
+        self.options = options
+        self._next_due: Optional[int] = None
+        self.timer = DeadlineTimer(
+            'deliver queued announcements',
+            self._next_delivery,
+            self.dispatch,
+            retry_after=options.backoff_seconds
+        )
+
+    async def cog_load(self):
+        self.storage.watch_outbox(self._enqueued)
+        async with self.storage.reader() as db:
+            self._next_due = await db.next_job_due(self.storage.sharding)
+        self.timer.start()
+
+    async def cog_unload(self):
+        self.timer.stop()
+        self.storage.unwatch_outbox(self._enqueued)
+
+    def _enqueued(self, due: int) -> None:
+        if self._next_due is None or due < self._next_due:
+            self._next_due = due
+        self.timer.rearm()
+
+    def _next_delivery(self) -> Optional[float]:
+        return self._next_due
+
+    @staticmethod
+    def _resolve(job: OutboxJob) -> Optional[CommandOutput]:
+        if job.command not in get_config().cmds:
+            return None
+        spec = get_config().spec_for(job.command, job.guild_id)
+        for destination in spec.respond.everywhere:
+            if destination_key(destination) == job.destination:
+                return destination
+        return None
+
+    async def _drain(
+        self,
+        jobs: List[OutboxJob]
+    ) -> List[Tuple[OutboxJob, Optional[BaseException]]]:
+        '''
+            Send one destination's jobs in order, stopping at a failure. A
+            job that cannot be rendered, say because a team's role was
+            deleted, is reported as failed on its own and does not hold up
+            the jobs after it.
+        '''
+        guild = self.bot.get_guild(jobs[0].guild_id)
+        if guild is None:
+            return [(jobs[0], AnnouncementNotDelivered(
+                f'Server {jobs[0].guild_id} is unavailable for announcements'
+            ))]
+        outcomes = []
+        for job in jobs:
+            destination = self._resolve(job)
+            if destination is None:
+                outcomes.append((job, DestinationNotConfigured(
+                    f'{job.destination} is no longer configured for {job.command}'
+                )))
+                continue
+            try:
+                messages = RENDERERS[job.kind](guild, job.matches)
+            except Exception as err:
+                outcomes.append((job, AnnouncementNotRendered(
+                    f'{job.kind} announcement {job.id} did not render: {err!r}'
+                )))
+                continue
+            try:
+                delivery, = await self.broadcaster.broadcast(
+                    guild,
+                    [destination],
+                    messages
+                )
+            except Exception as err:
+                outcomes.append((job, err))
+                break
+            outcomes.append((job, delivery.error))
+            if not delivery.ok:
+                break
+        return outcomes
+
+    async def dispatch(self, now: int) -> None:
+        await self.bot.wait_until_ready()
+        async with self.storage.reader() as db:
+            jobs = await db.find_due_jobs(
+                now,
+                self.options.batch_size,
+                self.storage.sharding
+            )
+
+        by_destination = defaultdict(list)
+        for job in jobs:
+            by_destination[job.guild_id, job.destination].append(job)
+        # every guild and destination is drained at the same time
+        groups = list(by_destination.values())
+        outcomes = []
+        for group, drained in zip(groups, await asyncio.gather(
+            *(self._drain(group) for group in groups),
+            return_exceptions=True
+        )):
+            # one destination failing outright must not lose the others
+            if isinstance(drained, BaseException):
+                drained = [(group[0], drained)]
+            outcomes.extend(drained)
+
+        delivered = retried = dropped = 0
+        async with self.storage.writer() as db:
+            for job, error in outcomes:
+                if error is None:
+                    await db.complete_job(job)
+                    delivered += 1
+                elif isinstance(error, PERMANENT_ERRORS) or \
+                        job.attempts + 1 >= self.options.max_attempts:
+                    __LOGGER__.error(
+                        'Giving up on %s announcement %d to %s after %d attempts: %r',
+                        job.kind,
+                        job.id,
+                        job.destination,
+                        job.attempts + 1,
+                        error
+                    )
+                    await db.complete_job(job)
+                    dropped += 1
+                else:
+                    await db.retry_job(
+                        job,
+                        now + round(backoff(self.options, job.attempts, error)),
+                        repr(error)
+                    )
+                    retried += 1
+            # read under the writer so no newly queued job can be missed
+            self._next_due = await db.next_job_due(self.storage.sharding)
+
+        if outcomes:
+            __LOGGER__.info(
+                'Outbox: %d delivered, %d to retry, %d dropped',
+                delivered,
+                retried,
+                dropped
+            )
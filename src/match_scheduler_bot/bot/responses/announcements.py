@@ -4,8 +4,11 @@
     :module_author: CountTails
 '''
 
+from typing import List
+
 from ...model.rows import ScheduledMatch
 from . import AccentColor, Emoji
+from .rendering import EmbedPacker
 
 import discord
 
@@ -14,7 +17,7 @@ class PublicLog:
 
     @staticmethod
     def match_scheduled(
-        interaction: discord.Interaction,
+        guild: discord.Guild,
         match: ScheduledMatch
     ) -> discord.Embed:
         return discord.Embed(
@@ -28,8 +31,8 @@ class PublicLog:
         ).add_field(
             name='',
             value='- **Teams:** {} vs {}'.format(
-                interaction.guild.get_role(match.team_1_id).mention,
-                interaction.guild.get_role(match.team_2_id).mention
+                guild.get_role(match.team_1_id).mention,
+                guild.get_role(match.team_2_id).mention
             ),
             inline=False
         ).add_field(
@@ -40,7 +43,7 @@ class PublicLog:
 
     @staticmethod
     def match_cancelled(
-        interaction: discord.Interaction,
+        guild: discord.Guild,
         match: ScheduledMatch
     ) -> discord.Embed:
         return discord.Embed(
@@ -54,8 +57,8 @@ class PublicLog:
         ).add_field(
             name='',
             value='- **Teams:** {} vs {}'.format(
-                interaction.guild.get_role(match.team_1_id).mention,
-                interaction.guild.get_role(match.team_2_id).mention
+                guild.get_role(match.team_1_id).mention,
+                guild.get_role(match.team_2_id).mention
             ),
             inline=False
         ).add_field(
@@ -65,34 +68,72 @@ class PublicLog:
         )
 
     @staticmethod
-    def match_starting_soon(
+    def matches_imported(
         guild: discord.Guild,
-        match: ScheduledMatch
-    ) -> discord.Embed:
-        return discord.Embed(
-            title='{}{}Match Incoming!{}{}'.format(
-                Emoji.CALENDAR,
-                Emoji.SEPARATOR,
-                Emoji.SEPARATOR,
-                Emoji.STADIUM
-            ),
-            color=AccentColor.INFO.value
-        ).add_field(
-            name='**Matchup Information:**',
-            value='- {} vs. {}\n- Match begins <t:{}:R>'.format(
-                guild.get_role(match.team_1_id).mention,
-                guild.get_role(match.team_2_id).mention,
-                match.start_time
-            ),
-            inline=False
-        ).add_field(
+        matches: List[ScheduledMatch]
+    ) -> EmbedPacker:
+        def digest_embed(made: int) -> discord.Embed:
+            if made:
+                return discord.Embed(color=AccentColor.SUCCESS.value)
+            return discord.Embed(
+                title='{}{}{} Matches Scheduled!{}{}'.format(
+                    Emoji.CALENDAR,
+                    Emoji.SEPARATOR,
+                    len(matches),
+                    Emoji.SEPARATOR,
+                    Emoji.CHECK
+                ),
+                color=AccentColor.SUCCESS.value
+            )
+
+        msg = EmbedPacker(digest_embed)
+        for m in matches:
+            msg.add_line(
+                '- {} vs {} | <t:{}:f>'.format(
+                    guild.get_role(m.team_1_id).mention,
+                    guild.get_role(m.team_2_id).mention,
+                    m.start_time
+                )
+            )
+        return msg
+
+    @staticmethod
+    def matches_starting_soon(
+        guild: discord.Guild,
+        matches: List[ScheduledMatch]
+    ) -> EmbedPacker:
+        def incoming_embed(made: int) -> discord.Embed:
+            if made:
+                return discord.Embed(color=AccentColor.INFO.value)
+            return discord.Embed(
+                title='{}{}Match{} Incoming!{}{}'.format(
+                    Emoji.CALENDAR,
+                    Emoji.SEPARATOR,
+                    'es' if len(matches) > 1 else '',
+                    Emoji.SEPARATOR,
+                    Emoji.STADIUM
+                ),
+                color=AccentColor.INFO.value
+            )
+
+        msg = EmbedPacker(incoming_embed, field_name='**Matchup Information:**')
+        for m in matches:
+            msg.add_line(
+                '- {} vs. {} | Match begins <t:{}:R>'.format(
+                    guild.get_role(m.team_1_id).mention,
+                    guild.get_role(m.team_2_id).mention,
+                    m.start_time
+                )
+            )
+        msg.add_field(
             name='**How to Watch**:',
             value="- If staff can stream the matchup, tune in to MSA's official [Twitch]({}) or [YouTube]({}) channel to view our official commentary of the matchup.\n\t- If staff cannot stream the matchup, tune in to the players' individual Twitch or YouTube channels to watch their gameplay.".format(
                 'https://www.twitch.tv/msaleagueqc',
                 'https://www.youtube.com/@MagicalSportsAssociation'
-            ),
-            inline=False
-        ).add_field(
+            )
+        )
+        msg.add_field(
             name='**Team Instructions:**',
             value="- Join your respective voice channel 15 minutes before the match starts.\n- If staff can stream the matchup, begin to stream your gameplay to broadcasters within Discord. (at least one team member must be streaming.)\n\t- If staff cannot stream the matchup, prepare/begin to record and or stream your gameplay on Twitch or YouTube. (at least one team member must be streaming.)\n- Meet in Queue Setup before and after each match for queue sniping\n- Enable Discord streamer mode to hide user joined and user left notifications."
         )
+        return msg
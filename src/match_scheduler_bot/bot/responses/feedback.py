@@ -7,10 +7,12 @@
 from typing import List
 
 from ...model.rows import ScheduledMatch
+from ..importer import FixtureError
 from ...exceptions import (
     MatchSchedulerBotException
 )
 from . import AccentColor, Emoji
+from .rendering import EmbedPacker
 
 import discord
 
@@ -37,6 +39,10 @@ class AcknowledgeCommandUsage:
     def get_match_used(used_by: discord.Member) -> str:
         return '**Loading...**'
 
+    @staticmethod
+    def import_schedule_used(used_by: discord.Member) -> str:
+        return '**Loading...**'
+
 
 class CommandSucceeded:
 
@@ -83,38 +89,62 @@ class CommandSucceeded:
         )
 
     @staticmethod
-    def got_match(
+    def imported_matches(
         interaction: discord.Interaction,
-        matches: List[ScheduledMatch]
-    ):
+        scheduled: List[ScheduledMatch],
+        errors: List[FixtureError]
+    ) -> discord.Embed:
         msg = discord.Embed(
-            title='{}{}Match Calendar{}{}'.format(
-                Emoji.CALENDAR,
-                Emoji.SEPARATOR,
-                Emoji.SEPARATOR,
-                Emoji.CALENDAR
-            ),
-            description='Below is a list of the matches currently scheduled:',
-            color=AccentColor.INFO.value
+            title='{} Matches Have Been Scheduled!'.format(len(scheduled)),
+            color=AccentColor.SUCCESS.value if not errors
+            else AccentColor.WARN.value
         )
-        has_matches = False
+        if errors:
+            shown = []
+            for e in errors:
+                line = '- **Row {}:** {}'.format(e.row, e.reason)
+                if sum(len(s) + 1 for s in shown) + len(line) > 3900:
+                    shown.append('-# ...and {} more'.format(
+                        len(errors) - len(shown)
+                    ))
+                    break
+                shown.append(line)
+            msg.description = '**{} rows were skipped:**\n{}'.format(
+                len(errors),
+                '\n'.join(shown)
+            )
+        return msg
+
+    @staticmethod
+    def got_match(
+        interaction: discord.Interaction,
+        matches: List[ScheduledMatch]
+    ) -> EmbedPacker:
+        def calendar_embed(made: int) -> discord.Embed:
+            if made:
+                return discord.Embed(color=AccentColor.INFO.value)
+            return discord.Embed(
+                title='{}{}Match Calendar{}{}'.format(
+                    Emoji.CALENDAR,
+                    Emoji.SEPARATOR,
+                    Emoji.SEPARATOR,
+                    Emoji.CALENDAR
+                ),
+                description='Below is a list of the matches currently scheduled:',
+                color=AccentColor.INFO.value
+            )
+
+        msg = EmbedPacker(calendar_embed)
         for m in matches:
-            msg.add_field(
-                name='',
-                value='- {} vs. {} | <t:{}:f>'.format(
+            msg.add_line(
+                '- {} vs. {} | <t:{}:f>'.format(
                     interaction.guild.get_role(m.team_1_id).mention,
                     interaction.guild.get_role(m.team_2_id).mention,
                     m.start_time
-                ),
-                inline=False
-            )
-            has_matches = True
-        else:
-            if not has_matches:
-                msg.add_field(
-                    name='',
-                    value='-# There are no matches scheduled at this time.'
                 )
+            )
+        if not matches:
+            msg.add_line('-# There are no matches scheduled at this time.')
         return msg
 
 
@@ -0,0 +1,84 @@
+'''
+    :module_name: ical
+    :module_summary: rendering of scheduled matches as an iCalendar (RFC 5545) feed
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import datetime
+from typing import Callable, Iterable, List
+
+from ...model.rows import ScheduledMatch
+
+
+PRODID = '-//CountTails//match_scheduler_bot//EN'
+# content lines longer than this many octets are folded
+LINE_LIMIT = 75
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace(';', '\\;') \
+        .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line: str) -> List[str]:
+    '''Split a content line into pieces of at most 75 octets'''
+    folded, piece, size = [], [], 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > LINE_LIMIT:
+            folded.append(''.join(piece))
+            # continuation lines start with a space, which counts
+            piece, size = [' '], 1
+        piece.append(char)
+        size += width
+    folded.append(''.join(piece))
+    return folded
+
+
+def _utc(timestamp: int) -> str:
+    return datetime.datetime.fromtimestamp(
+        timestamp,
+        datetime.timezone.utc
+    ).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_calendar(
+    matches: Iterable[ScheduledMatch],
+    team_name: Callable[[int], str],
+    name: str,
+    event_minutes: int,
+    rendered_at: int
+) -> str:
+    '''
+        A VCALENDAR with one VEVENT per match, lasting `event_minutes`. The
+        UID of an event is its match key, so calendar apps update an event
+        in place when the same match comes back in a later poll.
+    '''
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+    ]
+    stamp = _utc(rendered_at)
+    for m in matches:
+        lines.extend([
+            'BEGIN:VEVENT',
+            f'UID:{m.start_time}-{m.team_1_id}-{m.team_2_id}-{m.guild_id}'
+            '@match-scheduler-bot',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{_utc(m.start_time)}',
+            f'DTEND:{_utc(m.start_time + 60 * event_minutes)}',
+            'SUMMARY:' + _escape(
+                f'{team_name(m.team_1_id)} vs {team_name(m.team_2_id)}'
+            ),
+            'END:VEVENT',
+        ])
+    lines.append('END:VCALENDAR')
+    return ''.join(
+        piece + '\r\n' for line in lines for piece in _fold(line)
+    )
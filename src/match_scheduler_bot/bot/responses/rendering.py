@@ -0,0 +1,142 @@
+'''
+    :module_name: rendering
+    :module_summary: packing of response lines into embeds and messages within discord limits
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+from typing import Callable, List, Optional
+
+import discord
+
+
+EMBED_TOTAL_LIMIT = 6000
+EMBED_FIELD_LIMIT = 25
+FIELD_NAME_LIMIT = 256
+FIELD_VALUE_LIMIT = 1024
+MESSAGE_EMBED_LIMIT = 10
+MESSAGE_TOTAL_LIMIT = 6000
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+class EmbedPacker:
+    '''
+        Builds embeds while measuring them. Lines are joined into field
+        values of at most 1024 characters; a new embed is started when the
+        next field would pass 25 fields or 6000 characters, and a new message
+        when the next embed would pass 10 embeds or 6000 characters in total.
+        `new_embed` is called with the number of embeds made so far, so the
+        first one can carry the title and the rest only continue it.
+    '''
+
+    def __init__(
+        self,
+        new_embed: Callable[[int], discord.Embed],
+        field_name: str = ''
+    ):
+        self._new_embed = new_embed
+        self._field_name = _clip(field_name, FIELD_NAME_LIMIT)
+        self._messages: List[List[discord.Embed]] = []
+        self._lines: List[int] = []
+        self._embed: Optional[discord.Embed] = None
+        self._value: List[str] = []
+        self._made = 0
+
+    @property
+    def _open_field_len(self) -> int:
+        if not self._value:
+            return 0
+        return len(self._field_name) + sum(map(len, self._value)) \
+            + len(self._value) - 1
+
+    @property
+    def _message_len(self) -> int:
+        return sum(len(e) for e in self._messages[-1]) + self._open_field_len
+
+    def _close_field(self) -> None:
+        if self._value:
+            self._embed.add_field(
+                name=self._field_name,
+                value='\n'.join(self._value),
+                inline=False
+            )
+            self._value = []
+
+    def _close_embed(self, new_message: bool = False) -> None:
+        self._close_field()
+        self._embed = None
+        if new_message:
+            self._messages.append([])
+            self._lines.append(0)
+
+    def _open_embed(self) -> None:
+        embed = self._new_embed(self._made)
+        self._made += 1
+        if not self._messages or \
+                len(self._messages[-1]) >= MESSAGE_EMBED_LIMIT or \
+                self._message_len + len(embed) > MESSAGE_TOTAL_LIMIT:
+            self._messages.append([])
+            self._lines.append(0)
+        self._messages[-1].append(embed)
+        self._embed = embed
+
+    def _is_fresh(self) -> bool:
+        return not self._embed.fields and not self._value
+
+    def _fits(self, cost: int, fields: int) -> Optional[bool]:
+        '''None if it fits, else whether a new message is required'''
+        if len(self._embed.fields) + fields > EMBED_FIELD_LIMIT or \
+                len(self._embed) + self._open_field_len + cost > EMBED_TOTAL_LIMIT:
+            return self._message_len + cost > MESSAGE_TOTAL_LIMIT
+        if self._message_len + cost > MESSAGE_TOTAL_LIMIT:
+            return True
+        return None
+
+    def add_line(self, line: str) -> None:
+        line = _clip(line, FIELD_VALUE_LIMIT)
+        while True:
+            if self._embed is None:
+                self._open_embed()
+            if self._value and self._open_field_len - len(self._field_name) \
+                    + 1 + len(line) > FIELD_VALUE_LIMIT:
+                self._close_field()
+            if self._value:
+                cost, fields = len(line) + 1, 1
+            else:
+                cost, fields = len(self._field_name) + len(line), 1
+            overflow = self._fits(cost, fields)
+            if overflow is not None and not self._is_fresh():
+                self._close_embed(new_message=overflow)
+                continue
+            self._value.append(line)
+            self._lines[-1] += 1
+            return
+
+    def add_field(self, name: str, value: str) -> None:
+        name = _clip(name, FIELD_NAME_LIMIT)
+        value = _clip(value, FIELD_VALUE_LIMIT)
+        while True:
+            if self._embed is None:
+                self._open_embed()
+            self._close_field()
+            overflow = self._fits(len(name) + len(value), 1)
+            if overflow is not None and not self._is_fresh():
+                self._close_embed(new_message=overflow)
+                continue
+            self._embed.add_field(name=name, value=value, inline=False)
+            return
+
+    @property
+    def lines_per_message(self) -> List[int]:
+        '''How many lines ended up in each message, in order'''
+        return list(self._lines)
+
+    def messages(self) -> List[List[discord.Embed]]:
+        if self._embed is None and not self._messages:
+            self._open_embed()
+        self._close_field()
+        return [embeds for embeds in self._messages if embeds]
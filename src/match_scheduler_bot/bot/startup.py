@@ -0,0 +1,79 @@
+'''
+    :module_name: startup
+    :module_summary: timing of startup phases and change-gated command tree sync
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import time
+from typing import Dict, Iterator
+
+from ..model.storage import MatchStorage
+
+import discord
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+
+class StartupPhases:
+    '''Wall clock time spent in each named phase of bringing the bot up'''
+
+    def __init__(self):
+        self.began = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = time.perf_counter() - began
+            __LOGGER__.info(
+                'Startup phase `%s` took %.1f ms',
+                name,
+                self.durations[name] * 1000
+            )
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.began
+
+
+def command_tree_hash(tree: discord.app_commands.CommandTree) -> str:
+    '''A digest of the global commands exactly as they would be synced'''
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands()),
+        key=lambda command: (command.get('type', 1), command['name'])
+    )
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+async def sync_command_tree(
+    tree: discord.app_commands.CommandTree,
+    storage: MatchStorage,
+    application_id: int
+) -> bool:
+    '''
+        Sync the global command tree only when it differs from the one last
+        synced by this application. Returns whether a sync was made.
+    '''
+    key = f'command_tree_hash:{application_id}'
+    digest = command_tree_hash(tree)
+    async with storage.reader() as db:
+        synced = await db.get_setting(key)
+    if synced == digest:
+        __LOGGER__.info('Command tree unchanged (%s), skipping sync', digest[:12])
+        return False
+    __LOGGER__.info('Command tree changed (%s), synchronizing', digest[:12])
+    await tree.sync()
+    async with storage.writer() as db:
+        await db.put_setting(key, digest)
+    return True
@@ -0,0 +1,104 @@
+'''
+    :module_name: timers
+    :module_summary: a re-armable single timer for deadline driven background work
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from ..metrics import TASK_SECONDS
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+
+class DeadlineTimer:
+    '''
+        Sleeps until the next deadline reported by `next_deadline` (a unix
+        timestamp, or None when there is nothing to wait for) and then
+        awaits `fire` with the current timestamp. Call `rearm` whenever the
+        deadlines may have changed; the timer then recomputes the next one
+        instead of waking up on a fixed interval. Each run is timed under
+        `task`, which defaults to the name.
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        next_deadline: Callable[[], Optional[float]],
+        fire: Callable[[int], Awaitable[None]],
+        retry_after: float = 5,
+        max_sleep: float = 3600,
+        task: Optional[str] = None
+    ):
+        self.name = name
+        self.task = task or name
+        self.wakeups = 0
+        self._next_deadline = next_deadline
+        self._fire = fire
+        self._retry_after = retry_after
+        self._max_sleep = max_sleep
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.is_running:
+            __LOGGER__.info('Starting timer: %s', self.name)
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    def stop(self) -> None:
+        if self._task is not None:
+            __LOGGER__.info('Stopping timer: %s', self.name)
+            self._task.cancel()
+            self._task = None
+
+    def rearm(self) -> None:
+        self._changed.set()
+
+    async def _sleep(self, delay: float) -> bool:
+        '''Wait `delay` seconds; return False if re-armed in the meantime'''
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=delay)
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+    async def _run(self) -> None:
+        while True:
+            self._changed.clear()
+            deadline = self._next_deadline()
+            if deadline is None:
+                __LOGGER__.debug('Timer %s idle until re-armed', self.name)
+                await self._changed.wait()
+                continue
+            delay = deadline - time.time()
+            if delay > 0:
+                __LOGGER__.debug(
+                    'Timer %s armed for %.1fs from now',
+                    self.name,
+                    delay
+                )
+                if not await self._sleep(min(delay, self._max_sleep)):
+                    continue
+                if delay > self._max_sleep:
+                    continue
+            self.wakeups += 1
+            try:
+                with TASK_SECONDS.time(task=self.task):
+                    await self._fire(round(time.time()))
+            except Exception:
+                __LOGGER__.exception(
+                    'Timer %s failed, retrying in %.1fs',
+                    self.name,
+                    self._retry_after
+                )
+                await asyncio.sleep(self._retry_after)
@@ -7,8 +7,10 @@
 import logging
 import datetime
 import zoneinfo
+from typing import Optional, Tuple
 
 from ..exceptions import (
+    InvalidCalendarFilter,
     InvalidTimezoneSpecified,
     InvalidStartTimeGiven
 )
@@ -70,3 +72,62 @@ def date_in_near_future(dt: datetime.datetime) -> datetime.datetime:
         )
 
     return dt
+
+
+def calendar_window(
+    from_date: Optional[str],
+    to_date: Optional[str],
+    this_week: bool,
+    tzkey: str,
+    now: Optional[datetime.datetime] = None
+) -> Tuple[Optional[int], Optional[int]]:
+    '''
+        The (not before, not after) timestamps of the calendar days asked
+        for: `from_date` through the whole of `to_date`, both YYYY-MM-DD in
+        `tzkey`, or Monday to Sunday of the current week. None is open ended.
+    '''
+    __LOGGER__.info('Validating the calendar date range')
+    try:
+        tz = zoneinfo.ZoneInfo(tzkey)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError) as err:
+        __LOGGER__.error('`%s` is not a known time zone', tzkey)
+        raise InvalidCalendarFilter(f'{tzkey} is not a known timezone') from err
+
+    if this_week:
+        if from_date is not None or to_date is not None:
+            raise InvalidCalendarFilter(
+                'Invalid dates: give either this week or a from/to range'
+            )
+        today = (now or datetime.datetime.now(tz)).astimezone(tz).date()
+        first = today - datetime.timedelta(days=today.weekday())
+        last = first + datetime.timedelta(days=6)
+    else:
+        try:
+            first = None if from_date is None \
+                else datetime.date.fromisoformat(from_date)
+            last = None if to_date is None \
+                else datetime.date.fromisoformat(to_date)
+        except ValueError as err:
+            __LOGGER__.error('Invalid calendar date: `%s`', str(err))
+            raise InvalidCalendarFilter(
+                'Invalid date: dates must be written as YYYY-MM-DD'
+            ) from err
+        if first is not None and last is not None and first > last:
+            raise InvalidCalendarFilter(
+                'Invalid dates: the range ends before it starts'
+            )
+
+    def midnight(day: datetime.date) -> int:
+        return round(datetime.datetime.combine(day, datetime.time(), tz).timestamp())
+
+    try:
+        return (
+            None if first is None else midnight(first) - 1,
+            None if last is None
+            else midnight(last + datetime.timedelta(days=1)) - 1
+        )
+    except OverflowError as err:
+        __LOGGER__.error('Calendar date out of range: `%s`', str(err))
+        raise InvalidCalendarFilter(
+            'Invalid dates: the range is out of bounds'
+        ) from err
@@ -0,0 +1,152 @@
+'''
+    :module_name: views
+    :module_summary: interactive message components used by bot responses
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+import logging
+import datetime
+from typing import List, Optional
+
+from ..model.rows import ScheduledMatch, MatchCursor
+from ..model.storage import MatchStorage
+from .responses.feedback import CommandSucceeded
+
+import discord
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+
+class CalendarView(discord.ui.View):
+    '''
+        Previous/next navigation for the match calendar. The view remembers
+        the keys of the first and last match on screen and pages from them,
+        so a page stays correct while matches are added or cancelled.
+        The whole calendar pages from the in-memory schedule; a calendar
+        narrowed to one team or to a window of start times pages from the
+        database's indexes.
+    '''
+
+    def __init__(
+        self,
+        storage: MatchStorage,
+        guild_id: int,
+        page_size: int = 10,
+        timeout: Optional[float] = 180,
+        team_id: Optional[int] = None,
+        not_before: Optional[int] = None,
+        not_after: Optional[int] = None
+    ):
+        super().__init__(timeout=timeout)
+        self.storage = storage
+        self.guild_id = guild_id
+        self.page_size = page_size
+        self.team_id = team_id
+        self.not_before = not_before
+        self.not_after = not_after
+        self.matches: List[ScheduledMatch] = []
+        self._first: Optional[MatchCursor] = None
+        self._last: Optional[MatchCursor] = None
+
+    @property
+    def filtered(self) -> bool:
+        return self.team_id is not None or self.not_after is not None \
+            or self.not_before is not None
+
+    async def _page(
+        self,
+        after: Optional[MatchCursor],
+        before: Optional[MatchCursor]
+    ) -> List[ScheduledMatch]:
+        now = round(datetime.datetime.now(tz=datetime.timezone.utc).timestamp())
+        if not self.filtered:
+            return self.storage.schedule[self.guild_id].upcoming(
+                not_before=now,
+                page_size=self.page_size + 1,
+                after=after,
+                before=before
+            )
+        async with self.storage.reader() as db:
+            return await db.find_upcoming_matches(
+                not_before=max(now, self.not_before or now),
+                page_size=self.page_size + 1,
+                after=after,
+                before=before,
+                guild_id=self.guild_id,
+                team_id=self.team_id,
+                not_after=self.not_after
+            )
+
+    async def load(
+        self,
+        after: Optional[MatchCursor] = None,
+        before: Optional[MatchCursor] = None
+    ) -> List[ScheduledMatch]:
+        page = await self._page(after, before)
+        if before is not None:
+            has_prev = len(page) > self.page_size
+            if not has_prev:
+                __LOGGER__.debug('Reached the start of the calendar')
+                return await self.load()
+            page, has_next = page[-self.page_size:], True
+        else:
+            has_prev = after is not None
+            page, has_next = page[:self.page_size], len(page) > self.page_size
+
+        self.matches = page
+        if page:
+            self._first = MatchCursor.from_match(page[0])
+            self._last = MatchCursor.from_match(page[-1])
+        else:
+            self._first = self._last = after
+        self.previous_page.disabled = not has_prev
+        self.next_page.disabled = not has_next
+        return page
+
+    def render(self, interaction: discord.Interaction) -> List[discord.Embed]:
+        '''
+            The embeds for the current page. A page is one message, so if the
+            packer needs more than one the page is cut to what fits and the
+            cursor moves back so that "Next" resumes at the first match left out.
+        '''
+        packer = CommandSucceeded.got_match(interaction, self.matches)
+        messages = packer.messages()
+        shown = packer.lines_per_message[0] if self.matches else 0
+        if shown < len(self.matches):
+            __LOGGER__.debug(
+                'Calendar page cut from %d to %d matches to fit one message',
+                len(self.matches),
+                shown
+            )
+            self.matches = self.matches[:shown]
+            self._last = MatchCursor.from_match(self.matches[-1])
+            self.next_page.disabled = False
+        return messages[0]
+
+    @discord.ui.button(label='Previous', style=discord.ButtonStyle.secondary)
+    async def previous_page(
+        self,
+        interaction: discord.Interaction,
+        button: discord.ui.Button
+    ):
+        __LOGGER__.debug('Paging calendar back from %s', self._first)
+        await self.load(before=self._first)
+        await interaction.response.edit_message(
+            embeds=self.render(interaction),
+            view=self
+        )
+
+    @discord.ui.button(label='Next', style=discord.ButtonStyle.secondary)
+    async def next_page(
+        self,
+        interaction: discord.Interaction,
+        button: discord.ui.Button
+    ):
+        __LOGGER__.debug('Paging calendar forward from %s', self._last)
+        await self.load(after=self._last)
+        await interaction.response.edit_message(
+            embeds=self.render(interaction),
+            view=self
+        )
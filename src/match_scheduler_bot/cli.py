@@ -5,13 +5,89 @@
 """
 
 import click
+import csv
+import datetime
 import os.path
 import importlib
+import multiprocessing
+import urllib.request
+from typing import Dict, List, Optional
 
 from match_scheduler_bot import setup_config, setup_logging, get_config
+from match_scheduler_bot.model import ShardingOptions, utc_midnight
+from match_scheduler_bot.model.matchlist import LAST_START, MatchListRepository
 
 
-@click.command()
+def _shard_groups(shard_ids: List[int], groups: int) -> List[List[int]]:
+    '''Split shard ids into at most `groups` contiguous, even groups'''
+    groups = min(groups, len(shard_ids))
+    return [
+        shard_ids[i * len(shard_ids) // groups:(i + 1) * len(shard_ids) // groups]
+        for i in range(groups)
+    ]
+
+
+def _run(
+    bot_config: str,
+    log_config: str,
+    sharding: Optional[Dict],
+    feed: Optional[bool] = None
+) -> None:
+    setup_logging(log_config)
+    setup_config(bot_config)
+    if sharding is not None:
+        get_config().sharding = ShardingOptions.model_validate(
+            get_config().sharding.model_dump() | sharding | {'enabled': True}
+        )
+    if feed is not None:
+        get_config().feed = get_config().feed.model_copy(
+            update={'enabled': feed}
+        )
+    bot = importlib.import_module('match_scheduler_bot.bot')
+    bot.use_bot().run(
+        token=get_config().auth.token.get_secret_value(),
+        log_handler=None
+    )
+
+
+def _launch(
+    bot_config: str,
+    log_config: str,
+    shard_count: int,
+    groups: List[List[int]],
+    feed: Optional[bool] = None
+) -> None:
+    '''Run every shard group in its own process until all of them exit'''
+    spawn = multiprocessing.get_context('spawn')
+    processes = [
+        spawn.Process(
+            target=_run,
+            args=(
+                bot_config,
+                log_config,
+                {'shard_count': shard_count, 'shard_ids': group},
+                feed
+            ),
+            name=f'shards-{group[0]}-{group[-1]}'
+        )
+        for group in groups
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+    failed = [p.name for p in processes if p.exitcode]
+    if failed:
+        raise click.ClickException(f'Shard processes failed: {", ".join(failed)}')
+
+
+@click.group(invoke_without_command=True)
 @click.option(
     '--bot-config',
     type=click.Path(exists=True),
@@ -22,12 +98,156 @@ from match_scheduler_bot import setup_config, setup_logging, get_config
     type=click.Path(exists=True),
     default=f'{os.path.expanduser("~/.config/msa/logging.json")}'
 )
-def main(bot_config, log_config):
-    """Entry point to matchschedulerbot"""
-    setup_logging(log_config)
+@click.pass_context
+def main(ctx, bot_config, log_config):
+    """Entry point to matchschedulerbot; runs the bot without a command"""
+    ctx.obj = {'bot_config': bot_config, 'log_config': log_config}
+    if ctx.invoked_subcommand is None:
+        ctx.invoke(run)
+
+
+@main.command()
+@click.option(
+    '--shard-count',
+    type=click.IntRange(min=1),
+    help='Total number of shards of the bot; enables sharding'
+)
+@click.option(
+    '--shard-id',
+    'shard_ids',
+    type=click.IntRange(min=0),
+    multiple=True,
+    help='A shard for this process to run (repeatable); needs --shard-count'
+)
+@click.option(
+    '--shard-groups',
+    type=click.IntRange(min=1),
+    help='Run the shards in this many processes on this host'
+)
+@click.option(
+    '--calendar-feed/--no-calendar-feed',
+    default=None,
+    help='Serve the iCalendar feeds; defaults to `feed.enabled` in the config'
+)
+@click.pass_obj
+def run(obj, shard_count, shard_ids, shard_groups, calendar_feed):
+    """Run the bot, or a group of its shards"""
+    bot_config, log_config = obj['bot_config'], obj['log_config']
+    if shard_count is None and not shard_ids and shard_groups is None:
+        _run(bot_config, log_config, None, calendar_feed)
+        return
+
+    # flags replace the sharding of the bot config, which fills in the rest
     setup_config(bot_config)
-    bot = importlib.import_module('match_scheduler_bot.bot')
-    bot.use_bot().run(
-        token=get_config().auth.token.get_secret_value(),
-        log_handler=None
+    configured = get_config().sharding
+    if shard_count is None:
+        shard_count = configured.shard_count
+        shard_ids = shard_ids or configured.shard_ids or ()
+    if shard_count is None:
+        raise click.UsageError(
+            'Give --shard-count, or `sharding.shard_count` in the bot config'
+        )
+    sharding = {
+        'shard_count': shard_count,
+        'shard_ids': sorted(set(shard_ids)) or None
+    }
+    try:
+        ShardingOptions.model_validate(sharding)
+    except ValueError as err:
+        raise click.BadParameter(str(err), param_hint='--shard-id') from err
+
+    if shard_groups is None:
+        _run(bot_config, log_config, sharding, calendar_feed)
+        return
+    _launch(
+        bot_config,
+        log_config,
+        shard_count,
+        _shard_groups(
+            sharding['shard_ids'] or list(range(shard_count)),
+            shard_groups
+        ),
+        calendar_feed
     )
+
+
+@main.command()
+@click.option(
+    '--url',
+    help='Where the bot serves its metrics; defaults to the bot config'
+)
+@click.pass_obj
+def metrics(obj, url):
+    """Print the metrics of a running bot in the Prometheus text format"""
+    if url is None:
+        setup_config(obj['bot_config'])
+        options = get_config().metrics
+        url = f'http://{options.host}:{options.port}/metrics'
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            click.echo(response.read().decode(), nl=False)
+    except OSError as err:
+        raise click.ClickException(f'Could not read metrics from {url}: {err}')
+
+
+@main.command()
+@click.option('--season', help='A season named in the bot config')
+@click.option(
+    '--from',
+    'from_day',
+    type=click.DateTime(formats=['%Y-%m-%d']),
+    help='The first day to export (UTC)'
+)
+@click.option(
+    '--to',
+    'to_day',
+    type=click.DateTime(formats=['%Y-%m-%d']),
+    help='The last day to export (UTC)'
+)
+@click.option(
+    '--guild',
+    'guild_id',
+    type=click.IntRange(min=1),
+    help='The guild to export; defaults to the home server'
+)
+@click.pass_obj
+def archive(obj, season, from_day, to_day, guild_id):
+    """Print past matches from the archive as CSV, oldest first"""
+    setup_config(obj['bot_config'])
+    config = get_config()
+    if season is not None:
+        if from_day is not None or to_day is not None:
+            raise click.UsageError('Give either --season or --from/--to')
+        if season not in config.seasons:
+            raise click.BadParameter(
+                f'no season `{season}` in the bot config',
+                param_hint='--season'
+            )
+        not_before, before = config.seasons[season].window()
+    else:
+        not_before = 0 if from_day is None else utc_midnight(from_day.date())
+        before = LAST_START if to_day is None else utc_midnight(
+            to_day.date() + datetime.timedelta(days=1)
+        )
+        if before <= not_before:
+            raise click.BadParameter(
+                'the last day is before the first',
+                param_hint='--to'
+            )
+
+    repo = MatchListRepository(str(config.data.database))
+    out = csv.writer(click.get_text_stream('stdout'))
+    out.writerow(['start_time', 'team_1_id', 'team_2_id'])
+    for match in repo.iter_archive(
+        guild_id or config.auth.server,
+        not_before,
+        before
+    ):
+        out.writerow([
+            datetime.datetime.fromtimestamp(
+                match.start_time,
+                datetime.timezone.utc
+            ).isoformat(),
+            match.team_1_id,
+            match.team_2_id
+        ])
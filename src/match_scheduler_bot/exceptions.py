@@ -4,6 +4,8 @@
     :module_author: CountTails
 '''
 
+from typing import Any
+
 
 class MatchSchedulerBotException(Exception):
     '''Base exception for the bot package'''
@@ -44,10 +46,39 @@ class DuplicatedMatchDetected(MatchSchedulingException):
     '''Exception indicating a match involving the given teams already exists'''
 
 
+class TeamDoubleBooked(MatchSchedulingException):
+    '''Exception indicating a team already plays too close to the proposed start'''
+
+    def __init__(self, msg: str, team_id: int, clash: Any):
+        super().__init__(msg)
+        self.team_id = team_id
+        self.clash = clash
+
+
+class InvalidFixtureFile(MatchSchedulingException):
+    '''Exception indicating an issue with an uploaded fixture file or row'''
+
+
 class MatchScheduleNotObtained(MatchSchedulerBotException):
     '''Exception indicating current match list could not be obtained'''
 
 
+class InvalidCalendarFilter(MatchScheduleNotObtained):
+    '''Exception indicating the requested calendar team or dates are invalid'''
+
+
+class AnnouncementNotDelivered(MatchSchedulerBotException):
+    '''Exception indicating an announcement could not be delivered'''
+
+
+class DestinationNotConfigured(AnnouncementNotDelivered):
+    '''Exception indicating a queued announcement's destination was removed'''
+
+
+class AnnouncementNotRendered(AnnouncementNotDelivered):
+    '''Exception indicating a queued announcement could not be rendered'''
+
+
 class MatchCancellationException(MatchSchedulerBotException):
     '''Exception indicating an issue when attempting to cancel a match'''
 
@@ -0,0 +1,255 @@
+'''
+    :module_name: metrics
+    :module_summary: in-process latency histograms and counters in the Prometheus text format
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import functools
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+
+# seconds, from a fast indexed query up to a slow Discord round trip
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    ) + '}'
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    '''A monotonically increasing count per combination of label values'''
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Labels:
+        if set(labels) != set(self.labels):
+            raise ValueError(f'{self.name} takes the labels {self.labels}')
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            yield f'{self.name}{_label_text(self.labels, key)} {_number(value)}'
+
+
+class Histogram(Counter):
+    '''Observations bucketed by upper bound, with their count and sum'''
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Labels = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(map(float, buckets))) + (float('inf'),)
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # one slot per bucket, then the count and the sum
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 2))
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - began, **labels)
+
+    def count(self, **labels: Any) -> int:
+        return self._series.get(self._key(labels), [0, 0])[-2]
+
+    def samples(self) -> Iterator[str]:
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, hits in zip(self.buckets, series):
+                cumulative += hits
+                labels = _label_text(
+                    self.labels + ('le',),
+                    key + (_number(bound),)
+                )
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _label_text(self.labels, key)
+            yield f'{self.name}_count{labels} {series[-2]}'
+            yield f'{self.name}_sum{labels} {_number(float(series[-1]))}'
+
+
+class Registry:
+    '''Every metric of the process, rendered together for scraping'''
+
+    def __init__(self):
+        self._metrics: Dict[str, Counter] = {}
+
+    def _register(self, metric: Counter) -> Counter:
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Labels = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Labels = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        '''The Prometheus text exposition format, version 0.0.4'''
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    'match_scheduler_command_seconds',
+    'Slash command latency, in total and per phase',
+    ('command', 'phase')
+)
+QUERY_SECONDS = REGISTRY.histogram(
+    'match_scheduler_query_seconds',
+    'Match database call latency',
+    ('query',)
+)
+QUERIES = REGISTRY.counter(
+    'match_scheduler_queries_total',
+    'Match database calls',
+    ('query',)
+)
+QUERY_ROWS = REGISTRY.counter(
+    'match_scheduler_query_rows_total',
+    'Rows returned, or for purges deleted, by match database calls',
+    ('query',)
+)
+TASK_SECONDS = REGISTRY.histogram(
+    'match_scheduler_task_seconds',
+    'Duration of each run of a background task',
+    ('task',)
+)
+WRITE_BATCH_REQUESTS = REGISTRY.histogram(
+    'match_scheduler_write_batch_requests',
+    'Write requests committed together by the group commit writer',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+FEED_RESPONSES = REGISTRY.counter(
+    'match_scheduler_feed_responses_total',
+    'Calendar feed responses, by whether the feed was rendered for them',
+    ('outcome',)
+)
+DELIVERY_SECONDS = REGISTRY.histogram(
+    'match_scheduler_delivery_seconds',
+    'Time to send an announcement to one destination',
+    ('outcome',)
+)
+
+
+def _rows(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
+
+
+def timed_query(query: str, rows: Callable[[Any], int] = _rows) -> Callable:
+    '''Time, count and tally the rows (as counted by `rows`) of a repository method'''
+    def decorate(method: Callable) -> Callable:
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def timed(*args, **kwargs):
+                with QUERY_SECONDS.time(query=query):
+                    result = await method(*args, **kwargs)
+                QUERIES.inc(query=query)
+                QUERY_ROWS.inc(rows(result), query=query)
+                return result
+        else:
+            @functools.wraps(method)
+            def timed(*args, **kwargs):
+                with QUERY_SECONDS.time(query=query):
+                    result = method(*args, **kwargs)
+                QUERIES.inc(query=query)
+                QUERY_ROWS.inc(rows(result), query=query)
+                return result
+        return timed
+    return decorate
+
+
+class CommandTimer:
+    '''
+        Times one command invocation. Each `lap` records the time since the
+        previous one under its phase; `done` records the whole invocation.
+    '''
+
+    def __init__(self, command: str):
+        self.command = command
+        self.began = self._last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        now = time.perf_counter()
+        COMMAND_SECONDS.observe(now - self._last, command=self.command, phase=phase)
+        self._last = now
+
+    def done(self) -> None:
+        COMMAND_SECONDS.observe(
+            time.perf_counter() - self.began,
+            command=self.command,
+            phase='total'
+        )
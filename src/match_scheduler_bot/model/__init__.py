@@ -4,8 +4,9 @@
     :module_author: CountTails
 '''
 
+import datetime
 from pathlib import Path
-from typing import List, Dict, Annotated, Optional
+from typing import Any, List, Dict, Annotated, Literal, Optional, Tuple
 
 
 import pydantic
@@ -18,13 +19,37 @@ class BotAuthInfo(pydantic.BaseModel):
 
 
 class CommandOutput(pydantic.BaseModel):
-    channel_id: Annotated[int, pydantic.Field(gt=0)]
-    mention: List[int]
+    channel_id: Optional[Annotated[int, pydantic.Field(gt=0)]] = None
+    webhook_url: Optional[pydantic.SecretStr] = None
+    mention: List[int] = []
+
+    @pydantic.model_validator(mode='after')
+    def has_one_target(self) -> 'CommandOutput':
+        if (self.channel_id is None) == (self.webhook_url is None):
+            raise ValueError('Give exactly one of `channel_id` or `webhook_url`')
+        return self
+
+
+def _as_list(value: Any) -> Any:
+    # a single destination object is still accepted for older configs
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+Destinations = Annotated[
+    List[CommandOutput],
+    pydantic.BeforeValidator(_as_list)
+]
 
 
 class CommandOutputDestination(pydantic.BaseModel):
-    public: Optional[CommandOutput]
-    audit: Optional[CommandOutput]
+    public: Destinations = []
+    audit: Destinations = []
+
+    @property
+    def everywhere(self) -> List[CommandOutput]:
+        return self.public + self.audit
 
 
 class CommandSpec(pydantic.BaseModel):
@@ -36,12 +61,163 @@ class CommandSpec(pydantic.BaseModel):
     respond: CommandOutputDestination
 
 
+class GuildOverrides(pydantic.BaseModel):
+    '''Per-guild replacements for parts of a command spec, by command key'''
+    allowlist: Dict[str, Optional[List[int | str]]] = {}
+    respond: Dict[str, CommandOutputDestination] = {}
+
+
+class ConnectionPragmas(pydantic.BaseModel):
+    journal_mode: Literal['delete', 'truncate', 'persist', 'wal'] = 'wal'
+    synchronous: Literal['off', 'normal', 'full', 'extra'] = 'normal'
+    cache_size: int = -8000
+    mmap_size: Annotated[int, pydantic.Field(ge=0)] = 0
+    busy_timeout: Annotated[int, pydantic.Field(ge=0)] = 5000
+
+
 class DataSources(pydantic.BaseModel):
     database: str | Path
+    readers: Annotated[int, pydantic.Field(gt=0)] = 4
+    expiry_grace_minutes: Annotated[int, pydantic.Field(ge=0)] = 0
+    pragmas: ConnectionPragmas = ConnectionPragmas()
+    # schedule and cancel requests arriving this close together share a commit
+    group_commit_ms: Annotated[float, pydantic.Field(ge=0)] = 2.0
+    group_commit_max: Annotated[int, pydantic.Field(gt=0)] = 64
     # timezones: Set[str]
 
 
+class DeliveryOptions(pydantic.BaseModel):
+    concurrency: Annotated[int, pydantic.Field(gt=0)] = 4
+    timeout_seconds: Annotated[float, pydantic.Field(gt=0)] = 10.0
+    batch_size: Annotated[int, pydantic.Field(gt=0)] = 50
+    max_attempts: Annotated[int, pydantic.Field(gt=0)] = 8
+    backoff_seconds: Annotated[float, pydantic.Field(gt=0)] = 2.0
+    max_backoff_seconds: Annotated[float, pydantic.Field(gt=0)] = 600.0
+
+
+class SchedulingOptions(pydantic.BaseModel):
+    '''
+        Rules for new matches. A team cannot be booked into two matches that
+        start less than `buffer_minutes` apart; 0 allows any spacing.
+    '''
+    buffer_minutes: Annotated[int, pydantic.Field(ge=0)] = 0
+
+
+def utc_midnight(day: datetime.date) -> int:
+    '''The timestamp at which `day` begins in UTC'''
+    return round(datetime.datetime.combine(
+        day,
+        datetime.time(),
+        datetime.timezone.utc
+    ).timestamp())
+
+
+class Season(pydantic.BaseModel):
+    '''The days of a league season, both included, in UTC'''
+    first_day: datetime.date
+    last_day: datetime.date
+
+    @pydantic.model_validator(mode='after')
+    def ends_after_it_starts(self) -> 'Season':
+        if self.last_day < self.first_day:
+            raise ValueError('`last_day` must not be before `first_day`')
+        return self
+
+    def window(self) -> Tuple[int, int]:
+        '''The start times of the season's matches, as [not_before, before)'''
+        return (
+            utc_midnight(self.first_day),
+            utc_midnight(self.last_day + datetime.timedelta(days=1))
+        )
+
+
+class MetricsOptions(pydantic.BaseModel):
+    '''A local HTTP endpoint serving metrics in the Prometheus text format'''
+    enabled: bool = False
+    host: str = '127.0.0.1'
+    port: Annotated[int, pydantic.Field(ge=0, le=65535)] = 9464
+
+
+class FeedOptions(pydantic.BaseModel):
+    '''A local HTTP endpoint serving the schedule as iCalendar feeds'''
+    enabled: bool = False
+    host: str = '127.0.0.1'
+    port: Annotated[int, pydantic.Field(ge=0, le=65535)] = 8465
+    name: Annotated[str, pydantic.Field(min_length=1)] = 'League matches'
+    event_minutes: Annotated[int, pydantic.Field(gt=0)] = 90
+    max_age_seconds: Annotated[int, pydantic.Field(ge=0)] = 300
+
+
+class ReloadOptions(pydantic.BaseModel):
+    '''Watch the config file and apply edits to it without a restart'''
+    enabled: bool = False
+    interval_seconds: Annotated[float, pydantic.Field(gt=0)] = 5.0
+
+
+class ShardingOptions(pydantic.BaseModel):
+    '''
+        Opt-in gateway sharding. Without `shard_count` discord.py picks the
+        recommended count; without `shard_ids` this process runs every shard.
+    '''
+    enabled: bool = False
+    shard_count: Optional[Annotated[int, pydantic.Field(gt=0)]] = None
+    shard_ids: Optional[List[Annotated[int, pydantic.Field(ge=0)]]] = None
+
+    @pydantic.model_validator(mode='after')
+    def ids_within_count(self) -> 'ShardingOptions':
+        if self.shard_ids is None:
+            return self
+        if self.shard_count is None:
+            raise ValueError('`shard_ids` needs a `shard_count`')
+        if any(i >= self.shard_count for i in self.shard_ids):
+            raise ValueError('Every shard id must be below `shard_count`')
+        return self
+
+    @staticmethod
+    def shard_of(guild_id: int, shard_count: int) -> int:
+        '''The shard Discord routes a guild's events through'''
+        return (guild_id >> 22) % shard_count
+
+    @property
+    def partitioned(self) -> bool:
+        '''Whether other processes run the remaining shards'''
+        return self.enabled and self.shard_ids is not None
+
+    def owns(self, guild_id: int) -> bool:
+        '''Whether this process serves `guild_id`'''
+        if not self.partitioned:
+            return True
+        return self.shard_of(guild_id, self.shard_count) in self.shard_ids
+
+
 class BotConfig(pydantic.BaseModel):
     auth: BotAuthInfo
     cmds: Dict[str, CommandSpec]
     data: DataSources
+    delivery: DeliveryOptions = DeliveryOptions()
+    scheduling: SchedulingOptions = SchedulingOptions()
+    # named date ranges for reading the archive of past matches by season
+    seasons: Dict[str, Season] = {}
+    sharding: ShardingOptions = ShardingOptions()
+    metrics: MetricsOptions = MetricsOptions()
+    feed: FeedOptions = FeedOptions()
+    reload: ReloadOptions = ReloadOptions()
+    guilds: Dict[Annotated[int, pydantic.Field(gt=0)], GuildOverrides] = {}
+
+    @property
+    def guild_ids(self) -> List[int]:
+        '''Every guild served: the home server first, then the others'''
+        return list(dict.fromkeys([self.auth.server, *self.guilds]))
+
+    def spec_for(self, command: str, guild_id: Optional[int]) -> CommandSpec:
+        '''The spec of `command` with the overrides of `guild_id` applied'''
+        spec = self.cmds[command]
+        overrides = self.guilds.get(guild_id)
+        if overrides is None:
+            return spec
+        update = {
+            part: getattr(overrides, part)[command]
+            for part in ('allowlist', 'respond')
+            if command in getattr(overrides, part)
+        }
+        return spec.model_copy(update=update) if update else spec
@@ -0,0 +1,132 @@
+'''
+    :module_name: blocks
+    :module_summary: columnar, array backed blocks of scheduled matches
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import bisect
+from array import array
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from .rows import ScheduledMatch
+
+
+MatchKey = Tuple[int, int, int]
+# signed 64 bit, wide enough for Discord snowflakes and unix timestamps
+TYPECODE = 'q'
+
+
+class MatchBlock:
+    '''
+        Matches of one guild stored column by column in typed arrays, three
+        machine words per match instead of an object per row. Rows must be
+        added in (start_time, team_1_id, team_2_id) order, as the database
+        and the schedule index keep them, so that time windows are found by
+        bisecting the start times. Selecting a window copies the slice of
+        each array; `ScheduledMatch` objects are only built for the rows a
+        caller asks for.
+    '''
+
+    __slots__ = ('start_times', 'team_1_ids', 'team_2_ids', 'guild_id')
+
+    def __init__(
+        self,
+        start_times: Sequence[int] = (),
+        team_1_ids: Sequence[int] = (),
+        team_2_ids: Sequence[int] = (),
+        guild_id: int = 0
+    ):
+        if not len(start_times) == len(team_1_ids) == len(team_2_ids):
+            raise ValueError('Match block columns differ in length')
+        self.start_times = array(TYPECODE, start_times)
+        self.team_1_ids = array(TYPECODE, team_1_ids)
+        self.team_2_ids = array(TYPECODE, team_2_ids)
+        self.guild_id = guild_id
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Sequence[int]],
+        guild_id: int = 0
+    ) -> MatchBlock:
+        '''A block of `(start_time, team_1_id, team_2_id, ...)` rows'''
+        block = cls(guild_id=guild_id)
+        block.extend(rows)
+        return block
+
+    def extend(self, rows: Iterable[Sequence[int]]) -> None:
+        starts, team_1s, team_2s = (
+            self.start_times.append,
+            self.team_1_ids.append,
+            self.team_2_ids.append
+        )
+        for row in rows:
+            starts(row[0])
+            team_1s(row[1])
+            team_2s(row[2])
+
+    def __len__(self) -> int:
+        return len(self.start_times)
+
+    def __getitem__(self, i: int) -> ScheduledMatch:
+        return ScheduledMatch(
+            self.start_times[i],
+            self.team_1_ids[i],
+            self.team_2_ids[i],
+            self.guild_id
+        )
+
+    def __iter__(self) -> Iterator[ScheduledMatch]:
+        for start, team_1, team_2 in self.keys():
+            yield ScheduledMatch(start, team_1, team_2, self.guild_id)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MatchBlock):
+            return NotImplemented
+        return (
+            self.guild_id == other.guild_id
+            and self.start_times == other.start_times
+            and self.team_1_ids == other.team_1_ids
+            and self.team_2_ids == other.team_2_ids
+        )
+
+    @property
+    def nbytes(self) -> int:
+        '''The size of the three columns'''
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.start_times, self.team_1_ids, self.team_2_ids)
+        )
+
+    def keys(self) -> Iterator[MatchKey]:
+        '''The `(start_time, team_1_id, team_2_id)` key of every row'''
+        return zip(self.start_times, self.team_1_ids, self.team_2_ids)
+
+    def matches(self) -> List[ScheduledMatch]:
+        return list(self)
+
+    def span(self, not_before: int, before: int) -> Tuple[int, int]:
+        '''The row positions of matches starting in [not_before, before)'''
+        lo = bisect.bisect_left(self.start_times, not_before)
+        return lo, bisect.bisect_left(self.start_times, before, lo=lo)
+
+    def _slice(self, lo: int, hi: int) -> MatchBlock:
+        block = MatchBlock(guild_id=self.guild_id)
+        block.start_times = self.start_times[lo:hi]
+        block.team_1_ids = self.team_1_ids[lo:hi]
+        block.team_2_ids = self.team_2_ids[lo:hi]
+        return block
+
+    def between(self, not_before: int, before: int) -> MatchBlock:
+        '''Matches starting in the half-open window [not_before, before)'''
+        return self._slice(*self.span(not_before, before))
+
+    def starting_within(self, now: int, lead_seconds: int) -> MatchBlock:
+        '''Matches starting after `now` and at most `lead_seconds` later'''
+        return self.between(now + 1, now + lead_seconds + 1)
+
+    def expired(self, not_after: int) -> MatchBlock:
+        '''Matches starting before `not_after`, as purged by the database'''
+        return self._slice(0, bisect.bisect_left(self.start_times, not_after))
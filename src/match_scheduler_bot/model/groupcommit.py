@@ -0,0 +1,155 @@
+'''
+    :module_name: groupcommit
+    :module_summary: a single writer task that commits bursts of write requests together
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from .matchlist import AsyncMatchListRepository
+from ..exceptions import MatchScheduleNotObtained
+from ..metrics import TASK_SECONDS, WRITE_BATCH_REQUESTS
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+T = TypeVar('T')
+WriteOperation = Callable[[AsyncMatchListRepository], Awaitable[T]]
+
+
+@dataclass
+class WriteRequest:
+    operation: WriteOperation
+    result: asyncio.Future
+
+
+class GroupCommitWriter:
+    '''
+        Owns the write side of the match database for schedule and cancel
+        requests. Requests are queued; the writer task takes the first one,
+        waits up to `window` seconds for up to `max_requests` in total, and
+        runs the group in one transaction with a savepoint per request. A
+        request that raises is rolled back on its own and its caller gets
+        the error; every caller learns its outcome only once the group is
+        committed, so nobody sees a result that is later rolled back.
+    '''
+
+    def __init__(
+        self,
+        writer: AsyncMatchListRepository,
+        window: float,
+        max_requests: int
+    ):
+        self._writer = writer
+        self.window = window
+        self.max_requests = max_requests
+        self._queue: asyncio.Queue[Optional[WriteRequest]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.is_running:
+            __LOGGER__.info(
+                'Starting group commit writer (%.1f ms, %d requests)',
+                self.window * 1000,
+                self.max_requests
+            )
+            self._task = asyncio.create_task(self._run(), name='group commit')
+
+    async def stop(self) -> None:
+        '''Commit every request already queued, then stop'''
+        if self._task is None:
+            return
+        __LOGGER__.info('Stopping group commit writer')
+        self._queue.put_nowait(None)
+        task, self._task = self._task, None
+        await task
+        # anything submitted while the last group was committing
+        while not self._queue.empty():
+            request = self._queue.get_nowait()
+            if request is not None and not request.result.done():
+                request.result.set_exception(
+                    MatchScheduleNotObtained('Match storage is not open')
+                )
+
+    async def submit(self, operation: WriteOperation) -> T:
+        '''Run `operation` in the next group commit and return its result'''
+        if not self.is_running:
+            raise MatchScheduleNotObtained('Match storage is not open')
+        request = WriteRequest(
+            operation,
+            asyncio.get_running_loop().create_future()
+        )
+        self._queue.put_nowait(request)
+        return await request.result
+
+    async def _gather(self, first: WriteRequest) -> List[Optional[WriteRequest]]:
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_requests:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            elif (timeout := deadline - loop.time()) > 0:
+                # not wait_for: before Python 3.12 it can cancel a get that
+                # already took a request, and that request is never answered
+                get = asyncio.ensure_future(self._queue.get())
+                done, _ = await asyncio.wait({get}, timeout=timeout)
+                if not done:
+                    get.cancel()
+                    await asyncio.wait({get})
+                    if get.cancelled():
+                        break
+                batch.append(get.result())
+            else:
+                break
+            if batch[-1] is None:
+                break
+        return batch
+
+    async def _commit(self, batch: List[WriteRequest]) -> None:
+        outcomes: List[Tuple[Any, Optional[BaseException]]] = []
+        try:
+            async with self._writer as db:
+                for request in batch:
+                    if request.result.cancelled():
+                        outcomes.append((None, None))
+                        continue
+                    try:
+                        async with db.savepoint():
+                            outcomes.append((await request.operation(db), None))
+                    except Exception as err:
+                        outcomes.append((None, err))
+        except Exception as err:
+            __LOGGER__.exception('Group commit of %d requests failed', len(batch))
+            outcomes = [(None, err)] * len(batch)
+        WRITE_BATCH_REQUESTS.observe(len(batch))
+        for request, (value, error) in zip(batch, outcomes):
+            if request.result.done():
+                continue
+            if error is not None:
+                request.result.set_exception(error)
+            else:
+                request.result.set_result(value)
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch = await self._gather(first)
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+            with TASK_SECONDS.time(task='group commit'):
+                await self._commit(batch)
+            if stopping:
+                return
@@ -4,62 +4,473 @@
     :module_author: CountTails
 """
 
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
 import logging
 import time
 import sqlite3
 
 from dataclasses import asdict
-from typing import List
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple
+)
+
+import aiosqlite
 
+from . import ConnectionPragmas, ShardingOptions
+from ..metrics import timed_query
+from .migrations import migrate, migrate_async
+from .blocks import MatchBlock
+from .schedule import GuildSchedules
 from .rows import (
     MatchToSchedule,
     ScheduledMatch,
-    MatchToCancel
+    MatchToCancel,
+    MatchCursor,
+    OutboxJob
 )
 from ..exceptions import (
     DuplicatedMatchDetected,
     MatchScheduleNotObtained,
-    CancellingNonexistantMatch
+    CancellingNonexistantMatch,
+    TeamDoubleBooked
 )
 
 
 __LOGGER__ = logging.getLogger(__name__)
+# the latest start time SQLite can store, for windows without an end
+LAST_START = 2**63 - 1
+
+FIND_UPCOMING_MATCHES = '''
+    SELECT * FROM matches
+    WHERE guild_id = :guild_id
+    AND start_time > :not_before AND start_time <= :not_after
+    ORDER BY start_time ASC, team_1_id ASC, team_2_id ASC
+    LIMIT :page_size
+'''
+
+FIND_UPCOMING_MATCHES_AFTER = '''
+    SELECT * FROM matches
+    WHERE guild_id = :guild_id
+    AND (start_time, team_1_id, team_2_id) > (:start_time, :team_1_id, :team_2_id)
+    AND start_time <= :not_after
+    ORDER BY start_time ASC, team_1_id ASC, team_2_id ASC
+    LIMIT :page_size
+'''
+
+FIND_UPCOMING_MATCHES_BEFORE = '''
+    SELECT * FROM matches
+    WHERE guild_id = :guild_id
+    AND start_time > :not_before AND start_time <= :not_after
+    AND (start_time, team_1_id, team_2_id) < (:start_time, :team_1_id, :team_2_id)
+    ORDER BY start_time DESC, team_1_id DESC, team_2_id DESC
+    LIMIT :page_size
+'''
+
+
+def _team_page(window: str, order: str) -> str:
+    '''
+        A page of the matches of one team: the best page from each team
+        column's index, merged. The same keyset order as the guild calendar.
+    '''
+    ordering = f'start_time {order}, team_1_id {order}, team_2_id {order}'
+    return f'''
+        SELECT * FROM (
+            SELECT * FROM (
+                SELECT * FROM matches INDEXED BY matches_by_team_1
+                WHERE guild_id = :guild_id AND team_1_id = :team_id
+                AND {window}
+                ORDER BY {ordering}
+                LIMIT :page_size
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT * FROM matches INDEXED BY matches_by_team_2
+                WHERE guild_id = :guild_id AND team_2_id = :team_id
+                AND {window}
+                ORDER BY {ordering}
+                LIMIT :page_size
+            )
+        )
+        ORDER BY {ordering}
+        LIMIT :page_size
+    '''
+
+
+# the row value comparisons cannot bound the team indexes, so each
+# window also bounds start_time on its own
+FIND_TEAM_MATCHES = _team_page(
+    'start_time > :not_before AND start_time <= :not_after',
+    'ASC'
+)
+
+FIND_TEAM_MATCHES_AFTER = _team_page(
+    '''start_time >= :start_time AND start_time <= :not_after
+    AND (start_time, team_1_id, team_2_id) > (:start_time, :team_1_id, :team_2_id)''',
+    'ASC'
+)
+
+FIND_TEAM_MATCHES_BEFORE = _team_page(
+    '''start_time > :not_before AND start_time <= :start_time
+    AND start_time <= :not_after
+    AND (start_time, team_1_id, team_2_id) < (:start_time, :team_1_id, :team_2_id)''',
+    'DESC'
+)
+
+FIND_ALL_MATCHES = '''
+    SELECT * FROM matches
+    WHERE guild_id = ?
+    ORDER BY start_time ASC, team_1_id ASC, team_2_id ASC
+'''
+
+FIND_MATCH_BLOCK = '''
+    SELECT start_time, team_1_id, team_2_id FROM matches
+    WHERE guild_id = ? AND start_time >= ? AND start_time < ?
+    ORDER BY start_time ASC, team_1_id ASC, team_2_id ASC
+'''
+# rows moved from SQLite into a block per round trip
+BLOCK_FETCH_SIZE = 4096
+
+FIND_GUILDS = '''
+    SELECT DISTINCT guild_id FROM matches
+'''
+
+DELETE_MATCH = '''
+    DELETE FROM matches
+    WHERE guild_id = :guild_id
+    AND team_1_id = :team_1_id AND team_2_id = :team_2_id
+    RETURNING *;
+'''
+
+INSERT_MATCH = '''
+    INSERT INTO matches VALUES (
+        :proposed_start_timestamp,
+        :team_1_id,
+        :team_2_id,
+        :guild_id
+    ) RETURNING *;
+'''
+
+# seeks matches_by_team_1 and matches_by_team_2 to the window of each team;
+# without the hints the planner scans every match of the guild in the window.
+# A clash with the pair itself is left to the primary key
+FIND_CLASH = '''
+    SELECT * FROM (
+        SELECT * FROM matches INDEXED BY matches_by_team_1
+        WHERE guild_id = :guild_id
+        AND team_1_id IN (:team_1_id, :team_2_id)
+        AND start_time > :earliest AND start_time < :latest
+        UNION ALL
+        SELECT * FROM matches INDEXED BY matches_by_team_2
+        WHERE guild_id = :guild_id
+        AND team_2_id IN (:team_1_id, :team_2_id)
+        AND start_time > :earliest AND start_time < :latest
+    )
+    WHERE NOT (team_1_id = :team_1_id AND team_2_id = :team_2_id)
+    LIMIT 1
+'''
+
+INSERT_MATCHES = '''
+    INSERT INTO matches VALUES (
+        :proposed_start_timestamp,
+        :team_1_id,
+        :team_2_id,
+        :guild_id
+    );
+'''
+
+ARCHIVE_EXPIRED = '''
+    INSERT OR IGNORE INTO match_archive
+    SELECT guild_id, start_time, team_1_id, team_2_id, ? FROM matches
+    WHERE guild_id = ? AND start_time < ?;
+'''
+
+FIND_ARCHIVED = '''
+    SELECT start_time, team_1_id, team_2_id, guild_id FROM match_archive
+    WHERE guild_id = :guild_id
+    AND (start_time, team_1_id, team_2_id) > (:start_time, :team_1_id, :team_2_id)
+    AND start_time < :before
+    ORDER BY start_time ASC, team_1_id ASC, team_2_id ASC
+    LIMIT :page_size
+'''
+# archived matches read per query while streaming the archive
+ARCHIVE_PAGE_SIZE = 1000
+
+PURGE_EXPIRED = '''
+    DELETE FROM matches
+    WHERE guild_id = ? AND start_time < ?;
+'''
+
+ADOPT_MATCHES = '''
+    UPDATE matches SET guild_id = ?
+    WHERE guild_id = 0;
+'''
+
+FIND_ANNOUNCED = '''
+    SELECT start_time, team_1_id, team_2_id, guild_id FROM announcements
+    WHERE guild_id = ?
+'''
+
+MARK_ANNOUNCED = '''
+    INSERT OR IGNORE INTO announcements VALUES (
+        :start_time,
+        :team_1_id,
+        :team_2_id,
+        :guild_id
+    );
+'''
+
+FORGET_ANNOUNCED = '''
+    DELETE FROM announcements
+    WHERE guild_id = :guild_id
+    AND team_1_id = :team_1_id AND team_2_id = :team_2_id;
+'''
+
+PURGE_ANNOUNCED = '''
+    DELETE FROM announcements
+    WHERE guild_id = ? AND start_time < ?;
+'''
+
+ADOPT_ANNOUNCED = '''
+    UPDATE announcements SET guild_id = ?
+    WHERE guild_id = 0;
+'''
+
+ADOPT_JOBS = '''
+    UPDATE outbox SET guild_id = ?
+    WHERE guild_id = 0;
+'''
+
+ENQUEUE_JOB = '''
+    INSERT INTO outbox (
+        guild_id, command, destination, kind, payload, not_before
+    ) VALUES (
+        :guild_id, :command, :destination, :kind, :payload, :not_before
+    );
+'''
+
+# the guilds of the shards run by this process; all of them when unpartitioned
+IN_OWN_SHARDS = '''
+    (:shard_count IS NULL OR (job.guild_id >> 22) % :shard_count IN (
+        SELECT value FROM json_each(:shard_ids)
+    ))
+'''
+
+# a job waits while an older job for the same destination is backing off,
+# so every destination receives its announcements in order
+FIND_DUE_JOBS = f'''
+    SELECT * FROM outbox AS job
+    WHERE job.not_before <= :now
+    AND {IN_OWN_SHARDS}
+    AND NOT EXISTS (
+        SELECT 1 FROM outbox AS older
+        WHERE older.destination = job.destination
+        AND older.id < job.id
+        AND older.not_before > :now
+    )
+    ORDER BY job.not_before ASC, job.id ASC
+    LIMIT :limit
+'''
+
+# only the oldest job of each destination can be due next
+NEXT_JOB_DUE = f'''
+    SELECT MIN(not_before) FROM outbox AS job
+    WHERE {IN_OWN_SHARDS}
+    AND NOT EXISTS (
+        SELECT 1 FROM outbox AS older
+        WHERE older.destination = job.destination
+        AND older.id < job.id
+    )
+'''
+
+COMPLETE_JOB = '''
+    DELETE FROM outbox
+    WHERE id = ?;
+'''
+
+GET_SETTING = '''
+    SELECT value FROM settings
+    WHERE key = ?
+'''
+
+PUT_SETTING = '''
+    INSERT INTO settings VALUES (:key, :value)
+    ON CONFLICT (key) DO UPDATE SET value = excluded.value;
+'''
+
+RETRY_JOB = '''
+    UPDATE outbox
+    SET attempts = attempts + 1, not_before = ?, last_error = ?
+    WHERE id = ?;
+'''
+
+
+def _shard_params(sharding: ShardingOptions) -> Dict[str, Any]:
+    if not sharding.partitioned:
+        return {'shard_count': None, 'shard_ids': '[]'}
+    return {
+        'shard_count': sharding.shard_count,
+        'shard_ids': json.dumps(sharding.shard_ids)
+    }
+
+
+def _clash_params(match: MatchToSchedule, buffer_seconds: int) -> Dict[str, Any]:
+    return {
+        'guild_id': match.guild_id,
+        'team_1_id': match.team_1_id,
+        'team_2_id': match.team_2_id,
+        'earliest': match.proposed_start_timestamp - buffer_seconds,
+        'latest': match.proposed_start_timestamp + buffer_seconds
+    }
+
+
+def double_booked(
+    match: MatchToSchedule,
+    clash: ScheduledMatch,
+    buffer_seconds: int
+) -> TeamDoubleBooked:
+    '''The error refusing `match` because of `clash`'''
+    team = match.team_1_id \
+        if match.team_1_id in (clash.team_1_id, clash.team_2_id) \
+        else match.team_2_id
+    return TeamDoubleBooked(
+        f'A team in this match already plays within {buffer_seconds // 60} '
+        'minutes of its start',
+        team,
+        clash
+    )
+
+
+def _archive_params(
+    guild_id: int,
+    after: MatchCursor,
+    before: int,
+    page_size: int
+) -> Dict[str, Any]:
+    return asdict(after) | {
+        'guild_id': guild_id,
+        'before': before,
+        'page_size': page_size
+    }
+
+
+def _archive_start(not_before: int) -> MatchCursor:
+    # sorts before every match starting at `not_before`, whatever its teams
+    return MatchCursor(not_before, -2**63, -2**63)
+
+
+def _upcoming_query(
+    not_before: int,
+    page_size: int,
+    after: Optional[MatchCursor],
+    before: Optional[MatchCursor],
+    guild_id: int = 0,
+    team_id: Optional[int] = None,
+    not_after: Optional[int] = None
+) -> Tuple[str, Dict[str, Any]]:
+    '''
+        Choose the keyset query for a page of upcoming matches, of the whole
+        guild or of `team_id` only, starting no later than `not_after`.
+        Pages are ordered by (start_time, team_1_id, team_2_id) and seek
+        directly past the cursor, so every page costs the same regardless
+        of its depth.
+    '''
+    params = {
+        'guild_id': guild_id,
+        'not_before': not_before,
+        'not_after': LAST_START if not_after is None else not_after,
+        'page_size': page_size
+    }
+    if team_id is None:
+        first, later, earlier = (
+            FIND_UPCOMING_MATCHES,
+            FIND_UPCOMING_MATCHES_AFTER,
+            FIND_UPCOMING_MATCHES_BEFORE
+        )
+    else:
+        params['team_id'] = team_id
+        first, later, earlier = (
+            FIND_TEAM_MATCHES,
+            FIND_TEAM_MATCHES_AFTER,
+            FIND_TEAM_MATCHES_BEFORE
+        )
+    if after is not None and before is not None:
+        raise ValueError('Only one of `after` or `before` may be given')
+    if after is not None and after.start_time > not_before:
+        # every row past the cursor is also past `not_before`
+        return later, params | asdict(after)
+    if before is not None:
+        return earlier, params | asdict(before)
+    return first, params
 
 
 class MatchListRepository:
     def __init__(self, dbpath: str):
         self._conn = sqlite3.connect(dbpath)
+        migrate(self._conn)
         self._conn.row_factory = ScheduledMatch.from_sql_row
-        self._create_matchlist_table()
 
+    @timed_query('find_upcoming_matches')
     def find_upcoming_matches(
             self,
             not_before: int,
             page_size: int = 10,
-            page_num: int = 0
+            after: Optional[MatchCursor] = None,
+            before: Optional[MatchCursor] = None,
+            guild_id: int = 0,
+            team_id: Optional[int] = None,
+            not_after: Optional[int] = None
     ) -> List[ScheduledMatch]:
-        return self._conn.execute(
-            '''
-                SELECT * FROM matches
-                WHERE start_time > ?
-                ORDER BY start_time ASC
-                LIMIT ?
-                OFFSET ?
-            ''',
-            (not_before, page_size, page_num * page_size)
+        page = self._conn.execute(
+            *_upcoming_query(
+                not_before,
+                page_size,
+                after,
+                before,
+                guild_id,
+                team_id,
+                not_after
+            )
         ).fetchall()
+        return page[::-1] if before is not None else page
+
+    @timed_query('find_all_matches')
+    def find_all_matches(self, guild_id: int = 0) -> List[ScheduledMatch]:
+        return self._conn.execute(FIND_ALL_MATCHES, (guild_id,)).fetchall()
+
+    @timed_query('find_match_block', rows=len)
+    def find_match_block(
+        self,
+        guild_id: int = 0,
+        not_before: int = 0,
+        before: int = LAST_START
+    ) -> MatchBlock:
+        '''The matches starting in [not_before, before), column by column'''
+        cursor = self._conn.cursor()
+        cursor.row_factory = None
+        return MatchBlock.from_rows(
+            cursor.execute(FIND_MATCH_BLOCK, (guild_id, not_before, before)),
+            guild_id
+        )
 
+    @timed_query('delete_match')
     def delete_match(
         self,
         match: MatchToCancel
     ) -> ScheduledMatch:
         cancelled_match = self._conn.execute(
-            '''
-                DELETE FROM matches
-                WHERE team_1_id = ? AND team_2_id = ?
-                RETURNING *;
-            ''',
-            (match.team_1_id, match.team_2_id)
+            DELETE_MATCH,
+            asdict(match)
         ).fetchone()
         if cancelled_match:
             return cancelled_match
@@ -67,19 +478,31 @@ class MatchListRepository:
             'Match cannot be cancelled because it does not exist'
         )
 
+    @timed_query('find_clash')
+    def find_clash(
+        self,
+        match: MatchToSchedule,
+        buffer_seconds: int
+    ) -> Optional[ScheduledMatch]:
+        '''A match of either team starting less than `buffer_seconds` away'''
+        return self._conn.execute(
+            FIND_CLASH,
+            _clash_params(match, buffer_seconds)
+        ).fetchone()
+
+    @timed_query('insert_match')
     def insert_match(
         self,
-        match: MatchToSchedule
+        match: MatchToSchedule,
+        buffer_seconds: int = 0
     ) -> ScheduledMatch:
+        if buffer_seconds:
+            clash = self.find_clash(match, buffer_seconds)
+            if clash is not None:
+                raise double_booked(match, clash, buffer_seconds)
         try:
             return self._conn.execute(
-                '''
-                    INSERT INTO matches VALUES (
-                        :proposed_start_timestamp,
-                        :team_1_id,
-                        :team_2_id
-                    ) RETURNING *;
-                ''',
+                INSERT_MATCH,
                 asdict(match)
             ).fetchone()
         except sqlite3.IntegrityError as err:
@@ -87,27 +510,62 @@ class MatchListRepository:
                 'Match between provided teams is already scheduled'
             ) from err
 
-    def purge_expired(self, not_after: int) -> List[ScheduledMatch]:
-        return self._conn.execute(
-            '''
-                DELETE FROM matches
-                WHERE start_time < ?
-                RETURNING *;
-            ''',
-            (not_after,)
-        ).fetchall()
+    @timed_query('insert_matches')
+    def insert_matches(
+        self,
+        matches: List[MatchToSchedule]
+    ) -> List[ScheduledMatch]:
+        try:
+            self._conn.executemany(
+                INSERT_MATCHES,
+                [asdict(m) for m in matches]
+            )
+        except sqlite3.IntegrityError as err:
+            raise DuplicatedMatchDetected(
+                'Match between provided teams is already scheduled'
+            ) from err
+        return [ScheduledMatch.from_match_to_schedule(m) for m in matches]
 
-    def _create_matchlist_table(self) -> None:
+    @timed_query('purge_expired', rows=int)
+    def purge_expired(self, not_after: int, guild_id: int = 0) -> int:
+        '''Move the matches starting before `not_after` into the archive'''
         self._conn.execute(
-            '''
-                CREATE TABLE IF NOT EXISTS matches (
-                    start_time BIG INT,
-                    team_1_id BIG INT,
-                    team_2_id BIG INT,
-                    PRIMARY KEY (team_1_id, team_2_id)
-                );
-            '''
+            ARCHIVE_EXPIRED,
+            (int(time.time()), guild_id, not_after)
         )
+        return self._conn.execute(
+            PURGE_EXPIRED,
+            (guild_id, not_after)
+        ).rowcount
+
+    def iter_archive(
+        self,
+        guild_id: int = 0,
+        not_before: int = 0,
+        before: int = LAST_START,
+        page_size: int = ARCHIVE_PAGE_SIZE
+    ) -> Iterator[ScheduledMatch]:
+        '''Archived matches starting in [not_before, before), a page at a time'''
+        after = _archive_start(not_before)
+        while True:
+            page = self._archive_page(guild_id, after, before, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = MatchCursor.from_match(page[-1])
+
+    @timed_query('find_archived')
+    def _archive_page(
+        self,
+        guild_id: int,
+        after: MatchCursor,
+        before: int,
+        page_size: int
+    ) -> List[ScheduledMatch]:
+        return self._conn.execute(
+            FIND_ARCHIVED,
+            _archive_params(guild_id, after, before, page_size)
+        ).fetchall()
 
     def __enter__(self):
         return self
@@ -117,3 +575,419 @@ class MatchListRepository:
             self._conn.rollback()
         else:
             self._conn.commit()
+
+
+class AsyncMatchListRepository:
+    '''
+        Match repository whose queries run on a background thread so that
+        awaiting them never blocks the event loop. Entering the repository
+        with ``async with`` opens a transaction that is committed on success
+        and rolled back on error; only one transaction is open at a time.
+        When given a schedule index, committed changes are written through
+        to it so that it always mirrors the database.
+    '''
+
+    def __init__(
+        self,
+        dbpath: str,
+        pragmas: Optional[ConnectionPragmas] = None,
+        read_only: bool = False,
+        schedule: Optional[GuildSchedules] = None
+    ):
+        self._dbpath = dbpath
+        self._pragmas = pragmas
+        self._read_only = read_only
+        self._schedule = schedule
+        self._added: List[ScheduledMatch] = []
+        self._removed: List[ScheduledMatch] = []
+        self._enqueued: Optional[int] = None
+        self._outbox_watchers: List[Callable[[int], None]] = []
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._txn_lock = asyncio.Lock()
+
+    async def connect(self) -> AsyncMatchListRepository:
+        if self._conn is None:
+            __LOGGER__.debug('Opening async connection to %s', self._dbpath)
+            self._conn = await aiosqlite.connect(self._dbpath)
+            await self._apply_pragmas()
+            if self._read_only:
+                await self._conn.execute('PRAGMA query_only = ON')
+            else:
+                await migrate_async(self._conn)
+            self._conn.row_factory = ScheduledMatch.from_sql_row
+        return self
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            __LOGGER__.debug('Closing async connection to %s', self._dbpath)
+            await self._conn.close()
+            self._conn = None
+
+    @property
+    def conn(self) -> aiosqlite.Connection:
+        if self._conn is None:
+            raise MatchScheduleNotObtained('Match list is not connected')
+        return self._conn
+
+    @timed_query('find_upcoming_matches')
+    async def find_upcoming_matches(
+            self,
+            not_before: int,
+            page_size: int = 10,
+            after: Optional[MatchCursor] = None,
+            before: Optional[MatchCursor] = None,
+            guild_id: int = 0,
+            team_id: Optional[int] = None,
+            not_after: Optional[int] = None
+    ) -> List[ScheduledMatch]:
+        page = list(await self.conn.execute_fetchall(
+            *_upcoming_query(
+                not_before,
+                page_size,
+                after,
+                before,
+                guild_id,
+                team_id,
+                not_after
+            )
+        ))
+        return page[::-1] if before is not None else page
+
+    @timed_query('find_all_matches')
+    async def find_all_matches(self, guild_id: int = 0) -> List[ScheduledMatch]:
+        return list(await self.conn.execute_fetchall(
+            FIND_ALL_MATCHES,
+            (guild_id,)
+        ))
+
+    @timed_query('find_match_block', rows=len)
+    async def find_match_block(
+        self,
+        guild_id: int = 0,
+        not_before: int = 0,
+        before: int = LAST_START
+    ) -> MatchBlock:
+        '''The matches starting in [not_before, before), column by column'''
+        block = MatchBlock(guild_id=guild_id)
+        async with self.conn.execute(
+            FIND_MATCH_BLOCK,
+            (guild_id, not_before, before)
+        ) as cursor:
+            cursor.row_factory = None
+            while rows := await cursor.fetchmany(BLOCK_FETCH_SIZE):
+                block.extend(rows)
+        return block
+
+    @timed_query('find_guilds')
+    async def find_guilds(self) -> List[int]:
+        '''Every guild with at least one scheduled match'''
+        async with self.conn.execute(FIND_GUILDS) as cursor:
+            cursor.row_factory = None
+            return [guild_id for guild_id, in await cursor.fetchall()]
+
+    @timed_query('adopt_legacy_rows')
+    async def adopt_legacy_rows(self, guild_id: int) -> None:
+        '''Move rows stored before multi-guild support into `guild_id`'''
+        for statement in (ADOPT_MATCHES, ADOPT_ANNOUNCED, ADOPT_JOBS):
+            await self.conn.execute(statement, (guild_id,))
+
+    @timed_query('delete_match')
+    async def delete_match(
+        self,
+        match: MatchToCancel
+    ) -> ScheduledMatch:
+        async with self.conn.execute(
+            DELETE_MATCH,
+            asdict(match)
+        ) as cursor:
+            cancelled_match = await cursor.fetchone()
+        if cancelled_match:
+            await self.conn.execute(FORGET_ANNOUNCED, asdict(match))
+            if cancelled_match in self._added:
+                self._added.remove(cancelled_match)
+            else:
+                self._removed.append(cancelled_match)
+            return cancelled_match
+        raise CancellingNonexistantMatch(
+            'Match cannot be cancelled because it does not exist'
+        )
+
+    @timed_query('find_clash')
+    async def find_clash(
+        self,
+        match: MatchToSchedule,
+        buffer_seconds: int
+    ) -> Optional[ScheduledMatch]:
+        '''A match of either team starting less than `buffer_seconds` away'''
+        async with self.conn.execute(
+            FIND_CLASH,
+            _clash_params(match, buffer_seconds)
+        ) as cursor:
+            return await cursor.fetchone()
+
+    @timed_query('insert_match')
+    async def insert_match(
+        self,
+        match: MatchToSchedule,
+        buffer_seconds: int = 0
+    ) -> ScheduledMatch:
+        '''
+            Schedule `match`, refusing it when either team already plays
+            less than `buffer_seconds` before or after it
+        '''
+        if buffer_seconds:
+            clash = await self.find_clash(match, buffer_seconds)
+            if clash is not None:
+                raise double_booked(match, clash, buffer_seconds)
+        try:
+            async with self.conn.execute(
+                INSERT_MATCH,
+                asdict(match)
+            ) as cursor:
+                scheduled = await cursor.fetchone()
+        except sqlite3.IntegrityError as err:
+            raise DuplicatedMatchDetected(
+                'Match between provided teams is already scheduled'
+            ) from err
+        self._added.append(scheduled)
+        return scheduled
+
+    @timed_query('insert_matches')
+    async def insert_matches(
+        self,
+        matches: List[MatchToSchedule]
+    ) -> List[ScheduledMatch]:
+        try:
+            await self.conn.executemany(
+                INSERT_MATCHES,
+                [asdict(m) for m in matches]
+            )
+        except sqlite3.IntegrityError as err:
+            raise DuplicatedMatchDetected(
+                'Match between provided teams is already scheduled'
+            ) from err
+        scheduled = [
+            ScheduledMatch.from_match_to_schedule(m) for m in matches
+        ]
+        self._added.extend(scheduled)
+        return scheduled
+
+    @timed_query('purge_expired', rows=int)
+    async def purge_expired(self, not_after: int, guild_id: int = 0) -> int:
+        '''Move the matches starting before `not_after` into the archive'''
+        await self.conn.execute(
+            ARCHIVE_EXPIRED,
+            (int(time.time()), guild_id, not_after)
+        )
+        async with self.conn.execute(
+            PURGE_EXPIRED,
+            (guild_id, not_after)
+        ) as cursor:
+            purged = cursor.rowcount
+        await self.conn.execute(PURGE_ANNOUNCED, (guild_id, not_after))
+        if self._schedule is not None:
+            # the index already knows which rows went, so the delete
+            # does not need to send them back
+            self._removed.extend(self._schedule[guild_id].expired(not_after))
+            self._added[:] = [
+                m for m in self._added
+                if m.guild_id != guild_id or m.start_time >= not_after
+            ]
+        return purged
+
+    async def iter_archive(
+        self,
+        guild_id: int = 0,
+        not_before: int = 0,
+        before: int = LAST_START,
+        page_size: int = ARCHIVE_PAGE_SIZE
+    ) -> AsyncIterator[ScheduledMatch]:
+        '''
+            Archived matches starting in [not_before, before). Each page is
+            its own short query, so a long walk over the archive neither
+            holds the whole range in memory nor keeps a read open.
+        '''
+        after = _archive_start(not_before)
+        while True:
+            page = await self._archive_page(guild_id, after, before, page_size)
+            for match in page:
+                yield match
+            if len(page) < page_size:
+                return
+            after = MatchCursor.from_match(page[-1])
+
+    @timed_query('find_archived')
+    async def _archive_page(
+        self,
+        guild_id: int,
+        after: MatchCursor,
+        before: int,
+        page_size: int
+    ) -> List[ScheduledMatch]:
+        return list(await self.conn.execute_fetchall(
+            FIND_ARCHIVED,
+            _archive_params(guild_id, after, before, page_size)
+        ))
+
+    @timed_query('find_announced')
+    async def find_announced(self, guild_id: int = 0) -> List[ScheduledMatch]:
+        return list(await self.conn.execute_fetchall(
+            FIND_ANNOUNCED,
+            (guild_id,)
+        ))
+
+    @timed_query('mark_announced')
+    async def mark_announced(self, matches: List[ScheduledMatch]) -> None:
+        await self.conn.executemany(
+            MARK_ANNOUNCED,
+            [asdict(m) for m in matches]
+        )
+
+    def watch_outbox(self, watcher: Callable[[int], None]) -> None:
+        '''Call `watcher(earliest due)` after a commit that queued jobs'''
+        self._outbox_watchers.append(watcher)
+
+    def unwatch_outbox(self, watcher: Callable[[int], None]) -> None:
+        self._outbox_watchers.remove(watcher)
+
+    @timed_query('enqueue')
+    async def enqueue(
+        self,
+        command: str,
+        kind: str,
+        matches: List[ScheduledMatch],
+        destinations: List[str],
+        not_before: int,
+        guild_id: int = 0
+    ) -> None:
+        '''Queue one announcement job per destination in this transaction'''
+        payload = OutboxJob.encode(matches)
+        await self.conn.executemany(
+            ENQUEUE_JOB,
+            [
+                {
+                    'guild_id': guild_id,
+                    'command': command,
+                    'destination': destination,
+                    'kind': kind,
+                    'payload': payload,
+                    'not_before': not_before
+                }
+                for destination in destinations
+            ]
+        )
+        if destinations:
+            self._enqueued = not_before if self._enqueued is None \
+                else min(self._enqueued, not_before)
+
+    @timed_query('find_due_jobs')
+    async def find_due_jobs(
+        self,
+        now: int,
+        limit: int,
+        sharding: ShardingOptions = ShardingOptions()
+    ) -> List[OutboxJob]:
+        async with self.conn.execute(
+            FIND_DUE_JOBS,
+            {'now': now, 'limit': limit} | _shard_params(sharding)
+        ) as cursor:
+            cursor.row_factory = OutboxJob.from_sql_row
+            return list(await cursor.fetchall())
+
+    @timed_query('next_job_due')
+    async def next_job_due(
+        self,
+        sharding: ShardingOptions = ShardingOptions()
+    ) -> Optional[int]:
+        async with self.conn.execute(
+            NEXT_JOB_DUE,
+            _shard_params(sharding)
+        ) as cursor:
+            cursor.row_factory = None
+            due, = await cursor.fetchone()
+        return due
+
+    @timed_query('complete_job')
+    async def complete_job(self, job: OutboxJob) -> None:
+        await self.conn.execute(COMPLETE_JOB, (job.id,))
+
+    @timed_query('retry_job')
+    async def retry_job(
+        self,
+        job: OutboxJob,
+        not_before: int,
+        error: str
+    ) -> None:
+        await self.conn.execute(RETRY_JOB, (not_before, error, job.id))
+
+    @timed_query('get_setting')
+    async def get_setting(self, key: str) -> Optional[str]:
+        async with self.conn.execute(GET_SETTING, (key,)) as cursor:
+            cursor.row_factory = None
+            row = await cursor.fetchone()
+        return None if row is None else row[0]
+
+    @timed_query('put_setting')
+    async def put_setting(self, key: str, value: str) -> None:
+        await self.conn.execute(PUT_SETTING, {'key': key, 'value': value})
+
+    async def _apply_pragmas(self) -> None:
+        if self._pragmas is None:
+            return
+        for pragma, value in self._pragmas.model_dump().items():
+            if pragma == 'journal_mode' and self._read_only:
+                continue
+            __LOGGER__.debug('Setting PRAGMA %s = %s', pragma, value)
+            await self.conn.execute(f'PRAGMA {pragma} = {value}')
+
+    @contextlib.asynccontextmanager
+    async def savepoint(self) -> AsyncIterator[AsyncMatchListRepository]:
+        '''
+            Undo only the changes made in the block if it raises, keeping
+            the rest of the open transaction
+        '''
+        added, removed = list(self._added), list(self._removed)
+        enqueued = self._enqueued
+        # outside a transaction a savepoint starts its own, and releasing
+        # it commits; it must nest in the transaction of the whole group
+        if not self.conn.in_transaction:
+            await self.conn.execute('BEGIN IMMEDIATE')
+        await self.conn.execute('SAVEPOINT request')
+        try:
+            yield self
+        except BaseException:
+            await self.conn.execute('ROLLBACK TO request')
+            await self.conn.execute('RELEASE request')
+            self._added[:], self._removed[:] = added, removed
+            self._enqueued = enqueued
+            raise
+        await self.conn.execute('RELEASE request')
+
+    def _notify(self) -> None:
+        # the transaction is committed by now, so a failure here must not
+        # reach the caller as if its write had been rolled back
+        try:
+            if self._schedule is not None:
+                self._schedule.apply(self._added, self._removed)
+            if self._enqueued is not None:
+                for watcher in self._outbox_watchers:
+                    watcher(self._enqueued)
+        except Exception:
+            __LOGGER__.exception('Failed to apply a committed write in memory')
+
+    async def __aenter__(self):
+        await self._txn_lock.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, traceback):
+        try:
+            if exc_val:
+                await self.conn.rollback()
+            else:
+                await self.conn.commit()
+                self._notify()
+        finally:
+            self._added.clear()
+            self._removed.clear()
+            self._enqueued = None
+            self._txn_lock.release()
@@ -0,0 +1,210 @@
+'''
+    :module_name: migrations
+    :module_summary: versioned schema migrations for the match database
+    :module_author: CountTails
+'''
+
+import logging
+import sqlite3
+from typing import List, Tuple
+
+import aiosqlite
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+# MIGRATIONS[n] upgrades a database from `PRAGMA user_version` n to n + 1.
+# Released entries must never be edited; append a new one instead.
+MIGRATIONS: List[Tuple[str, ...]] = [
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS matches (
+                start_time BIG INT,
+                team_1_id BIG INT,
+                team_2_id BIG INT,
+                PRIMARY KEY (team_1_id, team_2_id)
+            );
+        ''',
+    ),
+    (
+        '''
+            CREATE INDEX IF NOT EXISTS matches_by_start_time
+            ON matches (start_time);
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS matches_by_team_1
+            ON matches (team_1_id, start_time);
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS matches_by_team_2
+            ON matches (team_2_id, start_time);
+        ''',
+    ),
+    (
+        'DROP INDEX IF EXISTS matches_by_start_time;',
+        '''
+            CREATE INDEX IF NOT EXISTS matches_by_schedule
+            ON matches (start_time, team_1_id, team_2_id);
+        ''',
+    ),
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS announcements (
+                start_time BIG INT,
+                team_1_id BIG INT,
+                team_2_id BIG INT,
+                PRIMARY KEY (team_1_id, team_2_id, start_time)
+            );
+        ''',
+    ),
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                command TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INT NOT NULL DEFAULT 0,
+                not_before BIG INT NOT NULL,
+                last_error TEXT
+            );
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS outbox_by_due
+            ON outbox (not_before, id);
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS outbox_by_destination
+            ON outbox (destination, id);
+        ''',
+    ),
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        ''',
+    ),
+    # guild 0 holds rows from before multi-guild support until the storage
+    # adopts them into the home server
+    (
+        '''
+            CREATE TABLE guild_matches (
+                start_time BIG INT,
+                team_1_id BIG INT,
+                team_2_id BIG INT,
+                guild_id BIG INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, team_1_id, team_2_id)
+            );
+        ''',
+        '''
+            INSERT INTO guild_matches (start_time, team_1_id, team_2_id)
+            SELECT start_time, team_1_id, team_2_id FROM matches;
+        ''',
+        'DROP TABLE matches;',
+        'ALTER TABLE guild_matches RENAME TO matches;',
+        '''
+            CREATE INDEX matches_by_schedule
+            ON matches (guild_id, start_time, team_1_id, team_2_id);
+        ''',
+        '''
+            CREATE INDEX matches_by_team_1
+            ON matches (guild_id, team_1_id, start_time);
+        ''',
+        '''
+            CREATE INDEX matches_by_team_2
+            ON matches (guild_id, team_2_id, start_time);
+        ''',
+        '''
+            CREATE TABLE guild_announcements (
+                start_time BIG INT,
+                team_1_id BIG INT,
+                team_2_id BIG INT,
+                guild_id BIG INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, team_1_id, team_2_id, start_time)
+            );
+        ''',
+        '''
+            INSERT INTO guild_announcements (start_time, team_1_id, team_2_id)
+            SELECT start_time, team_1_id, team_2_id FROM announcements;
+        ''',
+        'DROP TABLE announcements;',
+        'ALTER TABLE guild_announcements RENAME TO announcements;',
+        'ALTER TABLE outbox ADD COLUMN guild_id BIG INT NOT NULL DEFAULT 0;',
+    ),
+    # expired matches move here instead of being deleted; keyed in calendar
+    # order so date ranges are read from one contiguous stretch of the table
+    (
+        '''
+            CREATE TABLE match_archive (
+                guild_id BIG INT NOT NULL,
+                start_time BIG INT NOT NULL,
+                team_1_id BIG INT NOT NULL,
+                team_2_id BIG INT NOT NULL,
+                archived_at BIG INT NOT NULL,
+                PRIMARY KEY (guild_id, start_time, team_1_id, team_2_id)
+            ) WITHOUT ROWID;
+        ''',
+    ),
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def _pending(current: int) -> List[Tuple[int, Tuple[str, ...]]]:
+    if current > LATEST_VERSION:
+        __LOGGER__.warning(
+            'Database schema version %d is newer than this bot (%d)',
+            current,
+            LATEST_VERSION
+        )
+    return [
+        (version + 1, MIGRATIONS[version])
+        for version in range(current, LATEST_VERSION)
+    ]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    '''Upgrade the schema in place, one transaction per version'''
+    current, = conn.execute('PRAGMA user_version').fetchone()
+    for version, statements in _pending(current):
+        try:
+            # the write lock is taken before the version is checked again,
+            # so processes sharing the database apply each version once
+            conn.execute('BEGIN IMMEDIATE')
+            applied, = conn.execute('PRAGMA user_version').fetchone()
+            if applied < version:
+                __LOGGER__.info('Migrating match database to version %d', version)
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        current = version
+    return current
+
+
+async def migrate_async(conn: aiosqlite.Connection) -> int:
+    '''Upgrade the schema in place, one transaction per version'''
+    async with conn.execute('PRAGMA user_version') as cursor:
+        current, = await cursor.fetchone()
+    for version, statements in _pending(current):
+        try:
+            await conn.execute('BEGIN IMMEDIATE')
+            async with conn.execute('PRAGMA user_version') as cursor:
+                applied, = await cursor.fetchone()
+            if applied < version:
+                __LOGGER__.info('Migrating match database to version %d', version)
+                for statement in statements:
+                    await conn.execute(statement)
+                await conn.execute(f'PRAGMA user_version = {version}')
+            await conn.commit()
+        except sqlite3.Error:
+            await conn.rollback()
+            raise
+        current = version
+    return current
@@ -6,39 +6,44 @@
 
 from __future__ import annotations
 
+import json
 import sqlite3
 
-from typing import Tuple
+from typing import Any, List, Optional, Tuple
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class MatchToSchedule:
     proposed_start_timestamp: int
     team_1_id: int
     team_2_id: int
+    guild_id: int = 0
 
     @classmethod
     def with_determistic_team_ordering(
         cls,
         start_time: int,
         team1: int,
-        team2: int
+        team2: int,
+        guild_id: int = 0
     ) -> MatchToSchedule:
         if team1 > team2:
             team1, team2 = team2, team1
         return cls(
             start_time,
             team1,
-            team2
+            team2,
+            guild_id
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ScheduledMatch:
     start_time: int
     team_1_id: int
     team_2_id: int
+    guild_id: int = 0
 
     @classmethod
     def from_sql_row(
@@ -49,24 +54,92 @@ class ScheduledMatch:
         return cls(
             row[0],
             row[1],
-            row[2]
+            row[2],
+            row[3]
+        )
+
+    @classmethod
+    def from_match_to_schedule(cls, match: MatchToSchedule) -> ScheduledMatch:
+        return cls(
+            match.proposed_start_timestamp,
+            match.team_1_id,
+            match.team_2_id,
+            match.guild_id
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class MatchCursor:
+    start_time: int
+    team_1_id: int
+    team_2_id: int
+
+    @classmethod
+    def from_match(cls, match: ScheduledMatch) -> MatchCursor:
+        return cls(
+            match.start_time,
+            match.team_1_id,
+            match.team_2_id
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class MatchToCancel:
     team_1_id: int
     team_2_id: int
+    guild_id: int = 0
 
     @classmethod
     def with_determistic_team_ordering(
         cls,
         team1: int,
-        team2: int
+        team2: int,
+        guild_id: int = 0
     ) -> MatchToCancel:
         if team1 > team2:
             team1, team2 = team2, team1
         return cls(
             team1,
-            team2
+            team2,
+            guild_id
+        )
+
+
+@dataclass(slots=True)
+class OutboxJob:
+    id: int
+    command: str
+    destination: str
+    kind: str
+    matches: List[ScheduledMatch]
+    attempts: int
+    not_before: int
+    last_error: Optional[str] = None
+    guild_id: int = 0
+
+    @staticmethod
+    def encode(matches: List[ScheduledMatch]) -> str:
+        return json.dumps(
+            [
+                [m.start_time, m.team_1_id, m.team_2_id, m.guild_id]
+                for m in matches
+            ]
+        )
+
+    @classmethod
+    def from_sql_row(
+        cls,
+        cursor: sqlite3.Cursor,
+        row: Tuple[Any, ...]
+    ) -> OutboxJob:
+        return cls(
+            row[0],
+            row[1],
+            row[2],
+            row[3],
+            [ScheduledMatch(*m) for m in json.loads(row[4])],
+            row[5],
+            row[6],
+            row[7],
+            row[8]
         )
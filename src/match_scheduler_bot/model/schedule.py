@@ -0,0 +1,230 @@
+'''
+    :module_name: schedule
+    :module_summary: an in-memory, time ordered index of scheduled matches
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import bisect
+import logging
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .blocks import MatchBlock, MatchKey
+from .rows import MatchCursor, MatchToSchedule, ScheduledMatch
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+ScheduleWatcher = Callable[[List[ScheduledMatch], List[ScheduledMatch]], None]
+GuildWatcher = Callable[[int, List[ScheduledMatch], List[ScheduledMatch]], None]
+_start_time = itemgetter(0)
+
+
+def match_key(match: ScheduledMatch | MatchCursor) -> MatchKey:
+    return (match.start_time, match.team_1_id, match.team_2_id)
+
+
+class ScheduleIndex:
+    '''
+        Every scheduled match kept sorted by (start_time, team_1_id,
+        team_2_id), the same order the database pages in. Range lookups
+        bisect the sorted keys and so cost O(log n) plus the size of the
+        answer. The index is write-through: the storage writer applies its
+        changes here once they are committed. One index holds one guild.
+    '''
+
+    def __init__(
+        self,
+        matches: Iterable[ScheduledMatch] = (),
+        guild_id: int = 0
+    ):
+        self.guild_id = guild_id
+        self._keys: List[MatchKey] = []
+        self._by_teams: Dict[Tuple[int, int], MatchKey] = {}
+        self._watchers: List[ScheduleWatcher] = []
+        self.load(matches)
+
+    def load(self, matches: Iterable[ScheduledMatch] | MatchBlock) -> None:
+        if isinstance(matches, MatchBlock):
+            # already in key order, and no row objects to unpack
+            self._keys = list(matches.keys())
+        else:
+            self._keys = sorted(match_key(m) for m in matches)
+        self._by_teams = {(k[1], k[2]): k for k in self._keys}
+        __LOGGER__.debug('Loaded %d matches into the schedule', len(self))
+
+    def _match(self, key: MatchKey) -> ScheduledMatch:
+        return ScheduledMatch(*key, self.guild_id)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[ScheduledMatch]:
+        return map(self._match, self._keys)
+
+    def __contains__(self, match: ScheduledMatch) -> bool:
+        return self._by_teams.get(
+            (match.team_1_id, match.team_2_id)
+        ) == match_key(match)
+
+    def has_teams(self, team_1_id: int, team_2_id: int) -> bool:
+        return (team_1_id, team_2_id) in self._by_teams
+
+    def add(self, match: ScheduledMatch) -> None:
+        self.discard(match.team_1_id, match.team_2_id)
+        key = match_key(match)
+        bisect.insort(self._keys, key)
+        self._by_teams[(key[1], key[2])] = key
+
+    def discard(self, team_1_id: int, team_2_id: int) -> None:
+        key = self._by_teams.pop((team_1_id, team_2_id), None)
+        if key is not None:
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def find_clash(
+        self,
+        match: MatchToSchedule,
+        buffer_seconds: int
+    ) -> Optional[ScheduledMatch]:
+        '''
+            A match of either team starting less than `buffer_seconds` away,
+            the same answer as the repositories' `find_clash`
+        '''
+        teams = (match.team_1_id, match.team_2_id)
+        earliest = match.proposed_start_timestamp - buffer_seconds
+        latest = match.proposed_start_timestamp + buffer_seconds
+        for clash in self.between(earliest + 1, latest):
+            if (clash.team_1_id, clash.team_2_id) != teams and (
+                clash.team_1_id in teams or clash.team_2_id in teams
+            ):
+                return clash
+        return None
+
+    def watch(self, watcher: ScheduleWatcher) -> None:
+        '''Call `watcher(added, removed)` after every applied change'''
+        self._watchers.append(watcher)
+
+    def unwatch(self, watcher: ScheduleWatcher) -> None:
+        self._watchers.remove(watcher)
+
+    def apply(
+        self,
+        added: List[ScheduledMatch],
+        removed: List[ScheduledMatch]
+    ) -> None:
+        for match in removed:
+            self.discard(match.team_1_id, match.team_2_id)
+        for match in added:
+            self.add(match)
+        if added or removed:
+            for watcher in self._watchers:
+                watcher(added, removed)
+
+    def between(self, not_before: int, before: int) -> List[ScheduledMatch]:
+        '''Matches starting in the half-open window [not_before, before)'''
+        lo = bisect.bisect_left(self._keys, not_before, key=_start_time)
+        hi = bisect.bisect_left(self._keys, before, lo=lo, key=_start_time)
+        return [self._match(k) for k in self._keys[lo:hi]]
+
+    def expired(self, not_after: int) -> List[ScheduledMatch]:
+        '''Matches starting before `not_after`, as purged by the database'''
+        hi = bisect.bisect_left(self._keys, not_after, key=_start_time)
+        return [self._match(k) for k in self._keys[:hi]]
+
+    def iter_from(self, not_before: int) -> Iterator[ScheduledMatch]:
+        '''Lazily walk the matches starting at or after `not_before`'''
+        i = bisect.bisect_left(self._keys, not_before, key=_start_time)
+        while i < len(self._keys):
+            yield self._match(self._keys[i])
+            i += 1
+
+    def next_start(self, not_before: Optional[int] = None) -> Optional[int]:
+        '''The earliest start time at or after `not_before`, if any'''
+        i = 0 if not_before is None else bisect.bisect_left(
+            self._keys, not_before, key=_start_time
+        )
+        return self._keys[i][0] if i < len(self._keys) else None
+
+    def upcoming(
+        self,
+        not_before: int,
+        page_size: int = 10,
+        after: Optional[MatchCursor] = None,
+        before: Optional[MatchCursor] = None
+    ) -> List[ScheduledMatch]:
+        '''The same keyset pages as `find_upcoming_matches`, from memory'''
+        if after is not None and before is not None:
+            raise ValueError('Only one of `after` or `before` may be given')
+        first = bisect.bisect_right(self._keys, not_before, key=_start_time)
+        if before is not None:
+            hi = max(first, bisect.bisect_left(self._keys, match_key(before)))
+            lo = max(first, hi - page_size)
+        else:
+            lo = first
+            if after is not None:
+                lo = max(lo, bisect.bisect_right(self._keys, match_key(after)))
+            hi = lo + page_size
+        return [self._match(k) for k in self._keys[lo:hi]]
+
+
+class GuildSchedules:
+    '''
+        One `ScheduleIndex` per guild, created on first use. Changes are
+        routed to the index of the guild each match belongs to, and guild
+        watchers hear about every guild's changes along with its ID.
+    '''
+
+    def __init__(self):
+        self._guilds: Dict[int, ScheduleIndex] = {}
+        self._watchers: List[GuildWatcher] = []
+
+    def __getitem__(self, guild_id: int) -> ScheduleIndex:
+        if guild_id not in self._guilds:
+            self._guilds[guild_id] = ScheduleIndex(guild_id=guild_id)
+        return self._guilds[guild_id]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self._guilds))
+
+    def __len__(self) -> int:
+        return sum(len(index) for index in self._guilds.values())
+
+    def load(
+        self,
+        guild_id: int,
+        matches: Iterable[ScheduledMatch] | MatchBlock
+    ) -> None:
+        self[guild_id].load(matches)
+
+    def watch(self, watcher: GuildWatcher) -> None:
+        '''Call `watcher(guild_id, added, removed)` after applied changes'''
+        self._watchers.append(watcher)
+
+    def unwatch(self, watcher: GuildWatcher) -> None:
+        self._watchers.remove(watcher)
+
+    def apply(
+        self,
+        added: List[ScheduledMatch],
+        removed: List[ScheduledMatch]
+    ) -> None:
+        changes: Dict[int, Tuple[List, List]] = {}
+        for match in added:
+            changes.setdefault(match.guild_id, ([], []))[0].append(match)
+        for match in removed:
+            changes.setdefault(match.guild_id, ([], []))[1].append(match)
+        for guild_id, (guild_added, guild_removed) in changes.items():
+            self[guild_id].apply(guild_added, guild_removed)
+            for watcher in self._watchers:
+                watcher(guild_id, guild_added, guild_removed)
+
+    def next_start(self) -> Optional[Tuple[int, int]]:
+        '''The earliest (start time, guild ID) over every guild, if any'''
+        starts = [
+            (start, guild_id)
+            for guild_id, index in self._guilds.items()
+            if (start := index.next_start()) is not None
+        ]
+        return min(starts, default=None)
@@ -0,0 +1,150 @@
+'''
+    :module_name: storage
+    :module_summary: a shared match storage service with one writer and pooled readers
+    :module_author: CountTails
+'''
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import contextlib
+from typing import AsyncIterator, Callable, List, Optional
+
+from . import DataSources, ShardingOptions
+from .groupcommit import GroupCommitWriter, T, WriteOperation
+from .matchlist import AsyncMatchListRepository
+from .schedule import GuildSchedules
+from ..exceptions import MatchScheduleNotObtained
+
+
+__LOGGER__ = logging.getLogger(__name__)
+
+
+class MatchStorage:
+    '''
+        Owns every connection to the match database. Writes are funneled
+        through a single connection, while reads borrow one of a small pool
+        of read-only connections so that, in WAL mode, they see the last
+        committed schedule without waiting on an open write transaction.
+        The whole schedule is also mirrored in memory, per guild, for range
+        lookups. Rows stored before multi-guild support are adopted into
+        `legacy_guild_id` when it is given. When this process runs only some
+        of the bot's shards, only the guilds of those shards are mirrored.
+        Schedule and cancel requests go through `write`, which commits
+        requests arriving close together in one transaction.
+    '''
+
+    def __init__(
+        self,
+        sources: DataSources,
+        legacy_guild_id: Optional[int] = None,
+        sharding: ShardingOptions = ShardingOptions()
+    ):
+        self._sources = sources
+        self._legacy_guild_id = legacy_guild_id
+        self.sharding = sharding
+        self._schedule = GuildSchedules()
+        self._writer = AsyncMatchListRepository(
+            str(sources.database),
+            pragmas=sources.pragmas,
+            schedule=self._schedule
+        )
+        self._writes = GroupCommitWriter(
+            self._writer,
+            sources.group_commit_ms / 1000,
+            sources.group_commit_max
+        )
+        self._readers: List[AsyncMatchListRepository] = []
+        self._idle: Optional[asyncio.Queue[AsyncMatchListRepository]] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._idle is not None
+
+    async def open(self) -> MatchStorage:
+        if self.is_open:
+            return self
+        __LOGGER__.info(
+            'Opening match storage %s with %d readers',
+            self._sources.database,
+            self._sources.readers
+        )
+        # the writer goes first so that the schema and journal mode exist
+        # before any reader connects
+        await self._writer.connect()
+        if self._legacy_guild_id is not None:
+            async with self._writer as db:
+                await db.adopt_legacy_rows(self._legacy_guild_id)
+        for guild_id in await self._writer.find_guilds():
+            if not self.sharding.owns(guild_id):
+                continue
+            self._schedule.load(
+                guild_id,
+                await self._writer.find_match_block(guild_id)
+            )
+        self._idle = asyncio.Queue()
+        for _ in range(self._sources.readers):
+            reader = await AsyncMatchListRepository(
+                str(self._sources.database),
+                pragmas=self._sources.pragmas,
+                read_only=True
+            ).connect()
+            self._readers.append(reader)
+            self._idle.put_nowait(reader)
+        self._writes.start()
+        return self
+
+    async def close(self) -> None:
+        if not self.is_open:
+            return
+        __LOGGER__.info('Closing match storage %s', self._sources.database)
+        await self._writes.stop()
+        for reader in self._readers:
+            await reader.close()
+        self._readers.clear()
+        self._idle = None
+        await self._writer.close()
+
+    @property
+    def schedule(self) -> GuildSchedules:
+        '''The in-memory mirror of every committed match, by guild'''
+        if not self.is_open:
+            raise MatchScheduleNotObtained('Match storage is not open')
+        return self._schedule
+
+    def writer(self) -> AsyncMatchListRepository:
+        '''The repository to enter with ``async with`` to make changes'''
+        if not self.is_open:
+            raise MatchScheduleNotObtained('Match storage is not open')
+        return self._writer
+
+    async def write(self, operation: WriteOperation) -> T:
+        '''
+            Await `operation(repository)` inside a transaction shared with
+            other requests made at about the same time, and return its
+            result once committed. If it raises, only its own changes are
+            rolled back and the error is raised here.
+        '''
+        if not self.is_open:
+            raise MatchScheduleNotObtained('Match storage is not open')
+        return await self._writes.submit(operation)
+
+    def watch_outbox(self, watcher: Callable[[int], None]) -> None:
+        '''Call `watcher(earliest due)` whenever announcements are queued'''
+        self._writer.watch_outbox(watcher)
+
+    def unwatch_outbox(self, watcher: Callable[[int], None]) -> None:
+        self._writer.unwatch_outbox(watcher)
+
+    @contextlib.asynccontextmanager
+    async def reader(self) -> AsyncIterator[AsyncMatchListRepository]:
+        '''Borrow a read-only repository for the duration of the block'''
+        if not self.is_open:
+            raise MatchScheduleNotObtained('Match storage is not open')
+        idle = self._idle
+        repo = await idle.get()
+        try:
+            yield repo
+        finally:
+            idle.put_nowait(repo)
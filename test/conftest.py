@@ -0,0 +1,10 @@
+"""Shared fixtures for match_scheduler_bot tests"""
+
+from pathlib import Path
+
+import match_scheduler_bot
+
+# the bot package reads its command specs at import time
+match_scheduler_bot.setup_config(
+    Path(__file__).resolve().parent.parent / 'bot.example.json'
+)
@@ -0,0 +1,207 @@
+"""
+    :module_name: discord_standin
+    :module_summary: an offline stand-in for the Discord objects the cogs touch
+    :module_author: CountTails
+
+Interactions, guilds, roles, members and channels with just the surface the
+cogs use (``interaction.response``, ``interaction.followup``,
+``guild.get_channel``, ``guild.get_role`` and friends). Every call that
+would reach Discord waits out an injected latency instead, none by default,
+and is recorded so a test or driver can check what the cogs answered.
+``invoke`` runs an app command's checks and then its real callback, as
+discord.py would. Shared by the unit tests and the benchmarks in bench/.
+"""
+
+import asyncio
+import random
+from typing import Any, Dict, Iterable, List, Optional
+
+import discord
+from discord.ext import commands
+
+
+class Latency:
+    '''A round trip to Discord: `mean_ms` give or take up to `jitter_ms`'''
+
+    def __init__(self, mean_ms: float = 0, jitter_ms: float = 0, seed: int = 0):
+        self.mean = mean_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self._random = random.Random(seed)
+
+    async def wait(self) -> None:
+        delay = self.mean + self._random.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(0.0, delay))
+
+
+NO_LATENCY = Latency()
+
+
+class StandInRole:
+    def __init__(self, role_id: int, name: Optional[str] = None):
+        self.id = role_id
+        self.name = name or f'Team {role_id}'
+        self.mention = f'<@&{role_id}>'
+
+
+class StandInMember(discord.Member):
+    '''Passes the `isinstance(user, discord.Member)` test of the role checks'''
+
+    def __init__(self, member_id: int, roles: List[StandInRole]):
+        self._standin_id = member_id
+        self._standin_roles = roles
+
+    @property
+    def id(self) -> int:
+        return self._standin_id
+
+    @property
+    def roles(self) -> List[StandInRole]:
+        return self._standin_roles
+
+    @property
+    def display_name(self) -> str:
+        return f'member {self._standin_id}'
+
+    @property
+    def mention(self) -> str:
+        return f'<@{self._standin_id}>'
+
+    def get_role(self, role_id: int) -> Optional[StandInRole]:
+        return discord.utils.get(self._standin_roles, id=role_id)
+
+
+class StandInChannel:
+    '''Records what it is sent, or raises the next of `failures` instead'''
+
+    def __init__(
+        self,
+        channel_id: int = 0,
+        latency: Latency = NO_LATENCY,
+        failures: Iterable[BaseException] = ()
+    ):
+        self.id = channel_id
+        self.latency = latency
+        self.failures = list(failures)
+        self.sent: List[Dict[str, Any]] = []
+
+    async def send(self, content=None, **kwargs) -> None:
+        await self.latency.wait()
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append({'content': content, **kwargs})
+
+    def titles(self) -> List[Optional[str]]:
+        '''The title of the first embed of every message sent'''
+        return [message['embeds'][0].title for message in self.sent]
+
+
+class StandInGuild:
+    '''
+        Without `roles`, every role ID resolves to a role of that ID, as if
+        each team existed, and without `channels` every channel is made on
+        first use. When given, only those roles or channels exist.
+    '''
+
+    def __init__(
+        self,
+        guild_id: int = 0,
+        roles: Optional[List[StandInRole]] = None,
+        latency: Latency = NO_LATENCY,
+        channels: Optional[Dict[int, StandInChannel]] = None
+    ):
+        self.id = guild_id
+        self.roles = roles or []
+        self.latency = latency
+        self._roles = None if roles is None else {r.id: r for r in roles}
+        self._fixed_channels = channels is not None
+        self.channels: Dict[int, StandInChannel] = dict(channels or {})
+
+    def get_role(self, role_id: int) -> Optional[StandInRole]:
+        if self._roles is None:
+            return StandInRole(role_id)
+        return self._roles.get(role_id)
+
+    def get_channel(self, channel_id: int) -> Optional[StandInChannel]:
+        if self._fixed_channels:
+            return self.channels.get(channel_id)
+        if channel_id not in self.channels:
+            self.channels[channel_id] = StandInChannel(channel_id, self.latency)
+        return self.channels[channel_id]
+
+
+class StandInResponse:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.sent: List[Dict[str, Any]] = []
+
+    def is_done(self) -> bool:
+        return bool(self.sent)
+
+    async def send_message(self, content=None, **kwargs) -> None:
+        await self.latency.wait()
+        self.sent.append({'content': content, **kwargs})
+
+    async def edit_message(self, **kwargs) -> None:
+        await self.latency.wait()
+        self.sent.append(kwargs)
+
+    async def defer(self, **kwargs) -> None:
+        await self.latency.wait()
+        self.sent.append(kwargs)
+
+
+class StandInFollowup(StandInChannel):
+    def __init__(self, latency: Latency = NO_LATENCY):
+        super().__init__(0, latency)
+
+
+class StandInCommand:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class StandInInteraction:
+    def __init__(
+        self,
+        guild: StandInGuild,
+        user: Optional[StandInMember] = None,
+        command: str = '',
+        latency: Latency = NO_LATENCY
+    ):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.command = StandInCommand(command)
+        self.response = StandInResponse(latency)
+        self.followup = StandInFollowup(latency)
+
+    @property
+    def answers(self) -> List[Dict[str, Any]]:
+        '''Everything sent back to the user, in order'''
+        return self.response.sent + self.followup.sent
+
+
+class StandInBot:
+    '''Just enough of the bot for the announcement timers and the outbox'''
+
+    def __init__(self, guilds: List[StandInGuild]):
+        self.guilds = {guild.id: guild for guild in guilds}
+
+    def get_guild(self, guild_id: int) -> Optional[StandInGuild]:
+        return self.guilds.get(guild_id)
+
+    async def wait_until_ready(self) -> None:
+        pass
+
+
+async def invoke(
+    cog: commands.Cog,
+    command: discord.app_commands.Command,
+    interaction: StandInInteraction,
+    **params: Any
+) -> None:
+    '''Run `command` of `cog` like discord.py would, checks first'''
+    for check in command.checks:
+        if not await discord.utils.maybe_coroutine(check, interaction):
+            raise discord.app_commands.CheckFailure()
+    await command.callback(cog, interaction, **params)
@@ -0,0 +1,26 @@
+"""
+    :module_name: support
+    :module_summary: helpers shared by the storage unit tests
+    :module_author: CountTails
+"""
+
+import asyncio
+
+from match_scheduler_bot.model import DataSources
+from match_scheduler_bot.model.storage import MatchStorage
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def open_storage(tmp_path, legacy_guild_id=None, **sources):
+    '''
+        Open a `MatchStorage` on a fresh database in `tmp_path`, with one
+        reader unless `sources` says otherwise. Awaiting it gives the
+        storage.
+    '''
+    return MatchStorage(
+        DataSources(database=tmp_path / 'match.db', **{'readers': 1} | sources),
+        legacy_guild_id
+    ).open()
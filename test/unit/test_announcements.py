@@ -0,0 +1,124 @@
+"""Tests for the match start announcements of the calendar cog"""
+
+import asyncio
+import time
+
+import pytest
+
+from match_scheduler_bot.bot.cogs import getmatch
+from match_scheduler_bot.bot.delivery import Broadcaster
+from match_scheduler_bot.bot.outbox import OutboxDispatcher
+from match_scheduler_bot.model import DataSources
+from match_scheduler_bot.model.storage import MatchStorage
+from match_scheduler_bot.model.rows import MatchToSchedule, MatchToCancel
+
+from discord_standin import StandInBot, StandInGuild
+
+
+@pytest.fixture(autouse=True)
+def mention(monkeypatch):
+    monkeypatch.setattr(getmatch.__SPEC__.respond.public[0], 'mention', [99])
+
+
+def test_announcements_survive_restart(tmp_path):
+    """A restart neither repeats nor drops a match start announcement"""
+    now = int(time.time())
+    lead = int(getmatch.ANNOUNCE_LEAD.total_seconds())
+    sources = DataSources(database=tmp_path / 'match.db', readers=1)
+
+    async def boot(bot):
+        storage = await MatchStorage(sources).open()
+        cog = getmatch.GetMatchCommand(storage, bot)
+        async with storage.reader() as db:
+            cog.announced[0] = {
+                getmatch.match_key(m) for m in await db.find_announced(0)
+            }
+        storage.schedule.watch(cog._schedule_changed)
+        outbox = OutboxDispatcher(storage, bot, Broadcaster(bot))
+
+        async def announce(at):
+            await cog.announce_match_start(0, at)
+            # the outbox stamps jobs with the wall clock, not `at`
+            await outbox.dispatch(max(at, int(time.time()) + 1))
+        return storage, cog, announce
+
+    async def scenario():
+        bot = StandInBot([StandInGuild()])
+        storage, cog, announce = await boot(bot)
+        async with storage.writer() as db:
+            await db.insert_match(MatchToSchedule(now + lead - 60, 1, 2))
+            await db.insert_match(MatchToSchedule(now + lead + 600, 3, 4))
+        first_deadline = cog._next_announcement(0)
+        await announce(now)
+        second_deadline = cog._next_announcement(0)
+        await storage.close()
+
+        storage, cog, announce = await boot(bot)
+        await announce(now)
+        after_restart = cog._next_announcement(0)
+        await announce(now + 600)
+        await storage.close()
+        return bot.get_guild(0).get_channel(1).sent, (
+            first_deadline, second_deadline, after_restart
+        )
+
+    sent, deadlines = asyncio.run(scenario())
+    assert [len(message['embeds']) for message in sent] == [1, 1]
+    assert deadlines == (now - 60, now + 600, now + 600)
+
+
+def test_cancelling_rearms_announcement(tmp_path):
+    """Cancelled matches are never announced and the timer is re-armed"""
+    now = int(time.time())
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        cog = getmatch.GetMatchCommand(storage, StandInBot([StandInGuild()]))
+        rearmed = []
+        cog._announcer(0).rearm = lambda: rearmed.append(True)
+        storage.schedule.watch(cog._schedule_changed)
+        try:
+            async with storage.writer() as db:
+                await db.insert_match(MatchToSchedule(now + 100, 1, 2))
+            async with storage.writer() as db:
+                await db.delete_match(MatchToCancel(1, 2))
+            await cog.announce_match_start(0, now)
+            return len(rearmed), cog._next_announcement(0), cog.bot.get_guild(0)
+        finally:
+            await storage.close()
+
+    rearmed, deadline, guild = asyncio.run(scenario())
+    assert rearmed == 2
+    assert deadline is None
+    assert guild.get_channel(1).sent == []
+
+
+def test_deadline_agrees_with_the_matches_fired_for(tmp_path, monkeypatch):
+    """A match the timer would not announce never sets its deadline"""
+    now = int(time.time())
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        cog = getmatch.GetMatchCommand(storage, StandInBot([StandInGuild()]))
+        try:
+            async with storage.writer() as db:
+                await db.insert_match(MatchToSchedule(now + 1, 1, 2))
+            with monkeypatch.context() as patched:
+                # past the half second, the timer fires with now + 1
+                patched.setattr(getmatch.time, 'time', lambda: now + 0.6)
+                deadline = cog._next_announcement(0)
+            return deadline, cog._starts_in(
+                0,
+                round(now + 0.6),
+                getmatch.ANNOUNCE_LEAD
+            )
+        finally:
+            await storage.close()
+
+    deadline, due = asyncio.run(scenario())
+    assert deadline is None
+    assert due == []
@@ -0,0 +1,57 @@
+"""Tests for match_scheduler_bot.bot.autocomplete"""
+
+import asyncio
+
+import pytest
+
+from match_scheduler_bot.bot.autocomplete import (
+    timezones,
+    TimezoneIndex,
+    TIMEZONE_INDEX,
+    autocomplete_timezone
+)
+
+
+@pytest.fixture
+def index():
+    return TimezoneIndex([
+        'America/New_York',
+        'America/Newark',
+        'America/Los_Angeles',
+        'Europe/London',
+        'Etc/GMT+5',
+        'UTC',
+    ])
+
+
+def test_exact_and_prefix_rank_first(index):
+    """Exact names beat prefixes, which beat segment and substring hits"""
+    assert index.search('utc')[0] == 'UTC'
+    assert index.search('america/new') == (
+        'America/Newark',
+        'America/New_York'
+    )
+    assert index.search('new')[:2] == ('America/Newark', 'America/New_York')
+    assert index.search('ndo') == ('Europe/London',)
+
+
+def test_segments_and_aliases(index):
+    """Name segments and common abbreviations find their zones"""
+    assert index.search('york') == ('America/New_York',)
+    assert index.search('EST') == ('America/New_York',)
+    assert index.search('pst')[0] == 'America/Los_Angeles'
+    assert index.search('gmt')[0] == 'UTC'
+
+
+def test_results_are_limited_and_deterministic():
+    """At most 25 choices come back, in the same order every time"""
+    first = TIMEZONE_INDEX.search('a')
+    assert len(first) == 25
+    assert TIMEZONE_INDEX.search('a') == first
+    assert TimezoneIndex(sorted(timezones, reverse=True)).search('a') == first
+
+
+def test_autocomplete_returns_choices():
+    """The coroutine wraps index results as application command choices"""
+    choices = asyncio.run(autocomplete_timezone(None, 'new_york'))
+    assert choices[0].value == 'America/New_York'
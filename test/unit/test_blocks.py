@@ -0,0 +1,87 @@
+"""Tests for match_scheduler_bot.model.blocks"""
+
+import asyncio
+import random
+
+import pytest
+
+from match_scheduler_bot.model.blocks import MatchBlock
+from match_scheduler_bot.model.matchlist import (
+    AsyncMatchListRepository,
+    MatchListRepository
+)
+from match_scheduler_bot.model.schedule import ScheduleIndex
+from match_scheduler_bot.model.rows import MatchToSchedule, ScheduledMatch
+
+
+@pytest.fixture
+def block():
+    return MatchBlock.from_rows([
+        (100, 3, 4),
+        (200, 5, 6),
+        (200, 7, 8),
+        (300, 1, 2),
+    ], guild_id=9)
+
+
+def test_block_rows_become_matches_only_on_request(block):
+    """Rows are stored as columns and read back as guild matches"""
+    assert len(block) == 4
+    assert block.nbytes == 4 * 3 * 8
+    assert block[3] == ScheduledMatch(300, 1, 2, 9)
+    assert list(block.keys())[0] == (100, 3, 4)
+    assert block.matches()[1:3] == [
+        ScheduledMatch(200, 5, 6, 9),
+        ScheduledMatch(200, 7, 8, 9)
+    ]
+
+
+def test_block_windows_agree_with_the_index(block):
+    """Windows are half open on the start time, like the schedule index"""
+    index = ScheduleIndex(block, guild_id=9)
+    for not_before, before in ((0, 1000), (200, 300), (201, 300), (300, 100)):
+        assert block.between(not_before, before).matches() == \
+            index.between(not_before, before)
+    assert block.expired(200).matches() == index.expired(200)
+    assert block.starting_within(100, 100) == block.between(101, 201)
+    assert block.span(200, 300) == (1, 3)
+
+
+def test_block_columns_must_line_up():
+    with pytest.raises(ValueError):
+        MatchBlock([1, 2], [3], [4, 5])
+
+
+def test_repositories_read_the_same_block(tmp_path):
+    """Both repositories page every row into the block, in key order"""
+    rng = random.Random(3)
+    path = str(tmp_path / 'match.db')
+    repo = MatchListRepository(path)
+    with repo as db:
+        db.insert_matches([
+            MatchToSchedule(rng.randrange(10**6), team, team + 10**4, 5)
+            for team in range(5000)
+        ])
+    expected = MatchBlock.from_rows(
+        [
+            (m.start_time, m.team_1_id, m.team_2_id)
+            for m in repo.find_all_matches(5)
+        ],
+        guild_id=5
+    )
+
+    async def read():
+        db = await AsyncMatchListRepository(path).connect()
+        try:
+            return (
+                await db.find_match_block(5),
+                await db.find_match_block(5, 1000, 2000),
+                await db.find_match_block(6)
+            )
+        finally:
+            await db.close()
+
+    whole, window, other = asyncio.run(read())
+    assert repo.find_match_block(5) == whole == expected
+    assert window == expected.between(1000, 2000)
+    assert len(other) == 0
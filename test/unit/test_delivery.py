@@ -0,0 +1,129 @@
+"""Tests for concurrent announcement delivery"""
+
+import asyncio
+
+import pydantic
+import pytest
+
+from match_scheduler_bot.bot.delivery import Broadcaster
+from match_scheduler_bot.model import (
+    CommandOutput,
+    CommandOutputDestination,
+    DeliveryOptions
+)
+
+from discord_standin import Latency, StandInChannel, StandInGuild, StandInRole
+
+
+class CountingChannel(StandInChannel):
+    """Keeps the most sends in flight at once across every channel"""
+
+    async def send(self, content=None, **kwargs):
+        CountingChannel.active += 1
+        CountingChannel.peak = max(CountingChannel.peak, CountingChannel.active)
+        try:
+            await super().send(content, **kwargs)
+        finally:
+            CountingChannel.active -= 1
+
+
+def sends(channel):
+    return [(m['content'], m['embeds']) for m in channel.sent]
+
+
+def delayed(ms):
+    return Latency(mean_ms=ms)
+
+
+@pytest.fixture(autouse=True)
+def reset_counters():
+    CountingChannel.active = CountingChannel.peak = 0
+
+
+def test_destination_config_accepts_one_or_many():
+    single = CommandOutputDestination.model_validate_json(
+        '{"public": {"channel_id": 1, "mention": [2]}, "audit": null}',
+        strict=True
+    )
+    many = CommandOutputDestination.model_validate_json(
+        '{"public": [{"channel_id": 1},'
+        ' {"webhook_url": "https://discord.com/api/webhooks/1/abc"}]}',
+        strict=True
+    )
+    assert [d.channel_id for d in single.public] == [1]
+    assert single.audit == []
+    assert len(many.everywhere) == 2
+    assert 'abc' not in repr(many)
+    with pytest.raises(pydantic.ValidationError):
+        CommandOutput.model_validate({'mention': []})
+    with pytest.raises(pydantic.ValidationError):
+        CommandOutput.model_validate({
+            'channel_id': 1,
+            'webhook_url': 'https://discord.com/api/webhooks/1/abc'
+        })
+
+
+def test_broadcast_isolates_failures():
+    """A failing or missing destination does not stop the others"""
+    channels = {
+        1: StandInChannel(1, delayed(10)),
+        2: StandInChannel(2, failures=[RuntimeError('503')]),
+        3: StandInChannel(3)
+    }
+    guild = StandInGuild(
+        roles=[StandInRole(5), StandInRole(6)],
+        channels=channels
+    )
+    destinations = [
+        CommandOutput(channel_id=1, mention=[5, 6, 500]),
+        CommandOutput(channel_id=2),
+        CommandOutput(channel_id=3),
+        CommandOutput(channel_id=4)
+    ]
+    messages = [['first'], ['second']]
+
+    deliveries = asyncio.run(
+        Broadcaster(None).broadcast(guild, destinations, messages)
+    )
+    assert [d.ok for d in deliveries] == [True, False, True, False]
+    assert sends(channels[1]) == [
+        ('<@&5> <@&6>', ['first']),
+        (None, ['second'])
+    ]
+    assert sends(channels[3]) == [(None, ['first']), (None, ['second'])]
+
+
+def test_broadcast_is_concurrent_and_bounded():
+    channels = {i: CountingChannel(i, delayed(50)) for i in range(1, 9)}
+    destinations = [CommandOutput(channel_id=i) for i in channels]
+    broadcaster = Broadcaster(None, DeliveryOptions(concurrency=3))
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        began = loop.time()
+        await broadcaster.broadcast(
+            StandInGuild(channels=channels),
+            destinations,
+            [['x']]
+        )
+        return loop.time() - began
+
+    elapsed = asyncio.run(scenario())
+    assert CountingChannel.peak == 3
+    # eight 50 ms sends three at a time take three rounds, not eight
+    assert elapsed < 8 * 0.05
+
+
+def test_broadcast_times_out_slow_destinations():
+    channels = {1: StandInChannel(1, delayed(5000)), 2: StandInChannel(2)}
+    destinations = [CommandOutput(channel_id=1), CommandOutput(channel_id=2)]
+    broadcaster = Broadcaster(None, DeliveryOptions(timeout_seconds=0.05))
+    deliveries = asyncio.run(
+        broadcaster.broadcast(
+            StandInGuild(channels=channels),
+            destinations,
+            [['x']]
+        )
+    )
+    assert isinstance(deliveries[0].error, asyncio.TimeoutError)
+    assert deliveries[1].ok
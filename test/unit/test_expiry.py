@@ -0,0 +1,76 @@
+"""Tests for the deadline driven expiry of the cancel cog"""
+
+import asyncio
+import time
+
+import match_scheduler_bot
+from match_scheduler_bot.bot.cogs.delmatch import DeleteMatchCommand
+from match_scheduler_bot.model import DataSources
+from match_scheduler_bot.model.storage import MatchStorage
+from match_scheduler_bot.model.rows import MatchToSchedule, ScheduledMatch
+
+
+def test_expiry_follows_grace_period(tmp_path, monkeypatch):
+    """Matches expire in one batch once their grace period has run out"""
+    monkeypatch.setattr(
+        match_scheduler_bot.get_config().data, 'expiry_grace_minutes', 2
+    )
+    now = int(time.time())
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        cog = DeleteMatchCommand(storage)
+        try:
+            async with storage.writer() as db:
+                await db.insert_match(MatchToSchedule(now - 300, 1, 2))
+                await db.insert_match(MatchToSchedule(now - 200, 3, 4))
+                await db.insert_match(MatchToSchedule(now - 60, 5, 6))
+            first = cog._next_expiry()
+            await cog.remove_past_matches(now)
+            return first, cog._next_expiry(), list(storage.schedule[0])
+        finally:
+            await storage.close()
+
+    first, second, remaining = asyncio.run(scenario())
+    assert first == now - 300 + 120
+    assert second == now - 60 + 120
+    assert remaining == [ScheduledMatch(now - 60, 5, 6)]
+
+
+def test_no_expiry_deadline_when_schedule_empty(tmp_path):
+    """An empty schedule leaves the expiry timer idle"""
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        try:
+            return DeleteMatchCommand(storage)._next_expiry()
+        finally:
+            await storage.close()
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_stale_index_rows_are_expired_without_database_rows(tmp_path):
+    """An index row the database no longer has does not keep the deadline"""
+    now = int(time.time())
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        cog = DeleteMatchCommand(storage)
+        try:
+            storage.schedule[0].add(ScheduledMatch(now - 300, 1, 2))
+            stale = cog._next_expiry()
+            await cog.remove_past_matches(now)
+            return stale, cog._next_expiry(), list(storage.schedule[0])
+        finally:
+            await storage.close()
+
+    stale, after, remaining = asyncio.run(scenario())
+    assert stale == now - 300
+    assert after is None
+    assert remaining == []
@@ -0,0 +1,144 @@
+"""Tests for match_scheduler_bot.bot.feeds and the iCalendar rendering"""
+
+import asyncio
+import gzip
+
+import aiohttp
+
+from match_scheduler_bot import get_config
+from match_scheduler_bot.metrics import FEED_RESPONSES
+from match_scheduler_bot.bot.feeds import CalendarFeed
+from match_scheduler_bot.bot.responses.ical import render_calendar
+from match_scheduler_bot.model import DataSources, FeedOptions
+from match_scheduler_bot.model.rows import MatchToSchedule, ScheduledMatch
+from match_scheduler_bot.model.storage import MatchStorage
+
+from discord_standin import StandInBot, StandInGuild, StandInRole
+
+
+def test_calendar_is_valid_ical():
+    """Events carry stable UIDs, UTC times, escaped text and folded lines"""
+    text = render_calendar(
+        [ScheduledMatch(1767225600, 1, 2, 9)],
+        {1: 'Rams, Inc.', 2: 'Owls; ' + 'x' * 80}.get,
+        'League',
+        90,
+        1767139200
+    )
+    lines = text.split('\r\n')
+    assert text.endswith('END:VCALENDAR\r\n')
+    assert 'UID:1767225600-1-2-9@match-scheduler-bot' in lines
+    assert 'DTSTART:20260101T000000Z' in lines
+    assert 'DTEND:20260101T013000Z' in lines
+    assert 'DTSTAMP:20251231T000000Z' in lines
+    assert all(len(line.encode()) <= 75 for line in lines)
+    summary = next(
+        i for i, line in enumerate(lines) if line.startswith('SUMMARY')
+    )
+    assert lines[summary].startswith('SUMMARY:Rams\\, Inc. vs Owls\\; xxx')
+    assert lines[summary + 1].startswith(' xxx')
+
+
+def test_feeds_are_cached_until_the_schedule_changes(tmp_path):
+    """Polls are answered from the snapshot, 304s and gzip included"""
+    home = get_config().auth.server
+    outcomes = ('rendered', 'cached', 'not_modified')
+    before = [FEED_RESPONSES.value(outcome=o) for o in outcomes]
+    bot = StandInBot([
+        StandInGuild(home, [StandInRole(1, 'Rams'), StandInRole(2, 'Owls')])
+    ])
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        feed = CalendarFeed(FeedOptions(port=0), storage.schedule, bot)
+        port = await feed.start()
+        base = f'http://127.0.0.1:{port}'
+        seen = []
+        try:
+            await storage.write(lambda db: db.insert_match(
+                MatchToSchedule(1767225600, 1, 2, home)
+            ))
+            async with aiohttp.ClientSession(auto_decompress=False) as session:
+                async def get(path, **headers):
+                    # the client asks for gzip unless told otherwise
+                    headers = {'Accept-Encoding': 'identity'} | headers
+                    async with session.get(base + path, headers=headers) as r:
+                        seen.append(r.status)
+                        return r.headers, await r.read()
+
+                plain, body = await get('/matches.ics')
+                zipped, zipped_body = await get(
+                    f'/guilds/{home}/matches.ics',
+                    **{'Accept-Encoding': 'gzip, deflate'}
+                )
+                await get('/matches.ics', **{'If-None-Match': plain['ETag']})
+                team, team_body = await get('/teams/2.ics')
+                await get('/teams/5.ics')
+                await get('/guilds/1/matches.ics')
+                await storage.write(lambda db: db.insert_match(
+                    MatchToSchedule(1767229200, 2, 3, home)
+                ))
+                changed, changed_body = await get(
+                    '/matches.ics',
+                    **{'If-None-Match': plain['ETag']}
+                )
+            return (
+                seen, plain, body, zipped, zipped_body,
+                team_body, changed, changed_body
+            )
+        finally:
+            await feed.stop()
+            await storage.close()
+
+    (
+        seen, plain, body, zipped, zipped_body,
+        team_body, changed, changed_body
+    ) = asyncio.run(scenario())
+    assert seen == [200, 200, 304, 200, 200, 404, 200]
+    # the league feed is rendered once per schedule change, as is team 2's
+    assert [
+        FEED_RESPONSES.value(outcome=o) - b for o, b in zip(outcomes, before)
+    ] == [4, 1, 1]
+    assert plain['Content-Type'] == 'text/calendar; charset=utf-8'
+    assert 'SUMMARY:Rams vs Owls' in body.decode()
+    assert zipped['Content-Encoding'] == 'gzip'
+    # each encoding is its own representation with its own strong ETag
+    assert zipped['ETag'] == plain['ETag'][:-1] + '-gzip"'
+    assert gzip.decompress(zipped_body) == body
+    assert team_body.decode().count('BEGIN:VEVENT') == 1
+    assert changed['ETag'] != plain['ETag']
+    assert changed_body.decode().count('BEGIN:VEVENT') == 2
+
+
+def test_renamed_roles_are_rendered_again(tmp_path):
+    """A cached feed is rendered again once a team's role is renamed"""
+    home = get_config().auth.server
+    rams = StandInRole(1, 'Rams')
+    guild = StandInGuild(home, [rams, StandInRole(2, 'Owls')])
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        bot = StandInBot([guild])
+        feed = CalendarFeed(FeedOptions(port=0), storage.schedule, bot)
+        try:
+            await storage.write(lambda db: db.insert_match(
+                MatchToSchedule(1767225600, 1, 2, home)
+            ))
+            first, _ = feed.snapshot(home)
+            again, rendered_again = feed.snapshot(home)
+            rams.name = 'Lambs'
+            renamed, rendered_renamed = feed.snapshot(home)
+            return first, again, rendered_again, renamed, rendered_renamed
+        finally:
+            await storage.close()
+
+    first, again, rendered_again, renamed, rendered_renamed = \
+        asyncio.run(scenario())
+    assert again is first and not rendered_again
+    assert rendered_renamed
+    assert 'SUMMARY:Lambs vs Owls' in renamed.body.decode()
+    assert renamed.etag != first.etag
@@ -0,0 +1,212 @@
+"""Tests for match_scheduler_bot.model.groupcommit"""
+
+import asyncio
+
+import pytest
+
+from match_scheduler_bot.model import groupcommit
+from match_scheduler_bot.model.rows import (
+    MatchToCancel,
+    MatchToSchedule,
+    ScheduledMatch
+)
+from match_scheduler_bot.exceptions import (
+    CancellingNonexistantMatch,
+    DuplicatedMatchDetected,
+    MatchScheduleNotObtained
+)
+
+from support import open_storage
+
+
+def schedule(start, team_1, team_2):
+    async def operation(db):
+        return await db.insert_match(MatchToSchedule(start, team_1, team_2))
+    return operation
+
+
+def cancel(team_1, team_2):
+    async def operation(db):
+        return await db.delete_match(MatchToCancel(team_1, team_2))
+    return operation
+
+
+def test_concurrent_writes_share_one_transaction(tmp_path):
+    """Requests arriving within the window are committed together"""
+    async def scenario():
+        storage = await open_storage(
+            tmp_path,
+            group_commit_ms=50,
+            group_commit_max=64
+        )
+        sizes = []
+        original = storage._writes._commit
+
+        async def recording_commit(batch):
+            sizes.append(len(batch))
+            await original(batch)
+
+        storage._writes._commit = recording_commit
+        statements = []
+        await storage._writer.conn.set_trace_callback(statements.append)
+        try:
+            scheduled = await asyncio.gather(*(
+                storage.write(schedule(100 * n, 2 * n, 2 * n + 1))
+                for n in range(1, 11)
+            ))
+            async with storage.reader() as db:
+                stored = await db.find_upcoming_matches(not_before=0)
+            return scheduled, stored, sizes, statements
+        finally:
+            await storage.close()
+
+    scheduled, stored, sizes, statements = asyncio.run(scenario())
+    assert scheduled == stored
+    assert len(stored) == 10
+    assert sizes == [10]
+    # the savepoints nest in one transaction, so releasing them commits nothing
+    assert statements.count('BEGIN IMMEDIATE') == 1
+    assert statements.count('SAVEPOINT request') == 10
+    assert statements.count('COMMIT') == 1
+
+
+def test_failed_request_is_rolled_back_alone(tmp_path):
+    """A rejected request gets its error; the rest of its group commits"""
+    async def scenario():
+        storage = await open_storage(tmp_path, group_commit_ms=50)
+        try:
+            await storage.write(schedule(100, 1, 2))
+            results = await asyncio.gather(
+                storage.write(schedule(300, 3, 4)),
+                storage.write(schedule(200, 1, 2)),
+                storage.write(cancel(1, 2)),
+                storage.write(cancel(7, 8)),
+                storage.write(schedule(400, 5, 6)),
+                return_exceptions=True
+            )
+            async with storage.reader() as db:
+                stored = await db.find_upcoming_matches(not_before=0)
+            return results, stored, list(storage.schedule[0])
+        finally:
+            await storage.close()
+
+    results, stored, mirrored = asyncio.run(scenario())
+    assert results[0] == ScheduledMatch(300, 3, 4)
+    assert isinstance(results[1], DuplicatedMatchDetected)
+    assert results[2] == ScheduledMatch(100, 1, 2)
+    assert isinstance(results[3], CancellingNonexistantMatch)
+    assert results[4] == ScheduledMatch(400, 5, 6)
+    assert stored == [ScheduledMatch(300, 3, 4), ScheduledMatch(400, 5, 6)]
+    # the in-memory mirror only holds what was committed
+    assert mirrored == stored
+
+
+def test_group_is_capped_at_max_requests(tmp_path):
+    """No group holds more requests than configured"""
+    async def scenario():
+        storage = await open_storage(
+            tmp_path,
+            group_commit_ms=50,
+            group_commit_max=3
+        )
+        sizes = []
+        original = storage._writes._commit
+
+        async def recording_commit(batch):
+            sizes.append(len(batch))
+            await original(batch)
+
+        storage._writes._commit = recording_commit
+        try:
+            await asyncio.gather(*(
+                storage.write(schedule(100 * n, 2 * n, 2 * n + 1))
+                for n in range(1, 8)
+            ))
+        finally:
+            await storage.close()
+        return sizes
+
+    assert asyncio.run(scenario()) == [3, 3, 1]
+
+
+def test_close_commits_queued_requests(tmp_path):
+    """Requests queued before close are committed; later ones are refused"""
+    async def scenario():
+        storage = await open_storage(tmp_path, group_commit_ms=1000)
+        pending = [
+            asyncio.ensure_future(storage.write(schedule(100 * n, n, n + 10)))
+            for n in range(1, 4)
+        ]
+        await asyncio.sleep(0)
+        await storage.close()
+        scheduled = await asyncio.gather(*pending)
+        with pytest.raises(MatchScheduleNotObtained):
+            await storage.write(schedule(900, 1, 2))
+        reopened = await open_storage(tmp_path)
+        try:
+            async with reopened.reader() as db:
+                stored = await db.find_upcoming_matches(not_before=0)
+        finally:
+            await reopened.close()
+        return scheduled, stored
+
+    scheduled, stored = asyncio.run(scenario())
+    assert scheduled == stored
+    assert len(stored) == 3
+
+
+def test_failures_after_commit_do_not_fail_the_group(tmp_path):
+    """A watcher raising after the commit leaves the results standing"""
+    async def scenario():
+        storage = await open_storage(tmp_path, group_commit_ms=50)
+
+        def broken(guild_id, added, removed):
+            raise RuntimeError('watcher failed')
+
+        storage.schedule.watch(broken)
+        try:
+            scheduled = await asyncio.gather(
+                storage.write(schedule(100, 1, 2)),
+                storage.write(schedule(200, 3, 4))
+            )
+            async with storage.reader() as db:
+                stored = await db.find_upcoming_matches(not_before=0)
+            return scheduled, stored, list(storage.schedule[0])
+        finally:
+            await storage.close()
+
+    scheduled, stored, mirrored = asyncio.run(scenario())
+    assert scheduled == stored == mirrored
+
+
+def test_request_taken_as_the_window_closes_is_answered(tmp_path, monkeypatch):
+    """A request dequeued just as the wait times out joins the group"""
+    wait = asyncio.wait
+
+    async def late_wait(tasks, timeout=None):
+        if timeout is None or late:
+            return await wait(tasks, timeout=timeout)
+        # the request arrives and is taken, but the wait reports a timeout
+        late.append(asyncio.ensure_future(storage.write(schedule(200, 3, 4))))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return set(), set(tasks)
+
+    late = []
+    monkeypatch.setattr(groupcommit.asyncio, 'wait', late_wait)
+
+    async def scenario():
+        nonlocal storage
+        storage = await open_storage(tmp_path, group_commit_ms=50)
+        try:
+            first = await storage.write(schedule(100, 1, 2))
+            second = await asyncio.wait_for(late[0], 1)
+            return first, second
+        finally:
+            await storage.close()
+
+    storage = None
+    assert asyncio.run(scenario()) == (
+        ScheduledMatch(100, 1, 2),
+        ScheduledMatch(200, 3, 4)
+    )
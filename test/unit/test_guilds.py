@@ -0,0 +1,128 @@
+"""Tests for serving several guilds from one bot and one database"""
+
+import asyncio
+import sqlite3
+import time
+
+from match_scheduler_bot import get_config
+from match_scheduler_bot.bot.cogs import getmatch
+from match_scheduler_bot.bot.delivery import Broadcaster
+from match_scheduler_bot.bot.outbox import OutboxDispatcher
+from match_scheduler_bot.model import GuildOverrides
+from match_scheduler_bot.model.rows import (
+    MatchToSchedule,
+    MatchToCancel,
+    ScheduledMatch
+)
+
+from discord_standin import StandInBot, StandInGuild
+from support import open_storage
+
+
+def test_guilds_do_not_share_matches(tmp_path):
+    """The same pairing may be scheduled, listed and cancelled per guild"""
+    async def scenario():
+        storage = await open_storage(tmp_path)
+        try:
+            async with storage.writer() as db:
+                await db.insert_match(MatchToSchedule(100, 1, 2, guild_id=10))
+                await db.insert_match(MatchToSchedule(200, 1, 2, guild_id=20))
+                await db.insert_match(MatchToSchedule(300, 3, 4, guild_id=20))
+            async with storage.writer() as db:
+                await db.delete_match(MatchToCancel(1, 2, guild_id=20))
+            async with storage.reader() as db:
+                return (
+                    await db.find_guilds(),
+                    await db.find_upcoming_matches(not_before=0, guild_id=10),
+                    await db.find_upcoming_matches(not_before=0, guild_id=20),
+                    list(storage.schedule[10]),
+                    list(storage.schedule[20]),
+                    storage.schedule.next_start()
+                )
+        finally:
+            await storage.close()
+
+    guilds, stored_10, stored_20, indexed_10, indexed_20, first = \
+        asyncio.run(scenario())
+    assert sorted(guilds) == [10, 20]
+    assert stored_10 == indexed_10 == [ScheduledMatch(100, 1, 2, 10)]
+    assert stored_20 == indexed_20 == [ScheduledMatch(300, 3, 4, 20)]
+    assert first == (100, 10)
+
+
+def test_legacy_rows_are_adopted_by_the_home_guild(tmp_path):
+    """Rows stored before multi-guild support move to the configured server"""
+    async def scenario():
+        storage = await open_storage(tmp_path)
+        async with storage.writer() as db:
+            await db.insert_match(MatchToSchedule(100, 1, 2))
+        await storage.close()
+
+        storage = await open_storage(tmp_path, legacy_guild_id=42)
+        try:
+            return list(storage.schedule), list(storage.schedule[42])
+        finally:
+            await storage.close()
+
+    guilds, adopted = asyncio.run(scenario())
+    assert guilds == [42]
+    assert adopted == [ScheduledMatch(100, 1, 2, 42)]
+    conn = sqlite3.connect(tmp_path / 'match.db')
+    assert conn.execute(
+        'SELECT COUNT(*) FROM matches WHERE guild_id = 0'
+    ).fetchone() == (0,)
+
+
+def test_guild_overrides_apply_per_command():
+    config = get_config().model_copy(update={'guilds': {
+        7: GuildOverrides.model_validate({
+            'allowlist': {'create_match': ['Referee']},
+            'respond': {'get_match': {'public': {'channel_id': 70}}},
+        })
+    }})
+    home = config.spec_for('create_match', config.auth.server)
+    assert home is config.cmds['create_match']
+    assert config.spec_for('create_match', 7).allowlist == ['Referee']
+    assert config.spec_for('create_match', 7).respond == \
+        config.cmds['create_match'].respond
+    assert [
+        d.channel_id for d in config.spec_for('get_match', 7).respond.public
+    ] == [70]
+    assert config.guild_ids == [config.auth.server, 7]
+
+
+def test_each_guild_announces_only_its_own_matches(tmp_path):
+    """Guild announcers run side by side and never cross guilds"""
+    now = int(time.time())
+    lead = int(getmatch.ANNOUNCE_LEAD.total_seconds())
+
+    async def scenario():
+        storage = await open_storage(tmp_path)
+        bot = StandInBot([StandInGuild(10), StandInGuild(20)])
+        cog = getmatch.GetMatchCommand(storage, bot)
+        outbox = OutboxDispatcher(storage, bot, Broadcaster(bot))
+        try:
+            async with storage.writer() as db:
+                await db.insert_match(MatchToSchedule(now + 60, 1, 2, 10))
+                await db.insert_match(MatchToSchedule(now + 90, 3, 4, 20))
+                await db.insert_match(MatchToSchedule(now + lead * 2, 5, 6, 20))
+            deadlines = (cog._next_announcement(10), cog._next_announcement(20))
+            await asyncio.gather(
+                cog.announce_match_start(10, now),
+                cog.announce_match_start(20, now)
+            )
+            await outbox.dispatch(int(time.time()) + 1)
+            return deadlines, cog._next_announcement(10), \
+                cog._next_announcement(20), bot.guilds
+        finally:
+            await storage.close()
+
+    deadlines, after_10, after_20, guilds = asyncio.run(scenario())
+    assert deadlines == (now + 60 - lead, now + 90 - lead)
+    assert after_10 is None
+    assert after_20 == now + lead
+    sent_10, sent_20 = (guilds[g].get_channel(1).sent for g in (10, 20))
+    assert [len(message['embeds']) for message in sent_10] == [1]
+    assert [len(message['embeds']) for message in sent_20] == [1]
+    assert '<@&1>' in str(sent_10[0]['embeds'][0].to_dict())
+    assert '<@&1>' not in str(sent_20[0]['embeds'][0].to_dict())
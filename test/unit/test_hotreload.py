@@ -0,0 +1,145 @@
+"""Tests for match_scheduler_bot.bot.hotreload and live config reloads"""
+
+import asyncio
+import importlib
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+import match_scheduler_bot
+from match_scheduler_bot import LiveSpec, get_config
+from match_scheduler_bot.bot.hotreload import ConfigWatcher, changed_signatures
+from match_scheduler_bot.model.schedule import GuildSchedules
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+COG_MODULES = (
+    'match_scheduler_bot.bot.cogs.addmatch',
+    'match_scheduler_bot.bot.cogs.delmatch'
+)
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    '''A copy of the example config in use, restored after the test'''
+    path = tmp_path / 'bot.json'
+    path.write_text((ROOT / 'bot.example.json').read_text())
+    match_scheduler_bot.setup_config(path)
+    yield path
+    match_scheduler_bot.setup_config(ROOT / 'bot.example.json')
+    for name in COG_MODULES:
+        importlib.reload(sys.modules[name])
+
+
+class FakeStorage:
+    def __init__(self):
+        self.schedule = GuildSchedules()
+
+
+def edit(path, change):
+    raw = json.loads(path.read_text())
+    change(raw)
+    path.write_text(json.dumps(raw))
+    # a second edit within the same clock tick must still be seen
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_watcher_applies_valid_edits_and_rejects_invalid_ones(config_file, caplog):
+    allowlist = LiveSpec('create_match')
+    applied = []
+
+    async def apply(config):
+        match_scheduler_bot.replace_config(config)
+        applied.append(config)
+
+    async def scenario():
+        watcher = ConfigWatcher(config_file, 60, apply)
+        unchanged = await watcher.check()
+        edit(config_file, lambda raw: raw['cmds']['create_match'].update(
+            allowlist=['staff']
+        ))
+        valid = await watcher.check()
+        edit(config_file, lambda raw: raw['cmds']['create_match'].update(
+            allowlist='everyone'
+        ))
+        invalid = await watcher.check()
+        # fixed again, along with a section that needs a restart
+        edit(config_file, lambda raw: (
+            raw['cmds']['create_match'].update(allowlist=['staff']),
+            raw['data'].update(readers=9)
+        ))
+        restart_only = await watcher.check()
+        return unchanged, valid, invalid, restart_only
+
+    with caplog.at_level(logging.INFO):
+        results = asyncio.run(scenario())
+    assert results == (False, True, False, True)
+    assert allowlist.allowlist == ['staff']
+    # the data section is only read at startup, so it keeps running as is
+    assert get_config().data.readers == 4
+    assert len(applied) == 2
+    assert applied[1].cmds['create_match'].allowlist == ['staff']
+    assert 'Rejected the edited config' in caplog.text
+    assert 'Config section `data` changed' in caplog.text
+
+
+def test_only_signature_edits_rebuild_and_sync(config_file, monkeypatch):
+    bot_module = importlib.import_module('match_scheduler_bot.bot')
+    synced = []
+
+    async def sync(tree, storage, application_id):
+        synced.append(sorted(c.name for c in tree.get_commands()))
+        return True
+
+    monkeypatch.setattr(bot_module, 'sync_command_tree', sync)
+    monkeypatch.setattr(bot_module, 'use_storage', lambda: None)
+
+    def reloaded(change):
+        raw = json.loads(config_file.read_text())
+        change(raw)
+        config_file.write_text(json.dumps(raw))
+        return match_scheduler_bot.load_config(config_file)
+
+    async def scenario():
+        bot = bot_module.MatchSchedulerBot()
+        storage = FakeStorage()
+        await bot._add_command_cog(bot_module.AddMatchCommand, storage)
+        await bot._add_command_cog(bot_module.DeleteMatchCommand, storage)
+        kept = bot.get_cog('DeleteMatchCommand')
+        allowlist = await bot.apply_config(reloaded(
+            lambda raw: raw['cmds']['create_match'].update(allowlist=['staff'])
+        ))
+        renamed = await bot.apply_config(reloaded(
+            lambda raw: raw['cmds']['create_match'].update(invoke_with='book-match')
+        ))
+        rejected = await bot.apply_config(reloaded(
+            lambda raw: raw['cmds']['create_match'].update(invoke_with='Book Match')
+        ))
+        names = sorted(c.name for c in bot.tree.get_commands())
+        kept = bot.get_cog('DeleteMatchCommand') is kept
+        return allowlist, renamed, rejected, names, kept
+
+    allowlist, renamed, rejected, names, kept = asyncio.run(scenario())
+    assert (allowlist, renamed, rejected) == (False, True, False)
+    assert synced == [['book-match', 'cancel-match']]
+    assert names == ['book-match', 'cancel-match']
+    assert kept
+    assert get_config().cmds['create_match'].invoke_with == 'book-match'
+
+
+def test_changed_signatures_ignore_routing_edits():
+    running = get_config()
+    routed = running.model_copy(update={'cmds': running.cmds | {
+        'get_match': running.cmds['get_match'].model_copy(update={
+            'allowlist': ['staff'],
+            'respond': running.cmds['create_match'].respond
+        }),
+        'delete_match': running.cmds['delete_match'].model_copy(update={
+            'description': 'Call off a match'
+        })
+    }})
+    assert changed_signatures(running, routed) == {'delete_match'}
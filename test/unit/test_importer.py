@@ -0,0 +1,194 @@
+"""Tests for match_scheduler_bot.bot.importer"""
+
+import asyncio
+import datetime
+import json
+
+import pytest
+
+from match_scheduler_bot.bot.cogs.importmatch import ImportMatchCommand
+from match_scheduler_bot.bot.importer import (
+    RoleResolver,
+    iter_fixture_rows,
+    parse_fixtures
+)
+from match_scheduler_bot.exceptions import InvalidFixtureFile
+from match_scheduler_bot.model import DataSources
+from match_scheduler_bot.model.rows import ScheduledMatch
+from match_scheduler_bot.model.schedule import ScheduleIndex
+from match_scheduler_bot.model.storage import MatchStorage
+
+from discord_standin import StandInGuild, StandInInteraction, StandInRole
+
+
+NEXT_YEAR = datetime.date.today().year + 1
+ROLES = RoleResolver([
+    StandInRole(11, 'Dragons'),
+    StandInRole(22, 'Griffins'),
+    StandInRole(33, 'Wyverns'),
+])
+HEADER = 'team_1,team_2,year,month,day,hour,minute,timezone'
+
+
+def csv_file(*lines):
+    return '\n'.join((HEADER,) + lines).encode()
+
+
+def never_scheduled(team_1_id, team_2_id):
+    return False
+
+
+def test_csv_rows_validated_individually():
+    """Valid rows are kept and each invalid row is reported by line"""
+    payload = csv_file(
+        f'Dragons,Griffins,{NEXT_YEAR},1,15,18,0,America/New_York',
+        f'<@&33>,22,{NEXT_YEAR},1,16,18,0,UTC',
+        f'Dragons,Unicorns,{NEXT_YEAR},1,17,18,0,UTC',
+        f'Dragons,Wyverns,{NEXT_YEAR},2,30,18,0,UTC',
+        f'Dragons,Wyverns,{NEXT_YEAR},3,1,18,0,Mars/Olympus',
+        'Griffins,Dragons,2000,1,1,0,0,UTC',
+        f'Griffins,Dragons,{NEXT_YEAR},1,1,0,0,UTC',
+    )
+    parsed = parse_fixtures(
+        iter_fixture_rows('season.csv', payload),
+        ROLES,
+        never_scheduled
+    )
+    assert [(m.team_1_id, m.team_2_id) for m in parsed.matches] == [
+        (11, 22),
+        (22, 33),
+    ]
+    assert [e.row for e in parsed.errors] == [4, 5, 6, 7, 8]
+
+
+def test_json_rows_and_existing_matches():
+    """JSON fixtures work and matches already scheduled are rejected"""
+    payload = json.dumps([
+        {
+            'team_1': 11, 'team_2': 22, 'year': NEXT_YEAR, 'month': 5,
+            'day': 1, 'hour': 12, 'minute': 30, 'timezone': 'UTC'
+        },
+        {'team_1': 11},
+        'not a row',
+    ]).encode()
+    parsed = parse_fixtures(
+        iter_fixture_rows('season.json', payload),
+        ROLES,
+        lambda t1, t2: (t1, t2) == (11, 22)
+    )
+    assert parsed.matches == []
+    assert [e.row for e in parsed.errors] == [1, 2, 3]
+
+
+def test_rows_too_close_to_other_matches_are_rejected():
+    """The buffer is checked against the schedule and earlier rows alike"""
+    payload = csv_file(
+        f'Dragons,Griffins,{NEXT_YEAR},1,15,18,0,UTC',
+        f'Griffins,Wyverns,{NEXT_YEAR},1,15,18,30,UTC',
+        f'Dragons,Wyverns,{NEXT_YEAR},1,15,20,0,UTC',
+        f'Griffins,Wyverns,{NEXT_YEAR},1,15,19,0,UTC',
+    )
+    scheduled = ScheduledMatch(
+        round(datetime.datetime(
+            NEXT_YEAR, 1, 15, 20, 30, tzinfo=datetime.timezone.utc
+        ).timestamp()),
+        33,
+        44
+    )
+    schedule = ScheduleIndex([scheduled])
+    parsed = parse_fixtures(
+        iter_fixture_rows('season.csv', payload),
+        ROLES,
+        schedule.has_teams,
+        find_clash=schedule.find_clash,
+        buffer_seconds=3600
+    )
+    assert [(m.team_1_id, m.team_2_id) for m in parsed.matches] == [
+        (11, 22),
+        (22, 33),
+    ]
+    # row 3 is within the hour of row 2, row 4 of the match already booked;
+    # row 5 is exactly the buffer after row 2
+    assert [e.row for e in parsed.errors] == [3, 4]
+    assert all('within 60 minutes' in e.reason for e in parsed.errors)
+
+
+@pytest.mark.parametrize('year', [b'99999999999999999999', b'1e999'])
+def test_out_of_range_dates_are_rejected_per_row(year):
+    """Years too large for a datetime fail their row, not the upload"""
+    # JSON has no infinity, but Python's parser reads 1e999 as one
+    payload = b'[' + b', '.join(
+        b'{"team_1": 11, "team_2": %d, "year": %s, "month": 1, "day": 1, '
+        b'"hour": 12, "minute": 0, "timezone": "UTC"}' % (team, year)
+        for team, year in ((22, year), (33, str(NEXT_YEAR).encode()))
+    ) + b']'
+    parsed = parse_fixtures(
+        iter_fixture_rows('season.json', payload),
+        ROLES,
+        never_scheduled
+    )
+    assert [(m.team_1_id, m.team_2_id) for m in parsed.matches] == [(11, 33)]
+    assert [e.row for e in parsed.errors] == [1]
+
+
+@pytest.mark.parametrize('filename, payload', [
+    ('season.txt', b''),
+    ('season.csv', b'team_1,team_2\n'),
+    ('season.json', b'{"team_1": 1}'),
+    ('season.json', b'\xff\xfe'),
+])
+def test_bad_files_rejected(filename, payload):
+    """Unusable files fail as a whole with a managed error"""
+    with pytest.raises(InvalidFixtureFile):
+        list(iter_fixture_rows(filename, payload))
+
+
+def test_bulk_insert_is_one_transaction(tmp_path):
+    """Imported matches land together and reach the in-memory schedule"""
+    payload = csv_file(*[
+        f'{t},{t + 100},{NEXT_YEAR},1,1,{t % 24},0,UTC' for t in range(1, 201)
+    ])
+    roles = RoleResolver(
+        [StandInRole(t, f'team {t}') for t in range(1, 301)]
+    )
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        try:
+            async with storage.writer() as db:
+                parsed = parse_fixtures(
+                    iter_fixture_rows('season.csv', payload),
+                    roles,
+                    storage.schedule[0].has_teams
+                )
+                scheduled = await db.insert_matches(parsed.matches)
+            async with storage.reader() as db:
+                stored = await db.find_all_matches()
+            return scheduled, stored, len(storage.schedule[0])
+        finally:
+            await storage.close()
+
+    scheduled, stored, indexed = asyncio.run(scenario())
+    assert len(scheduled) == 200
+    assert sorted(scheduled, key=lambda m: (m.start_time, m.team_1_id)) == stored
+    assert indexed == 200
+
+
+def test_unexpected_errors_are_answered_after_the_acknowledgement(caplog):
+    """The error handler follows up, as do_it has already responded"""
+    interaction = StandInInteraction(StandInGuild(), command='import-schedule')
+
+    async def scenario():
+        await interaction.response.send_message('acknowledged')
+        await ImportMatchCommand(None).cannot_do_it(
+            interaction,
+            RuntimeError('disk full')
+        )
+
+    asyncio.run(scenario())
+    assert len(interaction.response.sent) == 1
+    assert len(interaction.followup.sent) == 1
+    assert interaction.followup.sent[0]['ephemeral']
+    assert 'Unexpected error: disk full' in caplog.text
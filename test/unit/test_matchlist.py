@@ -0,0 +1,353 @@
+"""Tests for match_scheduler_bot.model.matchlist"""
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+import match_scheduler_bot
+from match_scheduler_bot.cli import main
+from match_scheduler_bot.model.matchlist import (
+    MatchListRepository,
+    AsyncMatchListRepository
+)
+from match_scheduler_bot.model.rows import (
+    MatchToSchedule,
+    MatchToCancel,
+    MatchCursor,
+    ScheduledMatch
+)
+from match_scheduler_bot.exceptions import (
+    DuplicatedMatchDetected,
+    CancellingNonexistantMatch,
+    TeamDoubleBooked
+)
+
+from support import run
+
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+async def _connected(dbpath):
+    return await AsyncMatchListRepository(str(dbpath)).connect()
+
+
+def test_async_insert_and_find(tmp_path):
+    """Inserted matches are returned in start time order"""
+    async def scenario():
+        repo = await _connected(tmp_path / 'match.db')
+        try:
+            async with repo as db:
+                await db.insert_match(MatchToSchedule(300, 1, 2))
+                await db.insert_match(MatchToSchedule(200, 3, 4))
+            async with repo as db:
+                return await db.find_upcoming_matches(not_before=100)
+        finally:
+            await repo.close()
+
+    assert run(scenario()) == [
+        ScheduledMatch(200, 3, 4),
+        ScheduledMatch(300, 1, 2)
+    ]
+
+
+def test_async_duplicate_rolls_back(tmp_path):
+    """A failed transaction leaves no partial writes behind"""
+    async def scenario():
+        repo = await _connected(tmp_path / 'match.db')
+        try:
+            with pytest.raises(DuplicatedMatchDetected):
+                async with repo as db:
+                    await db.insert_match(MatchToSchedule(100, 5, 6))
+                    await db.insert_match(MatchToSchedule(200, 1, 2))
+                    await db.insert_match(MatchToSchedule(300, 1, 2))
+            async with repo as db:
+                return await db.find_upcoming_matches(not_before=0)
+        finally:
+            await repo.close()
+
+    assert run(scenario()) == []
+
+
+def test_async_delete_and_purge(tmp_path):
+    """Cancelling and purging remove matches from the list"""
+    async def scenario():
+        repo = await _connected(tmp_path / 'match.db')
+        try:
+            async with repo as db:
+                for start, t1, t2 in [(100, 1, 2), (200, 3, 4), (300, 5, 6)]:
+                    await db.insert_match(MatchToSchedule(start, t1, t2))
+            async with repo as db:
+                cancelled = await db.delete_match(MatchToCancel(3, 4))
+            with pytest.raises(CancellingNonexistantMatch):
+                async with repo as db:
+                    await db.delete_match(MatchToCancel(3, 4))
+            async with repo as db:
+                purged = await db.purge_expired(not_after=250)
+            async with repo as db:
+                remaining = await db.find_upcoming_matches(not_before=0)
+            return cancelled, purged, remaining
+        finally:
+            await repo.close()
+
+    cancelled, purged, remaining = run(scenario())
+    assert cancelled == ScheduledMatch(200, 3, 4)
+    assert purged == 1
+    assert remaining == [ScheduledMatch(300, 5, 6)]
+
+
+def test_async_transactions_are_serialized(tmp_path):
+    """Concurrent transactions do not roll back each other's writes"""
+    async def scenario():
+        repo = await _connected(tmp_path / 'match.db')
+
+        async def schedule(team):
+            async with repo as db:
+                await db.insert_match(MatchToSchedule(1000 + team, 0, team))
+
+        async def clash():
+            with pytest.raises(DuplicatedMatchDetected):
+                async with repo as db:
+                    await db.insert_match(MatchToSchedule(1, 0, 1))
+
+        try:
+            await schedule(1)
+            await asyncio.gather(*[schedule(t) for t in range(2, 20)], clash())
+            async with repo as db:
+                return await db.find_upcoming_matches(0, page_size=100)
+        finally:
+            await repo.close()
+
+    assert len(run(scenario())) == 19
+
+
+def test_async_double_booking_is_rejected(tmp_path):
+    """Either team playing inside the buffer fails the insert and its transaction"""
+    async def scenario():
+        repo = await _connected(tmp_path / 'match.db')
+        try:
+            async with repo as db:
+                await db.insert_match(MatchToSchedule(10_000, 1, 2, 7))
+            with pytest.raises(TeamDoubleBooked) as raised:
+                async with repo as db:
+                    await db.insert_match(MatchToSchedule(10_000, 5, 6, 7))
+                    await db.insert_match(
+                        MatchToSchedule(13_000, 2, 3, 7),
+                        buffer_seconds=3600
+                    )
+            # the same pair is still reported as a duplicate
+            with pytest.raises(DuplicatedMatchDetected):
+                async with repo as db:
+                    await db.insert_match(
+                        MatchToSchedule(10_100, 1, 2, 7),
+                        buffer_seconds=3600
+                    )
+            async with repo as db:
+                # exactly the buffer apart, and the same teams in another guild
+                await db.insert_match(
+                    MatchToSchedule(13_600, 2, 3, 7),
+                    buffer_seconds=3600
+                )
+                await db.insert_match(
+                    MatchToSchedule(10_000, 1, 4, 8),
+                    buffer_seconds=3600
+                )
+            async with repo as db:
+                return raised.value, await db.find_all_matches(7)
+        finally:
+            await repo.close()
+
+    error, matches = run(scenario())
+    assert (error.team_id, error.clash) == (2, ScheduledMatch(10_000, 1, 2, 7))
+    assert matches == [
+        ScheduledMatch(10_000, 1, 2, 7),
+        ScheduledMatch(13_600, 2, 3, 7)
+    ]
+
+
+@pytest.fixture
+def season():
+    repo = MatchListRepository(':memory:')
+    with repo as db:
+        for team in range(1, 26):
+            # pairs of matches share a start time to exercise tie breaking
+            db.insert_match(MatchToSchedule(1000 + team // 2, team, team + 100))
+    return repo
+
+
+def test_keyset_pages_cover_schedule_once(season):
+    """Following `after` cursors visits every upcoming match exactly once"""
+    seen, cursor = [], None
+    while page := season.find_upcoming_matches(900, page_size=7, after=cursor):
+        seen.extend(page)
+        cursor = MatchCursor.from_match(page[-1])
+    assert seen == season.find_upcoming_matches(900, page_size=100)
+    assert len(seen) == 25
+
+
+def test_keyset_before_returns_previous_page(season):
+    """Paging back from a cursor returns the preceding page in order"""
+    first = season.find_upcoming_matches(900, page_size=5)
+    second = season.find_upcoming_matches(
+        900, page_size=5, after=MatchCursor.from_match(first[-1])
+    )
+    assert season.find_upcoming_matches(
+        900, page_size=5, before=MatchCursor.from_match(second[0])
+    ) == first
+
+
+def test_keyset_page_is_stable_under_concurrent_writes(season):
+    """Matches added before the cursor do not shift the next page"""
+    first = season.find_upcoming_matches(900, page_size=5)
+    expected = season.find_upcoming_matches(
+        900, page_size=5, after=MatchCursor.from_match(first[-1])
+    )
+    with season as db:
+        db.insert_match(MatchToSchedule(950, 500, 501))
+        db.delete_match(MatchToCancel(first[0].team_1_id, first[0].team_2_id))
+    assert season.find_upcoming_matches(
+        900, page_size=5, after=MatchCursor.from_match(first[-1])
+    ) == expected
+
+
+def test_keyset_cursor_behind_not_before(season):
+    """A stale cursor never yields matches that already started"""
+    page = season.find_upcoming_matches(
+        1005, page_size=3, after=MatchCursor(0, 0, 0)
+    )
+    assert all(m.start_time > 1005 for m in page)
+    assert page == season.find_upcoming_matches(1005, page_size=3)
+
+
+@pytest.fixture
+def league():
+    repo = MatchListRepository(':memory:')
+    with repo as db:
+        # team 7 plays on both sides, and twice at the same time
+        for start, t1, t2 in [
+            (100, 1, 7), (200, 7, 9), (200, 3, 7), (300, 2, 4),
+            (400, 5, 7), (500, 7, 8), (600, 6, 7), (700, 1, 2)
+        ]:
+            db.insert_match(MatchToSchedule(start, t1, t2))
+        db.insert_match(MatchToSchedule(300, 7, 8, guild_id=5))
+    return repo
+
+
+def test_team_pages_cover_both_columns_once(league):
+    """Keyset pages of one team visit each of its matches once, in order"""
+    seen, cursor = [], None
+    while page := league.find_upcoming_matches(
+        0, page_size=2, after=cursor, team_id=7
+    ):
+        seen.extend(page)
+        cursor = MatchCursor.from_match(page[-1])
+    assert seen == [
+        ScheduledMatch(100, 1, 7), ScheduledMatch(200, 3, 7),
+        ScheduledMatch(200, 7, 9), ScheduledMatch(400, 5, 7),
+        ScheduledMatch(500, 7, 8), ScheduledMatch(600, 6, 7)
+    ]
+    assert league.find_upcoming_matches(
+        0, page_size=2, before=MatchCursor.from_match(seen[4]), team_id=7
+    ) == seen[2:4]
+
+
+def test_window_bounds_both_calendars(league):
+    """`not_before` and `not_after` bound the guild and the team calendars"""
+    assert league.find_upcoming_matches(150, not_after=500) == [
+        ScheduledMatch(200, 3, 7), ScheduledMatch(200, 7, 9),
+        ScheduledMatch(300, 2, 4), ScheduledMatch(400, 5, 7),
+        ScheduledMatch(500, 7, 8)
+    ]
+    assert league.find_upcoming_matches(
+        150, not_after=450, team_id=7, after=MatchCursor(200, 3, 7)
+    ) == [ScheduledMatch(200, 7, 9), ScheduledMatch(400, 5, 7)]
+    assert league.find_upcoming_matches(0, team_id=7, guild_id=5) == [
+        ScheduledMatch(300, 7, 8, 5)
+    ]
+
+
+def test_expired_matches_move_to_the_archive(tmp_path):
+    """Expiry archives past matches; cancelled ones are not kept"""
+    async def scenario():
+        repo = await _connected(tmp_path / 'match.db')
+        try:
+            async with repo as db:
+                for start, team in ((100, 1), (200, 3), (300, 5), (400, 7)):
+                    await db.insert_match(MatchToSchedule(start, team, team + 1))
+                await db.insert_match(MatchToSchedule(150, 1, 2, 5))
+                await db.delete_match(MatchToCancel(3, 4))
+            async with repo as db:
+                await db.purge_expired(not_after=350)
+            # a rematch of an archived pairing is archived alongside it
+            async with repo as db:
+                await db.insert_match(MatchToSchedule(500, 1, 2))
+                await db.purge_expired(not_after=600)
+            archived = [m async for m in repo.iter_archive(page_size=2)]
+            ranged = [
+                m async for m in repo.iter_archive(
+                    not_before=300, before=500, page_size=1
+                )
+            ]
+            remaining = await repo.find_upcoming_matches(not_before=0)
+            return archived, ranged, remaining
+        finally:
+            await repo.close()
+
+    archived, ranged, remaining = run(scenario())
+    assert archived == [
+        ScheduledMatch(100, 1, 2), ScheduledMatch(300, 5, 6),
+        ScheduledMatch(400, 7, 8), ScheduledMatch(500, 1, 2)
+    ]
+    assert ranged == archived[1:3]
+    assert remaining == []
+    assert list(MatchListRepository(
+        str(tmp_path / 'match.db')
+    ).iter_archive(page_size=3)) == archived
+
+
+def test_archive_command_exports_a_season(tmp_path):
+    """`archive` prints a season of past matches as CSV"""
+    config = json.loads((ROOT / 'bot.example.json').read_text())
+    config['data']['database'] = str(tmp_path / 'match.db')
+    config_path = tmp_path / 'bot.json'
+    config_path.write_text(json.dumps(config))
+    home = config['auth']['server']
+    # 2025-08-31 23:00, 2025-09-01 00:00 and 2026-05-31 23:59 UTC
+    repo = MatchListRepository(str(tmp_path / 'match.db'))
+    with repo as db:
+        db.insert_matches([
+            MatchToSchedule(1756681200, 1, 2, home),
+            MatchToSchedule(1756684800, 3, 4, home),
+            MatchToSchedule(1780271940, 5, 6, home),
+            MatchToSchedule(1756684800, 3, 4, home + 1),
+        ])
+        db.purge_expired(2**62, home)
+    try:
+        season, days, backwards = (
+            CliRunner().invoke(main, [
+                '--bot-config', str(config_path),
+                '--log-config', str(ROOT / 'logging.example.json'),
+                'archive', *args
+            ])
+            for args in (
+                ['--season', '2025-26'],
+                ['--to', '2025-09-01'],
+                ['--from', '2025-09-02', '--to', '2025-09-01']
+            )
+        )
+    finally:
+        match_scheduler_bot.setup_config(ROOT / 'bot.example.json')
+    assert season.exit_code == 0, season.output
+    assert season.output.splitlines() == [
+        'start_time,team_1_id,team_2_id',
+        '2025-09-01T00:00:00+00:00,3,4',
+        '2026-05-31T23:59:00+00:00,5,6',
+    ]
+    assert days.output.splitlines()[1:] == [
+        '2025-08-31T23:00:00+00:00,1,2',
+        '2025-09-01T00:00:00+00:00,3,4',
+    ]
+    assert backwards.exit_code != 0
@@ -0,0 +1,139 @@
+"""Tests for match_scheduler_bot.metrics and its exposition"""
+
+import asyncio
+import http.server
+import threading
+from pathlib import Path
+
+import aiohttp
+import pytest
+from click.testing import CliRunner
+
+from match_scheduler_bot import metrics
+from match_scheduler_bot.bot.monitoring import CONTENT_TYPE, MetricsEndpoint
+from match_scheduler_bot.cli import main
+from match_scheduler_bot.model import DataSources, MetricsOptions
+from match_scheduler_bot.model.storage import MatchStorage
+from match_scheduler_bot.model.rows import MatchToSchedule
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    latency = registry.histogram('latency_seconds', 'Latency', ('phase',), (0.1, 1))
+    calls = registry.counter('calls_total', 'Calls')
+    for value in (0.05, 0.5, 0.5, 3):
+        latency.observe(value, phase='store')
+    calls.inc()
+    assert registry.render().splitlines() == [
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{phase="store",le="0.1"} 1',
+        'latency_seconds_bucket{phase="store",le="1.0"} 3',
+        'latency_seconds_bucket{phase="store",le="+Inf"} 4',
+        'latency_seconds_count{phase="store"} 4',
+        'latency_seconds_sum{phase="store"} 4.05',
+        '# HELP calls_total Calls',
+        '# TYPE calls_total counter',
+        'calls_total 1',
+    ]
+    with pytest.raises(ValueError):
+        latency.observe(1, command='store')
+
+
+def test_repository_calls_are_timed_and_counted(tmp_path):
+    before = {
+        query: (
+            metrics.QUERIES.value(query=query),
+            metrics.QUERY_ROWS.value(query=query)
+        )
+        for query in ('insert_match', 'find_upcoming_matches', 'purge_expired')
+    }
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        try:
+            async with storage.writer() as db:
+                await db.insert_match(MatchToSchedule(100, 1, 2))
+                await db.insert_match(MatchToSchedule(200, 3, 4))
+            async with storage.reader() as db:
+                await db.find_upcoming_matches(not_before=0)
+            async with storage.writer() as db:
+                await db.purge_expired(150)
+        finally:
+            await storage.close()
+
+    asyncio.run(scenario())
+    grew = {
+        query: (
+            metrics.QUERIES.value(query=query) - calls,
+            metrics.QUERY_ROWS.value(query=query) - rows
+        )
+        for query, (calls, rows) in before.items()
+    }
+    assert grew == {
+        'insert_match': (2, 2),
+        'find_upcoming_matches': (1, 2),
+        'purge_expired': (1, 1),
+    }
+    assert metrics.QUERY_SECONDS.count(query='find_upcoming_matches') >= 1
+
+
+def test_command_timer_records_phases_and_total():
+    before = metrics.COMMAND_SECONDS.count(command='test_command', phase='total')
+    timer = metrics.CommandTimer('test_command')
+    timer.lap('acknowledge')
+    timer.lap('store')
+    timer.done()
+    assert [
+        metrics.COMMAND_SECONDS.count(command='test_command', phase=phase)
+        for phase in ('acknowledge', 'store', 'total')
+    ] == [before + 1, before + 1, before + 1]
+
+
+def test_endpoint_serves_the_registry():
+    registry = metrics.Registry()
+    registry.counter('calls_total', 'Calls').inc(3)
+
+    async def scenario():
+        endpoint = MetricsEndpoint(MetricsOptions(port=0), registry)
+        port = await endpoint.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f'http://127.0.0.1:{port}/metrics') as r:
+                    return r.status, r.headers['Content-Type'], await r.text()
+        finally:
+            await endpoint.stop()
+
+    status, content_type, body = asyncio.run(scenario())
+    assert status == 200
+    assert content_type == CONTENT_TYPE
+    assert 'calls_total 3' in body.splitlines()
+
+
+def test_cli_dumps_a_running_bots_metrics():
+    class Scrape(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b'calls_total 3\n')
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(('127.0.0.1', 0), Scrape)
+    threading.Thread(target=server.handle_request, daemon=True).start()
+    try:
+        result = CliRunner().invoke(main, [
+            '--bot-config', str(ROOT / 'bot.example.json'),
+            '--log-config', str(ROOT / 'logging.example.json'),
+            'metrics',
+            '--url', f'http://127.0.0.1:{server.server_port}/metrics'
+        ])
+    finally:
+        server.server_close()
+    assert result.exit_code == 0
+    assert result.output == 'calls_total 3\n'
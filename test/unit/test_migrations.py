@@ -0,0 +1,148 @@
+"""Tests for match_scheduler_bot.model.migrations"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from match_scheduler_bot.model import matchlist
+from match_scheduler_bot.model.migrations import (
+    LATEST_VERSION,
+    migrate,
+    migrate_async
+)
+
+import aiosqlite
+
+
+def _indexes(conn):
+    return {
+        name for name, in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )
+    }
+
+
+def _plan(conn, query, params):
+    return ' | '.join(
+        row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params)
+    )
+
+
+@pytest.fixture
+def migrated():
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+def test_upgrades_existing_database_in_place(tmp_path):
+    """A pre-migration match.db keeps its rows and gains the indexes"""
+    dbpath = tmp_path / 'match.db'
+    legacy = sqlite3.connect(dbpath)
+    legacy.execute(
+        '''
+            CREATE TABLE matches (
+                start_time BIG INT,
+                team_1_id BIG INT,
+                team_2_id BIG INT,
+                PRIMARY KEY (team_1_id, team_2_id)
+            );
+        '''
+    )
+    legacy.execute('INSERT INTO matches VALUES (100, 1, 2)')
+    legacy.commit()
+    legacy.close()
+
+    conn = sqlite3.connect(dbpath)
+    assert migrate(conn) == LATEST_VERSION
+    assert conn.execute('PRAGMA user_version').fetchone() == (LATEST_VERSION,)
+    assert conn.execute('SELECT * FROM matches').fetchall() == [(100, 1, 2, 0)]
+    assert {
+        'matches_by_schedule',
+        'matches_by_team_1',
+        'matches_by_team_2'
+    } <= _indexes(conn)
+
+
+def test_migrate_is_idempotent(migrated):
+    """Running migrations on an up to date database changes nothing"""
+    assert migrate(migrated) == LATEST_VERSION
+
+
+def test_async_migrations_match_sync(tmp_path):
+    """Both migration runners produce the same schema"""
+    async def scenario():
+        async with aiosqlite.connect(tmp_path / 'match.db') as conn:
+            return await migrate_async(conn)
+
+    assert asyncio.run(scenario()) == LATEST_VERSION
+    conn = sqlite3.connect(tmp_path / 'match.db')
+    expected = sqlite3.connect(':memory:')
+    migrate(expected)
+    assert _indexes(conn) == _indexes(expected)
+
+
+CURSOR = {'start_time': 1, 'team_1_id': 2, 'team_2_id': 3}
+PAGE = {
+    'guild_id': 0,
+    'not_before': 0,
+    'not_after': matchlist.LAST_START,
+    'page_size': 10
+}
+
+
+@pytest.mark.parametrize('query, params, index', [
+    (
+        matchlist.FIND_UPCOMING_MATCHES,
+        PAGE,
+        'matches_by_schedule'
+    ),
+    (
+        matchlist.FIND_UPCOMING_MATCHES_AFTER,
+        PAGE | CURSOR,
+        'matches_by_schedule'
+    ),
+    (
+        matchlist.FIND_UPCOMING_MATCHES_BEFORE,
+        PAGE | CURSOR,
+        'matches_by_schedule'
+    ),
+    (matchlist.PURGE_EXPIRED, (0, 0), 'matches_by_schedule'),
+    (matchlist.ARCHIVE_EXPIRED, (0, 0, 0), 'matches_by_schedule'),
+])
+def test_hot_queries_use_indexes(migrated, query, params, index):
+    """Query plan regression: hot queries search an index instead of scanning"""
+    plan = _plan(migrated, query, params)
+    assert f'INDEX {index}' in plan
+    assert 'SCAN matches' not in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.parametrize('query, params', [
+    (matchlist.FIND_TEAM_MATCHES, PAGE | {'team_id': 2}),
+    (matchlist.FIND_TEAM_MATCHES_AFTER, PAGE | {'team_id': 2} | CURSOR),
+    (matchlist.FIND_TEAM_MATCHES_BEFORE, PAGE | {'team_id': 2} | CURSOR),
+    (
+        matchlist.FIND_CLASH,
+        {'guild_id': 0, 'team_1_id': 2, 'team_2_id': 3, 'earliest': 0, 'latest': 1}
+    ),
+])
+def test_team_queries_seek_both_team_indexes(migrated, query, params):
+    """Query plan regression: team lookups seek each team column's index"""
+    plan = _plan(migrated, query, params)
+    assert 'INDEX matches_by_team_1 (guild_id=? AND team_1_id=?' in plan
+    assert 'INDEX matches_by_team_2 (guild_id=? AND team_2_id=?' in plan
+    assert 'SCAN matches' not in plan
+
+
+def test_archive_pages_seek_the_primary_key(migrated):
+    """Query plan regression: archive pages are ranges of its primary key"""
+    plan = _plan(
+        migrated,
+        matchlist.FIND_ARCHIVED,
+        CURSOR | {'guild_id': 0, 'before': 10, 'page_size': 10}
+    )
+    assert 'SEARCH match_archive USING PRIMARY KEY (guild_id=?' in plan
+    assert 'TEMP B-TREE' not in plan
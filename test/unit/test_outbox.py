@@ -0,0 +1,182 @@
+"""Tests for the transactional announcement outbox and its dispatcher"""
+
+import asyncio
+import time
+
+import discord
+import pytest
+
+from match_scheduler_bot import get_config
+from match_scheduler_bot.bot import outbox
+from match_scheduler_bot.bot.delivery import Broadcaster
+from match_scheduler_bot.bot.outbox import OutboxDispatcher, publish
+from match_scheduler_bot.model import CommandOutput, DataSources, DeliveryOptions
+from match_scheduler_bot.model.storage import MatchStorage
+from match_scheduler_bot.model.rows import MatchToSchedule, ScheduledMatch
+
+from discord_standin import (
+    StandInBot,
+    StandInChannel,
+    StandInGuild,
+    StandInRole
+)
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.reason = 'fake'
+        self.headers = headers or {}
+
+
+def server_error():
+    return discord.HTTPException(FakeResponse(503), 'Service Unavailable')
+
+
+def scenario(
+    tmp_path,
+    channel,
+    steps,
+    options=DeliveryOptions(),
+    roles=None
+):
+    async def run():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        bot = StandInBot([StandInGuild(roles=roles, channels={1: channel})])
+        dispatcher = OutboxDispatcher(storage, bot, Broadcaster(bot), options)
+        try:
+            return await steps(storage, dispatcher)
+        finally:
+            await storage.close()
+    return asyncio.run(run())
+
+
+async def schedule(storage, start, team_1, team_2, destinations=None):
+    async with storage.writer() as db:
+        match = await db.insert_match(MatchToSchedule(start, team_1, team_2))
+        await publish(
+            db,
+            0,
+            'create_match',
+            destinations or get_config().cmds['create_match'].respond.public,
+            'match_scheduled',
+            [match]
+        )
+
+
+def test_jobs_commit_and_roll_back_with_the_match(tmp_path):
+    now = int(time.time())
+
+    async def steps(storage, dispatcher):
+        woken = []
+        storage.watch_outbox(woken.append)
+        with pytest.raises(RuntimeError):
+            async with storage.writer() as db:
+                match = await db.insert_match(MatchToSchedule(now + 99, 1, 2))
+                await publish(db, 0, 'create_match', [
+                    CommandOutput(channel_id=1)
+                ], 'match_scheduled', [match])
+                raise RuntimeError('crash before commit')
+        async with storage.reader() as db:
+            after_rollback = await db.find_due_jobs(now + 60, 10)
+        await schedule(storage, now + 99, 1, 2)
+        async with storage.reader() as db:
+            after_commit = await db.find_due_jobs(now + 60, 10)
+        return after_rollback, after_commit, woken
+
+    after_rollback, after_commit, woken = scenario(
+        tmp_path, StandInChannel(1), steps
+    )
+    assert after_rollback == []
+    assert [(j.kind, j.destination) for j in after_commit] == [
+        ('match_scheduled', 'channel:1')
+    ]
+    assert after_commit[0].matches == [ScheduledMatch(now + 99, 1, 2)]
+    assert len(woken) == 1
+
+
+def test_failed_jobs_back_off_and_keep_their_order(tmp_path):
+    """A retried job is not overtaken by a newer one for its destination"""
+    channel = StandInChannel(1, failures=[server_error()])
+    now = int(time.time())
+
+    async def steps(storage, dispatcher):
+        await schedule(storage, now + 100, 1, 2)
+        await schedule(storage, now + 200, 3, 4)
+        await dispatcher.dispatch(now + 1)
+        after_failure = list(channel.sent)
+        retry_at = dispatcher._next_delivery()
+        await dispatcher.dispatch(now + 1)
+        still_waiting = list(channel.sent)
+        await dispatcher.dispatch(retry_at)
+        async with storage.reader() as db:
+            left = await db.next_job_due()
+        return after_failure, still_waiting, retry_at, left
+
+    after_failure, still_waiting, retry_at, left = scenario(
+        tmp_path, channel, steps
+    )
+    assert after_failure == still_waiting == []
+    assert now + 1 < retry_at <= now + 1 + 2
+    assert len(channel.sent) == 2
+    assert left is None
+
+
+def test_permanent_and_exhausted_failures_are_dropped(tmp_path):
+    channel = StandInChannel(1, failures=[
+        discord.Forbidden(FakeResponse(403), 'Missing Access'),
+        server_error(),
+    ])
+    now = int(time.time())
+
+    async def steps(storage, dispatcher):
+        await schedule(storage, now + 100, 1, 2)
+        await schedule(storage, now + 200, 3, 4)
+        await schedule(storage, now + 300, 5, 6, [CommandOutput(channel_id=77)])
+        await dispatcher.dispatch(now + 1)
+        await dispatcher.dispatch(now + 1)
+        async with storage.reader() as db:
+            return await db.find_due_jobs(now + 10**6, 10)
+
+    left = scenario(
+        tmp_path, channel, steps, DeliveryOptions(max_attempts=1)
+    )
+    assert left == []
+    assert channel.sent == []
+
+
+def test_unrenderable_jobs_are_dropped_alone(tmp_path):
+    """A job naming a deleted role is dropped; the rest of the batch is sent"""
+    channel = StandInChannel(1)
+    now = int(time.time())
+
+    async def steps(storage, dispatcher):
+        await schedule(storage, now + 100, 1, 2)
+        await schedule(storage, now + 200, 3, 4)
+        await schedule(storage, now + 300, 5, 6)
+        await dispatcher.dispatch(now + 1)
+        async with storage.reader() as db:
+            return await db.find_due_jobs(now + 10**6, 10)
+
+    # the role of team 4 was deleted
+    roles = [StandInRole(team) for team in (1, 2, 3, 5, 6)]
+    left = scenario(tmp_path, channel, steps, roles=roles)
+    assert left == []
+    assert len(channel.sent) == 2
+
+
+def test_backoff_grows_and_honours_rate_limits(monkeypatch):
+    monkeypatch.setattr(outbox.random, 'uniform', lambda lo, hi: hi)
+    options = DeliveryOptions(backoff_seconds=2, max_backoff_seconds=60)
+    assert [
+        outbox.backoff(options, attempts, server_error())
+        for attempts in range(7)
+    ] == [2, 4, 8, 16, 32, 60, 60]
+    assert outbox.backoff(options, 0, discord.RateLimited(30)) == 30
+    limited = discord.HTTPException(
+        FakeResponse(429, {'Retry-After': '45'}),
+        'You are being rate limited'
+    )
+    assert outbox.backoff(options, 0, limited) == 45
@@ -0,0 +1,94 @@
+"""Tests for packing response lines into embeds within discord limits"""
+
+import pytest
+
+import discord
+
+from match_scheduler_bot.bot.responses import rendering
+from match_scheduler_bot.bot.responses.rendering import EmbedPacker
+from match_scheduler_bot.bot.responses.announcements import PublicLog
+from match_scheduler_bot.bot.responses.feedback import CommandSucceeded
+from match_scheduler_bot.model.rows import ScheduledMatch
+
+from discord_standin import StandInGuild, StandInInteraction
+
+
+GUILD = StandInGuild()
+
+
+def season(count):
+    return [
+        ScheduledMatch(1_700_000_000 + 3600 * i, 10**17 + i, 10**18 + i)
+        for i in range(count)
+    ]
+
+
+def assert_within_limits(messages):
+    assert messages
+    for embeds in messages:
+        assert 1 <= len(embeds) <= rendering.MESSAGE_EMBED_LIMIT
+        assert sum(len(e) for e in embeds) <= rendering.MESSAGE_TOTAL_LIMIT
+        for embed in embeds:
+            assert len(embed) <= rendering.EMBED_TOTAL_LIMIT
+            assert len(embed.fields) <= rendering.EMBED_FIELD_LIMIT
+            for field in embed.fields:
+                assert len(field.name) <= rendering.FIELD_NAME_LIMIT
+                assert len(field.value) <= rendering.FIELD_VALUE_LIMIT
+
+
+def rendered_lines(messages):
+    return [
+        line
+        for embeds in messages
+        for embed in embeds
+        for field in embed.fields
+        for line in field.value.split('\n')
+    ]
+
+
+@pytest.mark.parametrize('count', [0, 1, 25, 300, 1000])
+def test_calendar_fits_discord_limits(count):
+    """Every match is rendered once and no limit is ever exceeded"""
+    matches = season(count)
+    packer = CommandSucceeded.got_match(StandInInteraction(GUILD), matches)
+    messages = packer.messages()
+    assert_within_limits(messages)
+    lines = rendered_lines(messages)
+    if count:
+        assert len(lines) == count
+        assert sum(packer.lines_per_message) == count
+        for match, line in zip(matches, lines):
+            assert f'<t:{match.start_time}:f>' in line
+    else:
+        assert lines == ['-# There are no matches scheduled at this time.']
+    assert messages[0][0].title is not None
+    assert all(e.title is None for embeds in messages for e in embeds[1:])
+
+
+def test_starting_soon_fits_discord_limits():
+    """A burst of simultaneous starts is split over messages, not dropped"""
+    matches = season(400)
+    messages = PublicLog.matches_starting_soon(GUILD, matches).messages()
+    assert_within_limits(messages)
+    assert len(messages) > 1
+    lines = rendered_lines(messages)
+    for match in matches:
+        assert sum(f'<t:{match.start_time}:R>' in line for line in lines) == 1
+    names = [f.name for embeds in messages for e in embeds for f in e.fields]
+    assert names.count('**How to Watch**:') == 1
+    assert names[-1] == '**Team Instructions:**'
+
+
+def test_import_digest_fits_discord_limits():
+    messages = PublicLog.matches_imported(GUILD, season(500)).messages()
+    assert_within_limits(messages)
+    assert len(rendered_lines(messages)) == 500
+
+
+def test_oversized_lines_are_clipped():
+    packer = EmbedPacker(lambda made: discord.Embed(title='t'))
+    packer.add_line('x' * 5000)
+    packer.add_field('n' * 300, 'v' * 2000)
+    messages = packer.messages()
+    assert_within_limits(messages)
+    assert rendered_lines(messages)[0].endswith('…')
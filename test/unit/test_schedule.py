@@ -0,0 +1,160 @@
+"""Tests for match_scheduler_bot.model.schedule"""
+
+import asyncio
+import random
+
+import pytest
+
+from match_scheduler_bot.model import DataSources
+from match_scheduler_bot.model.matchlist import MatchListRepository
+from match_scheduler_bot.model.schedule import ScheduleIndex
+from match_scheduler_bot.model.storage import MatchStorage
+from match_scheduler_bot.model.rows import (
+    MatchToSchedule,
+    MatchToCancel,
+    MatchCursor,
+    ScheduledMatch
+)
+from match_scheduler_bot.exceptions import (
+    DuplicatedMatchDetected,
+    CancellingNonexistantMatch
+)
+
+
+@pytest.fixture
+def index():
+    return ScheduleIndex([
+        ScheduledMatch(300, 1, 2),
+        ScheduledMatch(100, 3, 4),
+        ScheduledMatch(200, 5, 6),
+        ScheduledMatch(200, 7, 8),
+    ])
+
+
+def test_index_is_time_ordered(index):
+    """Iteration follows the calendar order"""
+    assert [m.start_time for m in index] == [100, 200, 200, 300]
+
+
+def test_index_windows(index):
+    """Windows are half open on the start time"""
+    assert index.between(200, 300) == [
+        ScheduledMatch(200, 5, 6),
+        ScheduledMatch(200, 7, 8)
+    ]
+    assert index.expired(200) == [ScheduledMatch(100, 3, 4)]
+    assert index.next_start(101) == 200
+    assert index.next_start(301) is None
+
+
+def test_index_add_replaces_team_pair(index):
+    """A team pair appears at most once, like the primary key"""
+    index.add(ScheduledMatch(50, 1, 2))
+    index.discard(3, 4)
+    index.discard(3, 4)
+    assert list(index) == [
+        ScheduledMatch(50, 1, 2),
+        ScheduledMatch(200, 5, 6),
+        ScheduledMatch(200, 7, 8)
+    ]
+
+
+def test_index_pages_match_repository():
+    """In-memory keyset pages agree with the database at every depth"""
+    rng = random.Random(7)
+    repo = MatchListRepository(':memory:')
+    with repo as db:
+        for team in range(200):
+            db.insert_match(MatchToSchedule(rng.randrange(50), team, team + 1000))
+    index = ScheduleIndex(repo.find_all_matches())
+    for not_before in (-1, 10, 25, 49):
+        cursor = None
+        while True:
+            page = index.upcoming(not_before, page_size=9, after=cursor)
+            assert page == repo.find_upcoming_matches(
+                not_before, page_size=9, after=cursor
+            )
+            if not page:
+                break
+            cursor = MatchCursor.from_match(page[-1])
+            assert index.upcoming(not_before, 9, before=cursor) == \
+                repo.find_upcoming_matches(not_before, 9, before=cursor)
+
+
+def test_index_clashes_match_repository():
+    """The in-memory clash check refuses exactly what the database would"""
+    rng = random.Random(11)
+    repo = MatchListRepository(':memory:')
+    with repo as db:
+        for team in range(0, 60, 2):
+            start = rng.randrange(10_000)
+            db.insert_match(MatchToSchedule(start, team, team + 1))
+    index = ScheduleIndex(repo.find_all_matches())
+    for _ in range(500):
+        team_1, team_2 = sorted(rng.sample(range(70), 2))
+        match = MatchToSchedule(rng.randrange(10_000), team_1, team_2)
+        clash = index.find_clash(match, 600)
+        assert (clash is None) == (repo.find_clash(match, 600) is None)
+        if clash is not None:
+            assert {clash.team_1_id, clash.team_2_id} & {team_1, team_2}
+            assert abs(clash.start_time - match.proposed_start_timestamp) < 600
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_index_consistent_after_random_writes(tmp_path, seed):
+    """The write-through index mirrors the database after random changes"""
+    rng = random.Random(seed)
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        try:
+            for _ in range(150):
+                try:
+                    async with storage.writer() as db:
+                        for _ in range(rng.randint(1, 3)):
+                            t1, t2 = sorted(rng.sample(range(12), 2))
+                            action = rng.random()
+                            if action < 0.55:
+                                await db.insert_match(MatchToSchedule(
+                                    rng.randrange(1000), t1, t2
+                                ))
+                            elif action < 0.9:
+                                await db.delete_match(MatchToCancel(t1, t2))
+                            elif action < 0.97:
+                                await db.purge_expired(rng.randrange(1000))
+                            else:
+                                raise RuntimeError('abandon the transaction')
+                except (
+                    DuplicatedMatchDetected,
+                    CancellingNonexistantMatch,
+                    RuntimeError
+                ):
+                    pass
+            async with storage.reader() as db:
+                stored = await db.find_all_matches()
+            return stored, list(storage.schedule[0])
+        finally:
+            await storage.close()
+
+    stored, indexed = asyncio.run(scenario())
+    assert indexed == stored
+
+
+def test_index_loaded_on_open(tmp_path):
+    """Opening storage loads the existing schedule into memory"""
+    repo = MatchListRepository(str(tmp_path / 'match.db'))
+    with repo as db:
+        db.insert_match(MatchToSchedule(100, 1, 2))
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        try:
+            return list(storage.schedule[0])
+        finally:
+            await storage.close()
+
+    assert asyncio.run(scenario()) == [ScheduledMatch(100, 1, 2)]
@@ -0,0 +1,107 @@
+"""Tests for running the bot's shards across several processes"""
+
+import asyncio
+import sqlite3
+import threading
+
+import pydantic
+import pytest
+
+from match_scheduler_bot.cli import _shard_groups
+from match_scheduler_bot.model import DataSources, ShardingOptions
+from match_scheduler_bot.model.migrations import LATEST_VERSION, migrate
+from match_scheduler_bot.model.storage import MatchStorage
+from match_scheduler_bot.model.rows import MatchToSchedule
+
+
+def guild_on(shard_id: int, shard_count: int = 4) -> int:
+    '''A snowflake of a guild that Discord routes through `shard_id`'''
+    return ((1000 * shard_count + shard_id) << 22) | 1
+
+
+def test_guilds_are_owned_by_their_shards():
+    sharding = ShardingOptions(enabled=True, shard_count=4, shard_ids=[1, 3])
+    assert [sharding.owns(guild_on(s)) for s in range(4)] == \
+        [False, True, False, True]
+    assert ShardingOptions(enabled=True, shard_count=4).owns(guild_on(0))
+    assert ShardingOptions().owns(guild_on(2))
+
+
+def test_shard_ids_must_fit_the_count():
+    with pytest.raises(pydantic.ValidationError):
+        ShardingOptions(enabled=True, shard_ids=[0])
+    with pytest.raises(pydantic.ValidationError):
+        ShardingOptions(enabled=True, shard_count=2, shard_ids=[2])
+
+
+def test_shard_groups_are_even_and_contiguous():
+    assert _shard_groups(list(range(10)), 3) == \
+        [[0, 1, 2], [3, 4, 5], [6, 7, 8, 9]]
+    assert _shard_groups([4, 5], 4) == [[4], [5]]
+
+
+def test_storage_and_outbox_keep_to_their_shards(tmp_path):
+    """A process mirrors and delivers only for guilds on its own shards"""
+    sharding = ShardingOptions(enabled=True, shard_count=4, shard_ids=[1])
+    mine, theirs = guild_on(1), guild_on(2)
+
+    async def scenario():
+        sources = DataSources(database=tmp_path / 'match.db', readers=1)
+        storage = await MatchStorage(sources).open()
+        async with storage.writer() as db:
+            for guild_id, start in ((theirs, 50), (mine, 100)):
+                match = await db.insert_match(
+                    MatchToSchedule(start, 1, 2, guild_id)
+                )
+                await db.enqueue(
+                    'create_match',
+                    'match_scheduled',
+                    [match],
+                    [f'channel:{guild_id}'],
+                    start,
+                    guild_id
+                )
+        await storage.close()
+
+        storage = await MatchStorage(sources, sharding=sharding).open()
+        try:
+            async with storage.reader() as db:
+                return (
+                    list(storage.schedule),
+                    [j.guild_id for j in await db.find_due_jobs(10**6, 10, sharding)],
+                    await db.next_job_due(sharding),
+                    await db.next_job_due()
+                )
+        finally:
+            await storage.close()
+
+    guilds, jobs, next_due, next_due_anywhere = asyncio.run(scenario())
+    assert guilds == [mine]
+    assert jobs == [mine]
+    assert next_due == 100
+    assert next_due_anywhere == 50
+
+
+def test_processes_opening_together_migrate_once(tmp_path):
+    """Shard processes sharing a database do not race on its schema"""
+    errors = []
+    start = threading.Barrier(4)
+
+    def open_database():
+        conn = sqlite3.connect(tmp_path / 'match.db', timeout=10)
+        try:
+            start.wait()
+            migrate(conn)
+        except Exception as err:
+            errors.append(err)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=open_database) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    conn = sqlite3.connect(tmp_path / 'match.db')
+    assert conn.execute('PRAGMA user_version').fetchone() == (LATEST_VERSION,)
@@ -0,0 +1,79 @@
+"""Tests for startup phase timing and change-gated command sync"""
+
+import asyncio
+
+import discord
+
+from match_scheduler_bot.bot.startup import (
+    StartupPhases,
+    command_tree_hash,
+    sync_command_tree
+)
+from match_scheduler_bot.model import DataSources
+from match_scheduler_bot.model.storage import MatchStorage
+
+
+def make_tree(description):
+    tree = discord.app_commands.CommandTree(
+        discord.Client(intents=discord.Intents.none())
+    )
+
+    @tree.command(name='match-calendar', description=description)
+    async def calendar(interaction: discord.Interaction):
+        pass
+
+    synced = []
+
+    async def sync(*args, **kwargs):
+        synced.append(True)
+        return []
+
+    tree.sync = sync
+    return tree, synced
+
+
+def test_tree_hash_follows_command_specs():
+    first, _ = make_tree('Display a list of upcoming matches')
+    same, _ = make_tree('Display a list of upcoming matches')
+    changed, _ = make_tree('Display the match calendar')
+    assert command_tree_hash(first) == command_tree_hash(same)
+    assert command_tree_hash(first) != command_tree_hash(changed)
+
+
+def test_sync_only_when_tree_changes(tmp_path):
+    """Restarts with an unchanged tree never hit the sync endpoint"""
+    sources = DataSources(database=tmp_path / 'match.db', readers=1)
+
+    async def start(description, application_id=1):
+        tree, synced = make_tree(description)
+        storage = await MatchStorage(sources).open()
+        try:
+            await sync_command_tree(tree, storage, application_id)
+        finally:
+            await storage.close()
+        return len(synced)
+
+    async def scenario():
+        return [
+            await start('Display a list of upcoming matches'),
+            await start('Display a list of upcoming matches'),
+            await start('Display the match calendar'),
+            await start('Display the match calendar'),
+            await start('Display the match calendar', application_id=2),
+        ]
+
+    assert asyncio.run(scenario()) == [1, 0, 1, 0, 1]
+
+
+def test_startup_phases_are_recorded():
+    phases = StartupPhases()
+    with phases.phase('open storage'):
+        pass
+    try:
+        with phases.phase('load extensions'):
+            raise RuntimeError('bad cog')
+    except RuntimeError:
+        pass
+    assert list(phases.durations) == ['open storage', 'load extensions']
+    assert all(d >= 0 for d in phases.durations.values())
+    assert phases.elapsed() >= sum(phases.durations.values())
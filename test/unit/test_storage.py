@@ -0,0 +1,69 @@
+"""Tests for match_scheduler_bot.model.storage"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from match_scheduler_bot.model import DataSources
+from match_scheduler_bot.model.storage import MatchStorage
+from match_scheduler_bot.model.rows import MatchToSchedule, ScheduledMatch
+from match_scheduler_bot.exceptions import MatchScheduleNotObtained
+
+from support import run
+
+
+def test_storage_must_be_opened(tmp_path):
+    """Repositories are unavailable until the storage is opened"""
+    storage = MatchStorage(DataSources(database=tmp_path / 'match.db'))
+    with pytest.raises(MatchScheduleNotObtained):
+        storage.writer()
+
+
+def test_reads_do_not_wait_on_open_write(tmp_path):
+    """Readers see the last committed schedule while a write is in flight"""
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=2)
+        ).open()
+        try:
+            async with storage.writer() as db:
+                await db.insert_match(MatchToSchedule(100, 1, 2))
+            async with storage.writer() as db:
+                await db.insert_match(MatchToSchedule(200, 3, 4))
+
+                async def peek():
+                    async with storage.reader() as ro:
+                        return await ro.find_upcoming_matches(not_before=0)
+
+                during = await asyncio.wait_for(
+                    asyncio.gather(*[peek() for _ in range(5)]),
+                    timeout=1
+                )
+            async with storage.reader() as ro:
+                after = await ro.find_upcoming_matches(not_before=0)
+            return during, after
+        finally:
+            await storage.close()
+
+    during, after = run(scenario())
+    assert all(d == [ScheduledMatch(100, 1, 2)] for d in during)
+    assert after == [ScheduledMatch(100, 1, 2), ScheduledMatch(200, 3, 4)]
+
+
+def test_readers_are_read_only_and_pragmas_apply(tmp_path):
+    """The pool runs in WAL mode and refuses writes on reader connections"""
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        try:
+            async with storage.reader() as ro:
+                with pytest.raises(sqlite3.OperationalError):
+                    await ro.insert_match(MatchToSchedule(100, 1, 2))
+        finally:
+            await storage.close()
+
+    run(scenario())
+    conn = sqlite3.connect(tmp_path / 'match.db')
+    assert conn.execute('PRAGMA journal_mode').fetchone() == ('wal',)
@@ -0,0 +1,73 @@
+"""Tests for match_scheduler_bot.bot.timers"""
+
+import asyncio
+import time
+
+from match_scheduler_bot.bot.timers import DeadlineTimer
+
+
+def test_timer_fires_once_per_deadline():
+    """Wake-ups follow the deadlines rather than a polling interval"""
+    async def scenario():
+        deadlines = [time.time() + 0.05, time.time() + 0.1]
+        fired = []
+
+        async def fire(now):
+            fired.append(now)
+            deadlines.pop(0)
+
+        timer = DeadlineTimer(
+            'test',
+            lambda: deadlines[0] if deadlines else None,
+            fire
+        )
+        timer.start()
+        await asyncio.sleep(0.3)
+        timer.stop()
+        return fired, timer.wakeups
+
+    fired, wakeups = asyncio.run(scenario())
+    assert len(fired) == 2
+    assert wakeups == 2
+
+
+def test_timer_rearms_on_earlier_deadline():
+    """A newly added earlier deadline pre-empts the armed one"""
+    async def scenario():
+        deadlines = [time.time() + 60]
+        fired = asyncio.Event()
+
+        async def fire(now):
+            deadlines.clear()
+            fired.set()
+
+        timer = DeadlineTimer('test', lambda: min(deadlines, default=None), fire)
+        timer.start()
+        await asyncio.sleep(0.05)
+        deadlines.append(time.time() + 0.05)
+        timer.rearm()
+        await asyncio.wait_for(fired.wait(), timeout=1)
+        timer.stop()
+        return timer.wakeups
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_timer_retries_after_failure():
+    """A failing callback is retried instead of killing the timer"""
+    async def scenario():
+        attempts = []
+
+        async def fire(now):
+            attempts.append(now)
+            if len(attempts) == 1:
+                raise RuntimeError('discord is down')
+
+        done = lambda: None if len(attempts) > 1 else time.time()
+        timer = DeadlineTimer('test', done, fire, retry_after=0.01)
+        timer.start()
+        await asyncio.sleep(0.2)
+        timer.stop()
+        return len(attempts)
+
+    assert asyncio.run(scenario()) == 2
@@ -0,0 +1,41 @@
+"""Tests for match_scheduler_bot.bot.validators"""
+
+import datetime
+import zoneinfo
+
+import pytest
+
+from match_scheduler_bot.bot.validators import calendar_window
+from match_scheduler_bot.exceptions import InvalidCalendarFilter
+
+
+def test_calendar_window_covers_whole_days():
+    """Dates are whole days in the given timezone; this week is Monday to Sunday"""
+    tz = zoneinfo.ZoneInfo('America/New_York')
+
+    def at(*parts):
+        return round(datetime.datetime(*parts, tzinfo=tz).timestamp())
+
+    assert calendar_window('2030-03-09', '2030-03-10', False, 'America/New_York') \
+        == (at(2030, 3, 9) - 1, at(2030, 3, 11) - 1)
+    assert calendar_window(None, '2030-03-10', False, 'UTC') == (
+        None,
+        round(datetime.datetime(2030, 3, 11, tzinfo=datetime.UTC).timestamp()) - 1
+    )
+    # a Wednesday
+    now = datetime.datetime(2030, 3, 13, 15, tzinfo=tz)
+    assert calendar_window(None, None, True, 'America/New_York', now) == (
+        at(2030, 3, 11) - 1,
+        at(2030, 3, 18) - 1
+    )
+    for bad in [
+        ('2030-03-10', '2030-03-09', False, 'UTC'),
+        ('10/03/2030', None, False, 'UTC'),
+        ('2030-03-10', None, True, 'UTC'),
+        (None, None, True, 'Mars/Olympus_Mons'),
+        (None, None, True, ''),
+        (None, None, True, '/etc/x'),
+        (None, '9999-12-31', False, 'UTC'),
+    ]:
+        with pytest.raises(InvalidCalendarFilter):
+            calendar_window(*bad)
@@ -0,0 +1,111 @@
+"""Tests for match_scheduler_bot.bot.views"""
+
+import asyncio
+import datetime
+
+from match_scheduler_bot.bot.views import CalendarView
+from match_scheduler_bot.model import DataSources
+from match_scheduler_bot.model.storage import MatchStorage
+from match_scheduler_bot.model.rows import MatchToSchedule
+
+from discord_standin import StandInGuild, StandInInteraction
+
+
+def test_filtered_calendar_pages_one_team(tmp_path):
+    """A team calendar only shows that team, inside the window, page by page"""
+    later = round(datetime.datetime.now(datetime.timezone.utc).timestamp())
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        try:
+            async with storage.writer() as db:
+                for team in range(1, 24):
+                    if team != 12:
+                        await db.insert_match(MatchToSchedule(
+                            later + 3600 + team, min(team, 12), max(team, 12)
+                        ))
+            calendar = CalendarView(
+                storage,
+                0,
+                page_size=5,
+                team_id=12,
+                not_after=later + 3600 + 20
+            )
+            pages = [list(await calendar.load())]
+            while not calendar.next_page.disabled:
+                pages.append(list(await calendar.load(after=calendar._last)))
+            return pages
+        finally:
+            await storage.close()
+
+    pages = asyncio.run(scenario())
+    assert [len(p) for p in pages] == [5, 5, 5, 4]
+    assert all(12 in (m.team_1_id, m.team_2_id) for p in pages for m in p)
+    assert pages[-1][-1].start_time == later + 3600 + 20
+
+
+def test_calendar_view_navigation(tmp_path):
+    """Next and previous walk the calendar and toggle at its edges"""
+    later = round(datetime.datetime.now(datetime.timezone.utc).timestamp())
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        try:
+            async with storage.writer() as db:
+                for team in range(1, 24):
+                    await db.insert_match(
+                        MatchToSchedule(later + 3600 + team, team, team + 100)
+                    )
+            calendar = CalendarView(storage, 0, page_size=10)
+            pages = [list(await calendar.load())]
+            flags = [(calendar.previous_page.disabled, calendar.next_page.disabled)]
+            while not calendar.next_page.disabled:
+                pages.append(list(await calendar.load(after=calendar._last)))
+                flags.append(
+                    (calendar.previous_page.disabled, calendar.next_page.disabled)
+                )
+            back = list(await calendar.load(before=calendar._first))
+            return pages, flags, back
+        finally:
+            await storage.close()
+
+    pages, flags, back = asyncio.run(scenario())
+    assert [len(p) for p in pages] == [10, 10, 3]
+    assert flags == [(True, False), (False, False), (False, True)]
+    assert back == pages[1]
+
+
+def test_calendar_view_cuts_page_to_one_message(tmp_path):
+    """A page too large for one message is cut and "Next" resumes after it"""
+    later = round(datetime.datetime.now(datetime.timezone.utc).timestamp())
+
+    async def scenario():
+        storage = await MatchStorage(
+            DataSources(database=tmp_path / 'match.db', readers=1)
+        ).open()
+        try:
+            async with storage.writer() as db:
+                await db.insert_matches([
+                    MatchToSchedule(later + 3600 + i, 10**17 + i, 10**18 + i)
+                    for i in range(300)
+                ])
+            calendar = CalendarView(storage, 0, page_size=300)
+            await calendar.load()
+            embeds = calendar.render(StandInInteraction(StandInGuild()))
+            shown = list(calendar.matches)
+            rest = await calendar.load(after=calendar._last)
+            return embeds, shown, rest, calendar.next_page.disabled
+        finally:
+            await storage.close()
+
+    embeds, shown, rest, last_page = asyncio.run(scenario())
+    assert 0 < len(shown) < 300
+    assert len(embeds) <= 10
+    assert sum(len(e) for e in embeds) <= 6000
+    assert len(shown) + len(rest) == 300
+    assert rest[0].start_time > shown[-1].start_time
+    assert last_page